@@ -1,81 +1,116 @@
+import math
 import secrets
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from jose import jwt, JWTError
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from .cache import TTLCache
 from .config import get_settings
-from .database import get_db
-from .models import User, OTPCode
+from .database import get_read_db
+from .models import User
+from .otp import get_otp_store
+from .ratelimit import SlidingWindowLimiter
 
 settings = get_settings()
 security = HTTPBearer()
 
 
+@dataclass(frozen=True)
+class AuthUser:
+    """The authenticated caller, as cached by get_current_user."""
+    id: str
+    phone_number: str
+    is_approved: bool
+    is_admin: bool
+    timezone: str
+    created_at: datetime
+
+
+# Per-process; admin changes invalidate it here, other processes see them within the TTL
+user_cache: TTLCache[str, AuthUser] = TTLCache(
+    max_size=settings.auth_cache_max_size,
+    ttl=settings.auth_cache_ttl_seconds
+)
+
+
+def invalidate_user(user_id: str):
+    user_cache.delete(user_id)
+
+
+otp_request_limits = (
+    SlidingWindowLimiter(settings.otp_requests_per_ip, settings.otp_rate_window_seconds),
+    SlidingWindowLimiter(settings.otp_requests_per_phone, settings.otp_rate_window_seconds),
+)
+otp_verify_limits = (
+    SlidingWindowLimiter(settings.otp_verify_attempts_per_ip, settings.otp_rate_window_seconds),
+    SlidingWindowLimiter(settings.otp_verify_attempts_per_phone, settings.otp_rate_window_seconds),
+)
+
+
 def generate_otp() -> str:
     return "".join([str(secrets.randbelow(10)) for _ in range(6)])
 
 
-def create_otp(db: Session, phone_number: str) -> str:
-    # Invalidate any existing OTPs for this phone
-    db.query(OTPCode).filter(
-        OTPCode.phone_number == phone_number,
-        OTPCode.used == False
-    ).update({"used": True})
-
+async def create_otp(phone_number: str) -> str:
     code = generate_otp()
-    expires_at = datetime.utcnow() + timedelta(minutes=settings.otp_expiration_minutes)
+    await get_otp_store().issue(phone_number, code)
+    return code
 
-    otp = OTPCode(
-        phone_number=phone_number,
-        code=code,
-        expires_at=expires_at
-    )
-    db.add(otp)
-    db.commit()
 
-    return code
+async def verify_otp(phone_number: str, code: str) -> bool:
+    return await get_otp_store().consume(phone_number, code)
+
 
+def enforce_rate_limits(*checks: tuple[SlidingWindowLimiter, str]):
+    """Raise 429 at the first limiter that refuses its key (later limiters aren't charged)."""
+    for limiter, key in checks:
+        retry_after = limiter.hit(key)
+        if retry_after:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many attempts, try again later",
+                headers={"Retry-After": str(math.ceil(retry_after))}
+            )
 
-def verify_otp(db: Session, phone_number: str, code: str) -> bool:
-    otp = db.query(OTPCode).filter(
-        OTPCode.phone_number == phone_number,
-        OTPCode.code == code,
-        OTPCode.used == False,
-        OTPCode.expires_at > datetime.utcnow()
-    ).first()
 
-    if not otp:
-        return False
+# Once any user exists, later signups can't be the first, so the check stops hitting the database
+_users_exist = False
 
-    otp.used = True
-    db.commit()
-    return True
 
+async def is_first_user(db: AsyncSession) -> bool:
+    """Whether the users table is empty: an index probe for one row, not a count."""
+    global _users_exist
+    if not _users_exist:
+        _users_exist = await db.scalar(select(User.id).limit(1)) is not None
+    return not _users_exist
 
-def get_or_create_user(db: Session, phone_number: str) -> User:
-    user = db.query(User).filter(User.phone_number == phone_number).first()
+
+async def get_or_create_user(db: AsyncSession, phone_number: str) -> User:
+    user = await db.scalar(select(User).where(User.phone_number == phone_number))
     if not user:
         # First user becomes admin and is auto-approved
-        is_first_user = db.query(User).count() == 0
+        is_first = await is_first_user(db)
         user = User(
             phone_number=phone_number,
-            is_admin=is_first_user,
-            is_approved=is_first_user
+            is_admin=is_first,
+            is_approved=is_first
         )
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
     return user
 
 
-def get_approved_user(
+async def get_approved_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
+    db: AsyncSession = Depends(get_read_db)
+) -> AuthUser:
     """Get current user, but require approval."""
-    user = get_current_user(credentials, db)
+    user = await get_current_user(credentials, db)
     if not user.is_approved:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -84,12 +119,12 @@ def get_approved_user(
     return user
 
 
-def get_admin_user(
+async def get_admin_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
+    db: AsyncSession = Depends(get_read_db)
+) -> AuthUser:
     """Get current user, but require admin."""
-    user = get_approved_user(credentials, db)
+    user = await get_approved_user(credentials, db)
     if not user.is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -107,10 +142,10 @@ def create_access_token(user_id: str) -> str:
     return jwt.encode(payload, settings.jwt_secret, algorithm=settings.jwt_algorithm)
 
 
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
+    db: AsyncSession = Depends(get_read_db)
+) -> AuthUser:
     token = credentials.credentials
     try:
         payload = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
@@ -120,8 +155,17 @@ def get_current_user(
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+
+    row = (await db.execute(
+        select(User.id, User.phone_number, User.is_approved, User.is_admin, User.timezone, User.created_at)
+        .where(User.id == user_id)
+    )).first()
+    if not row:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
 
+    user = AuthUser(**row._mapping)
+    user_cache.set(user_id, user)
     return user
@@ -0,0 +1,136 @@
+import csv
+import io
+import json
+from typing import AsyncIterator
+
+from sqlalchemy import Row
+
+from .timezones import local_now
+
+# Column order for CSV import/export; NDJSON uses the same keys
+CSV_FIELDS = [
+    "message", "schedule_type", "schedule_time", "schedule_date", "schedule_days", "schedule_day_of_month",
+    "recurrence", "timezone"
+]
+EXPORT_FIELDS = ["id", *CSV_FIELDS, "next_run", "is_active", "created_at"]
+
+MAX_LINE_BYTES = 64 * 1024
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a streamed request body into lines without buffering the whole body."""
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8").rstrip("\r")
+        if len(pending) > MAX_LINE_BYTES:
+            raise ValueError(f"Line longer than {MAX_LINE_BYTES} bytes")
+    if pending:
+        yield pending.decode("utf-8").rstrip("\r")
+
+
+async def iter_records(lines: AsyncIterator[str]) -> AsyncIterator[tuple[int, str]]:
+    """Non-blank lines with their line numbers: the NDJSON records of a body."""
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if line.strip():
+            yield line_number, line
+
+
+async def iter_csv_records(lines: AsyncIterator[str]) -> AsyncIterator[tuple[int, list[str]]]:
+    """CSV records with the line number each starts on, read with csv.reader.
+
+    A quoted field can span lines (to_csv writes a multi-line message that way), so lines are
+    gathered until their quotes balance before the record is parsed.
+    """
+    record: list[str] = []
+    size = start = line_number = 0
+    async for line in lines:
+        line_number += 1
+        if not record:
+            start = line_number
+        record.append(line)
+        size += len(line) + 1
+        if sum(part.count('"') for part in record) % 2:
+            if size > MAX_LINE_BYTES:
+                raise ValueError(f"Record longer than {MAX_LINE_BYTES} bytes (unclosed quote?)")
+            continue
+
+        text = "\n".join(record)
+        record, size = [], 0
+        if text.strip():
+            yield start, next(csv.reader([text]))
+    if record:
+        raise ValueError(f"Unclosed quote in the record starting on line {start}")
+
+
+def parse_ndjson(line: str) -> dict:
+    row = json.loads(line)
+    if not isinstance(row, dict):
+        raise ValueError("Each line must be a JSON object")
+    return row
+
+
+def parse_csv(values: list[str], header: list[str]) -> dict:
+    """One CSV record; empty cells are omitted, schedule_days is ';'-separated and recurrence is JSON."""
+    if len(values) != len(header):
+        raise ValueError(f"Expected {len(header)} columns, got {len(values)}")
+
+    row = {field: value for field, value in zip(header, values) if value != ""}
+    if "schedule_days" in row:
+        row["schedule_days"] = [int(day) for day in row["schedule_days"].split(";") if day.strip()]
+    if "recurrence" in row:
+        row["recurrence"] = json.loads(row["recurrence"])
+    return row
+
+
+def parse_csv_header(values: list[str]) -> list[str]:
+    # Export-only columns (id, next_run, ...) are accepted so an export can be re-imported
+    header = [field.strip() for field in values]
+    unknown = set(header) - set(EXPORT_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown CSV columns: {', '.join(sorted(unknown))}")
+    return header
+
+
+def _export_values(row: Row) -> dict:
+    return {
+        "id": row.id,
+        "message": row.message,
+        "schedule_type": row.schedule_type.value,
+        "schedule_time": row.schedule_time.isoformat(),
+        # A one-time reminder's day, on its own wall clock, so importing it keeps the date
+        "schedule_date": local_now(row.timezone, row.next_run).date().isoformat()
+        if row.schedule_type.value == "once" else None,
+        "schedule_days": row.schedule_days,
+        "schedule_day_of_month": row.schedule_day_of_month,
+        "recurrence": row.recurrence,
+        "timezone": row.timezone,
+        "next_run": row.next_run.isoformat(),
+        "is_active": row.is_active,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+    }
+
+
+def to_ndjson(rows: list[Row]) -> str:
+    return "".join(json.dumps(_export_values(row)) + "\n" for row in rows)
+
+
+def csv_header() -> str:
+    return ",".join(EXPORT_FIELDS) + "\n"
+
+
+def to_csv(rows: list[Row]) -> str:
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    for row in rows:
+        values = _export_values(row)
+        if values["schedule_days"] is not None:
+            values["schedule_days"] = ";".join(str(day) for day in values["schedule_days"])
+        if values["recurrence"] is not None:
+            values["recurrence"] = json.dumps(values["recurrence"])
+        writer.writerow(["" if values[field] is None else values[field] for field in EXPORT_FIELDS])
+    return out.getvalue()
@@ -4,15 +4,97 @@ from functools import lru_cache
 
 class Settings(BaseSettings):
     database_url: str = "sqlite:///./nagqueen.db"
+    async_database_url: str = ""  # Defaults to database_url on its async driver (asyncpg / aiosqlite)
+
+    # Postgres connection pool, per engine and per process (each process has a sync and an async engine)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = 1800  # Seconds before a connection is replaced; -1 disables
+    db_pool_pre_ping: bool = True  # Test connections on checkout, so a DB restart doesn't surface as errors
+    db_statement_timeout_ms: int = 0  # 0 disables
+    db_pgbouncer: bool = False  # Set behind PgBouncer in transaction mode; disables prepared statement caching
     jwt_secret: str = "change-this-to-a-random-secret-key"
     jwt_algorithm: str = "HS256"
     jwt_expiration_hours: int = 168  # 7 days
 
+    # Cache of authenticated users, so the auth dependency skips the users table
+    auth_cache_ttl_seconds: int = 60
+    auth_cache_max_size: int = 10000
+
     twilio_account_sid: str = ""
     twilio_auth_token: str = ""
     twilio_phone_number: str = ""
+    twilio_phone_numbers: str = ""  # Comma-separated sender pool; overrides twilio_phone_number when set
+
+    # Per sender number rate limit (0 disables); sends wait up to the max, then get deferred. Enforced
+    # per process: N processes sending (web replicas, scheduler workers) can reach N times this rate
+    sms_rate_per_second: float = 1.0
+    sms_burst: float = 0  # Defaults to one second's worth of sends
+    sms_max_throttle_wait_seconds: float = 5.0
+    sms_otp_share: float = 0.2  # Part of that rate held back for OTP codes, so reminder bursts can't starve them
+
+    # SMS transport: "auto" (Twilio if credentials are set, else console), "twilio", "console", "fake"
+    sms_transport: str = "auto"
+    sms_timeout_seconds: float = 10.0
+    sms_fake_latency_ms: int = 0
 
     otp_expiration_minutes: int = 5
+    otp_store: str = "database"  # "memory" skips the DB entirely, but only works with a single web process
+    otp_memory_max_entries: int = 100000
+    otp_purge_interval_seconds: int = 300  # How often used and expired codes are deleted (database store)
+
+    # Sliding-window limits per phone number and per client IP (0 disables), checked before any DB write or SMS
+    otp_rate_window_seconds: int = 900
+    otp_requests_per_phone: int = 3
+    otp_requests_per_ip: int = 20
+    otp_verify_attempts_per_phone: int = 10
+    otp_verify_attempts_per_ip: int = 50
+    # Proxies in front of the API that append to X-Forwarded-For (1 on Railway); the client IP is taken
+    # that many entries from the right, since anything further left is whatever the client sent
+    trusted_proxy_hops: int = 0
+
+    # Check fast-path list responses against their response models (slow; for development and tests)
+    validate_responses: bool = False
+
+    # Admin
+    admin_stats_cache_seconds: int = 30  # /admin/stats is recomputed at most this often per process
+
+    # Bulk reminder import
+    bulk_import_chunk_size: int = 500  # Rows inserted and committed per transaction
+    bulk_import_max_rows: int = 50000
+
+    # Scheduler
+    sms_dispatch_concurrency: int = 16  # Max SMS sends in flight per scheduler tick
+    scheduler_batch_size: int = 500  # Due reminders loaded and committed per batch
+    scheduler_writeback_chunk_size: int = 100  # Sent reminders whose state is written and committed together
+    scheduler_lease_seconds: int = 300  # How long a claimed reminder is reserved for its worker
+    scheduler_lookahead_seconds: int = 300  # Upcoming fire times are reloaded from the DB once per window
+    scheduler_change_poll_seconds: int = 10  # How often reminder changes made by other processes are picked up
+    run_scheduler: bool = True  # Set false on API processes when a separate worker runs the scheduler
+    auto_migrate: bool = False  # Apply migrations at startup (local development); deploys run python -m app.migrations
+    allow_outdated_schema: bool = False  # Without auto_migrate, start even if the schema is behind (not recommended)
+
+    # Coalescing: one message per recipient per tick, taking in their reminders due within the window
+    sms_coalesce: bool = False
+    sms_coalesce_window_seconds: int = 60
+    sms_coalesce_max_chars: int = 1600  # Twilio's body limit; longer combined messages are split between reminders
+
+    # Calendar: reminder_occurrences is kept filled this far ahead, and past rows kept this long
+    calendar_horizon_days: int = 62
+    calendar_retention_days: int = 31
+    calendar_refresh_interval_seconds: int = 3600
+
+    # Deliveries log: every send attempt per reminder occurrence, monthly partitions on Postgres
+    delivery_retention_days: int = 180  # Older rows are deleted; on Postgres, whole months once all of it is older
+    delivery_compact_after_days: int = 7  # Failed and throttled attempts are dropped after this; outcomes are kept
+    delivery_partitions_ahead: int = 2  # Months of partitions created ahead of writes (Postgres)
+    delivery_maintenance_interval_seconds: int = 3600
+
+    # Outbound message queue
+    outbox_max_attempts: int = 5  # Attempts before a message is dead-lettered
+    outbox_backoff_base_seconds: int = 30  # Retry delay doubles from here on each failure
+    outbox_backoff_max_seconds: int = 3600
 
     # Railway deployment settings
     port: int = 8000
@@ -1,16 +1,113 @@
+import uuid
+
+from sqlalchemy import event
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 from .config import get_settings
+from .metrics import instrument_engine
 
 settings = get_settings()
 
-engine = create_engine(
-    settings.database_url,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {}
-)
+# How long a SQLite connection waits on another's write lock before "database is locked"
+SQLITE_BUSY_TIMEOUT_MS = 30000
+
+
+def sync_database_url(url: str) -> str:
+    """Pin plain Postgres URLs to psycopg2, the driver we install (SQLAlchemy 2.1 defaults to psycopg 3)."""
+    if url.startswith(("postgres://", "postgresql://")):
+        return "postgresql+psycopg2://" + url.split("://", 1)[1]
+    return url
+
+
+def async_database_url(url: str) -> str:
+    """Point the configured database URL at its async driver (asyncpg / aiosqlite)."""
+    if url.startswith(("postgres://", "postgresql://", "postgresql+psycopg2://")):
+        return "postgresql+asyncpg://" + url.split("://", 1)[1]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url.split("://", 1)[1]
+    return url
+
+
+def engine_options(url: str) -> dict:
+    """Pool and connection settings for create_engine / create_async_engine."""
+    if url.startswith("sqlite"):
+        return {"connect_args": {"check_same_thread": False}} if "aiosqlite" not in url else {}
+
+    connect_args = {}
+    asyncpg = url.startswith("postgresql+asyncpg")
+
+    if settings.db_statement_timeout_ms:
+        if asyncpg:
+            connect_args["server_settings"] = {"statement_timeout": str(settings.db_statement_timeout_ms)}
+        else:
+            connect_args["options"] = f"-c statement_timeout={settings.db_statement_timeout_ms}"
+
+    if settings.db_pgbouncer and asyncpg:
+        # PgBouncer in transaction mode hands each transaction a different server connection,
+        # so prepared statements can't be cached on (or named consistently for) a connection
+        connect_args["statement_cache_size"] = 0
+        connect_args["prepared_statement_cache_size"] = 0
+        connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid.uuid4()}__"
+
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "connect_args": connect_args,
+    }
+
+
+def tune_sqlite(engine):
+    """WAL for file-backed SQLite, so request reads don't hold up the writers' commits, and a
+    longer busy timeout: concurrent creates now write their calendar rows too."""
+    if engine.dialect.name != "sqlite" or engine.url.database in (None, "", ":memory:"):
+        return
+
+    @event.listens_for(engine, "connect")
+    def _pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.close()
+
+
+# Sync engine: scheduler and outbox workers, which run on their own threads
+_sync_url = sync_database_url(settings.database_url)
+engine = create_engine(_sync_url, **engine_options(_sync_url))
+instrument_engine(engine, "sync")
+tune_sqlite(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine: request handlers, so a slow query doesn't hold one of the threadpool's workers
+_async_url = settings.async_database_url or async_database_url(settings.database_url)
+async_engine = create_async_engine(_async_url, **engine_options(_async_url))
+instrument_engine(async_engine.sync_engine, "async")
+tune_sqlite(async_engine.sync_engine)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+class ReadOnlySession(Session):
+    """Session for read-only request paths; refuses to flush."""
+
+
+@event.listens_for(ReadOnlySession, "before_flush")
+def _refuse_flush(session, flush_context, instances):
+    raise RuntimeError("Attempted to write through a read-only session")
+
+
+# Same pool, but autocommit connections: reads skip the BEGIN/ROLLBACK round trips
+ReadSessionLocal = async_sessionmaker(
+    async_engine.execution_options(isolation_level="AUTOCOMMIT"),
+    sync_session_class=ReadOnlySession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 Base = declarative_base()
 
 
@@ -20,3 +117,13 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_read_db():
+    async with ReadSessionLocal() as db:
+        yield db
@@ -0,0 +1,123 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import Row, delete, insert, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from .config import get_settings
+from .models import Delivery, DeliveryStatus
+
+settings = get_settings()
+
+# pg_advisory_xact_lock key, so concurrent scheduler workers don't race on partition DDL
+MAINTENANCE_LOCK_KEY = 7262_0025
+# Statuses superseded by a later attempt at the same occurrence; compaction drops these
+RETRIED_STATUSES = (DeliveryStatus.failed, DeliveryStatus.throttled)
+
+
+def month_start(moment: datetime, months: int = 0) -> datetime:
+    """The first instant of `moment`'s month, `months` months on."""
+    index = moment.year * 12 + moment.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"deliveries_y{month.year}m{month.month:02d}"
+
+
+def ensure_partitions(conn: Connection, now: datetime) -> list[str]:
+    """Create the monthly partitions of deliveries from this month to delivery_partitions_ahead
+    months on (Postgres only). There's no default partition, so a write past the last one fails."""
+    if conn.dialect.name != "postgresql":
+        return []
+    names = []
+    for months in range(settings.delivery_partitions_ahead + 1):
+        start, end = month_start(now, months), month_start(now, months + 1)
+        names.append(partition_name(start))
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {partition_name(start)} PARTITION OF deliveries "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        ))
+    return names
+
+
+def drop_expired_partitions(conn: Connection, cutoff: datetime) -> list[str]:
+    """Drop the partitions wholly older than `cutoff`: retention on Postgres costs no DELETE or vacuum."""
+    partitions = conn.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE parent.relname = 'deliveries'"
+    )).scalars().all()
+    dropped = []
+    for name in partitions:
+        try:
+            month = datetime.strptime(name, "deliveries_y%Ym%m")
+        except ValueError:
+            # Not one of ours (a default partition attached by hand, say): leave it alone
+            continue
+        if month_start(month, 1) <= cutoff:
+            conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            dropped.append(name)
+    return dropped
+
+
+def delivery_rows(
+    message: Row,
+    status: DeliveryStatus,
+    sent_at: datetime,
+    latency_ms: int,
+    error: str | None = None
+) -> list[dict]:
+    """Log rows for one send attempt: one per reminder occurrence the message carried (none for
+    messages that aren't reminders, such as OTP codes)."""
+    return [
+        {
+            "sent_at": sent_at,
+            "reminder_id": occurrence["reminder_id"],
+            "user_id": occurrence["user_id"],
+            "scheduled_for": datetime.fromisoformat(occurrence["scheduled_for"]),
+            "status": status,
+            "latency_ms": latency_ms,
+            "error": error
+        }
+        for occurrence in message.occurrences or ()
+    ]
+
+
+def record_deliveries(db: Session, rows: list[dict]):
+    """Append a batch of log rows in the caller's transaction.
+
+    In a savepoint: losing history (say, a missing partition) must not roll back the outbox
+    update it rides with, or the messages would be sent again.
+    """
+    if not rows:
+        return
+    try:
+        with db.begin_nested():
+            db.execute(insert(Delivery), rows)
+    except Exception as e:
+        print(f"Error recording {len(rows)} deliveries: {e}")
+
+
+def maintain_deliveries(db: Session, now: datetime):
+    """Partitions ahead, retention and compaction for the deliveries log; commits.
+
+    Retention drops rows older than delivery_retention_days (on Postgres, whole months once their
+    last day is past it). Compaction drops failed and throttled attempts older than
+    delivery_compact_after_days: by then retries are long over, and each occurrence keeps the
+    sent or dead row that ended it.
+    """
+    conn = db.connection()
+    cutoff = now - timedelta(days=settings.delivery_retention_days)
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MAINTENANCE_LOCK_KEY})
+        ensure_partitions(conn, now)
+        drop_expired_partitions(conn, cutoff)
+    else:
+        db.execute(delete(Delivery).where(Delivery.sent_at < cutoff))
+    db.execute(delete(Delivery).where(
+        Delivery.status.in_(RETRIED_STATUSES),
+        Delivery.sent_at < now - timedelta(days=settings.delivery_compact_after_days)
+    ))
+    db.commit()
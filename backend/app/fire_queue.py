@@ -0,0 +1,77 @@
+import heapq
+import threading
+from datetime import datetime
+from typing import Callable
+
+
+class FireQueue:
+    """Min-heap of upcoming reminder fire times inside the scheduler's look-ahead window.
+
+    The heap is loaded from the database once per window and then kept current by the
+    reminder routes, so the scheduler can sleep until exactly the next due time instead
+    of polling. Superseded entries are skipped lazily when they reach the top.
+    """
+
+    def __init__(self):
+        self._heap: list[tuple[datetime, str]] = []
+        self._entries: dict[str, datetime] = {}
+        self._lock = threading.Lock()
+        self.loaded_until: datetime | None = None
+        # Called with the new earliest fire time when a change moves it forward
+        self.listener: Callable[[datetime], None] | None = None
+
+    def load(self, upcoming: list[tuple[str, datetime]], loaded_until: datetime):
+        with self._lock:
+            self._entries = dict(upcoming)
+            self._heap = [(next_run, reminder_id) for reminder_id, next_run in upcoming]
+            heapq.heapify(self._heap)
+            self.loaded_until = loaded_until
+
+    def needs_reload(self, now: datetime) -> bool:
+        return self.loaded_until is None or now >= self.loaded_until
+
+    def _peek(self) -> datetime | None:
+        while self._heap:
+            next_run, reminder_id = self._heap[0]
+            if self._entries.get(reminder_id) == next_run:
+                return next_run
+            heapq.heappop(self._heap)
+        return None
+
+    def pop_due(self, now: datetime):
+        with self._lock:
+            while (next_run := self._peek()) is not None and next_run <= now:
+                _, reminder_id = heapq.heappop(self._heap)
+                del self._entries[reminder_id]
+
+    def next_wakeup(self, now: datetime) -> datetime:
+        """Earliest known fire time, or the end of the window if nothing is due before then."""
+        with self._lock:
+            next_run = self._peek()
+            window_end = self.loaded_until or now
+            return min(next_run, window_end) if next_run is not None else window_end
+
+    def schedule(self, reminder_id: str, next_run: datetime):
+        with self._lock:
+            if self.loaded_until is None or next_run > self.loaded_until:
+                # Outside the window; the next load picks it up
+                self._entries.pop(reminder_id, None)
+                return
+            earliest = self._peek()
+            self._entries[reminder_id] = next_run
+            heapq.heappush(self._heap, (next_run, reminder_id))
+            listener = self.listener
+
+        if listener is not None and (earliest is None or next_run < earliest):
+            listener(next_run)
+
+    def discard(self, reminder_id: str):
+        with self._lock:
+            self._entries.pop(reminder_id, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+fire_queue = FireQueue()
+
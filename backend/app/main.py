@@ -1,11 +1,15 @@
+from .startup import startup_profile  # First, so its clock covers the imports below
+
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 from .config import get_settings
-from .database import Base, engine
+from .database import engine, async_engine
+from .metrics import MetricsMiddleware, render_metrics
+from .migrations import check_schema, migrate
 from .routers import auth, reminders, admin
-from .scheduler import start_scheduler, stop_scheduler
+from .sms import close_transport
 
 settings = get_settings()
 
@@ -13,11 +17,27 @@ settings = get_settings()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    Base.metadata.create_all(bind=engine)
-    start_scheduler()
+    startup_profile.mark("imports")
+    if settings.auto_migrate:
+        migrate(engine)
+        startup_profile.mark("migrations")
+    else:
+        # Deploys migrate beforehand (python -m app.migrations); this only reads the version
+        await check_schema(async_engine)
+        startup_profile.mark("schema check")
+    if settings.run_scheduler:
+        # Imported here so API-only replicas never load APScheduler
+        from .scheduler import start_scheduler
+        start_scheduler()
+        startup_profile.mark("scheduler")
+    print(startup_profile.report())
     yield
     # Shutdown
-    stop_scheduler()
+    if settings.run_scheduler:
+        from .scheduler import stop_scheduler
+        stop_scheduler()
+    await close_transport()
+    await async_engine.dispose()
 
 
 app = FastAPI(
@@ -34,8 +54,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
+# Outermost, so latency includes CORS and every other middleware
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(auth.router)
 app.include_router(reminders.router)
 app.include_router(admin.router)
@@ -49,3 +73,9 @@ def root():
 @app.get("/health")
 def health():
     return {"status": "healthy"}
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
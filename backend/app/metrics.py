@@ -0,0 +1,104 @@
+import os
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest
+from prometheus_client import multiprocess
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Buckets from 1ms to ~1 min, for everything from a DB query to a backed-up tick
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+LAG_BUCKETS = (0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300, 900, 3600)
+
+SCHEDULER_TICK_SECONDS = Histogram(
+    "nagqueen_scheduler_tick_seconds", "Duration of a scheduler tick", buckets=LATENCY_BUCKETS
+)
+REMINDERS_DUE = Counter(
+    "nagqueen_reminders_due_total", "Reminders picked up by the scheduler"
+)
+REMINDERS_COALESCED = Counter(
+    "nagqueen_reminders_coalesced_total", "Reminders sent inside another reminder's combined message"
+)
+DISPATCH_LAG_SECONDS = Histogram(
+    "nagqueen_dispatch_lag_seconds", "How late reminders were picked up (now - next_run)", buckets=LAG_BUCKETS
+)
+SMS_SEND_SECONDS = Histogram(
+    "nagqueen_sms_send_seconds", "SMS provider call latency (rate limit waits are in sms_throttle_wait_seconds)",
+    buckets=LATENCY_BUCKETS
+)
+SMS_MESSAGES = Counter(
+    "nagqueen_sms_messages_total", "Outbound SMS by result (sent, failed, retried, deferred, dead)", ["result"]
+)
+SMS_THROTTLED = Counter(
+    "nagqueen_sms_throttled_total", "SMS sends that waited for a sender number's rate limit", ["priority"]
+)
+SMS_THROTTLE_WAIT_SECONDS = Counter(
+    "nagqueen_sms_throttle_wait_seconds_total", "Time SMS sends spent waiting on sender rate limits", ["priority"]
+)
+SMS_THROTTLE_REFUSED = Counter(
+    "nagqueen_sms_throttle_refused_total", "SMS sends refused because every sender was limited past the max wait",
+    ["priority"]
+)
+DB_QUERY_SECONDS = Histogram(
+    "nagqueen_db_query_seconds", "Database statement execution time", ["engine"], buckets=LATENCY_BUCKETS
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "nagqueen_http_request_seconds", "HTTP request latency by route", ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS
+)
+
+
+def instrument_engine(engine: Engine, name: str):
+    """Time every statement on `engine` (use async_engine.sync_engine for async engines)."""
+    histogram = DB_QUERY_SECONDS.labels(name)
+
+    # One start time per connection, not a stack: a connection runs one statement at a time, and
+    # a statement that fails (no after_cursor_execute) is simply overwritten by the next one
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_start"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info.pop("query_start", None)
+        if start is not None:
+            histogram.observe(time.perf_counter() - start)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency per route template (not per raw path)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(
+                scope["method"], getattr(route, "path", "unmatched"), str(status_code)
+            ).observe(time.perf_counter() - start)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Exposition for /metrics; aggregates all worker processes when PROMETHEUS_MULTIPROC_DIR is set."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
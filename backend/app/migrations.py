@@ -0,0 +1,183 @@
+import argparse
+from datetime import datetime
+from typing import Callable
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.schema import CreateColumn
+
+from .config import get_settings
+from .database import Base, engine
+from .deliveries import ensure_partitions
+from . import models  # noqa: F401  (registers the tables on Base)
+
+settings = get_settings()
+
+metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String(100), nullable=False),
+    Column("applied_at", DateTime, nullable=False, default=datetime.utcnow),
+)
+
+# Arbitrary key for pg_advisory_lock, so concurrent deploys apply each migration once
+LOCK_KEY = 7262_0021
+
+
+def add_missing_columns(conn: Connection, table_name: str):
+    """ALTER TABLE ... ADD COLUMN for every model column the table doesn't have yet."""
+    table = Base.metadata.tables[table_name]
+    existing = {column["name"] for column in inspect(conn).get_columns(table_name)}
+    for column in table.columns:
+        if column.name not in existing:
+            ddl = CreateColumn(column).compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {ddl}"))
+
+
+def add_missing_indexes(conn: Connection, table_name: str):
+    """Create every model index the table doesn't have yet."""
+    table = Base.metadata.tables[table_name]
+    existing = {index["name"] for index in inspect(conn).get_indexes(table_name)}
+    for index in table.indexes:
+        if index.name not in existing:
+            index.create(conn)
+
+
+def drop_index_if_exists(conn: Connection, table_name: str, index_name: str):
+    if index_name in {index["name"] for index in inspect(conn).get_indexes(table_name)}:
+        conn.execute(text(f"DROP INDEX {index_name}"))
+
+
+def initial_schema(conn: Connection):
+    Base.metadata.create_all(conn)
+
+
+def catch_up_unversioned(conn: Connection):
+    """Bring databases made by the old startup create_all up to date.
+
+    create_all added new tables but never columns or indexes on existing ones, so those are filled in here.
+    """
+    if conn.dialect.name == "postgresql":
+        # Enum values can't be added by create_all either
+        conn.execute(text("ALTER TYPE scheduletype ADD VALUE IF NOT EXISTS 'custom'"))
+    drop_index_if_exists(conn, "otp_codes", "ix_otp_codes_phone_number")
+    for table_name in ("users", "reminders", "reminder_occurrences", "otp_codes", "outbound_messages"):
+        add_missing_columns(conn, table_name)
+        add_missing_indexes(conn, table_name)
+
+
+def admin_listing_indexes(conn: Connection):
+    add_missing_indexes(conn, "users")
+
+
+def deliveries_log(conn: Connection):
+    add_missing_columns(conn, "outbound_messages")
+    Base.metadata.tables["deliveries"].create(conn, checkfirst=True)
+    add_missing_indexes(conn, "deliveries")
+    # The scheduler keeps these ahead from here on
+    ensure_partitions(conn, datetime.utcnow())
+
+
+def reminder_change_index(conn: Connection):
+    add_missing_indexes(conn, "reminders")
+
+
+# (version, name, upgrade), applied in order by `python -m app.migrations` before a deploy goes
+# live; with AUTO_MIGRATE off, API and scheduler processes only check the version at startup and
+# refuse to start on an older one (unless ALLOW_OUTDATED_SCHEMA is set).
+# Append only, and never edit one that has shipped. Version 1 builds the schema from the models,
+# so later migrations must tolerate finding their change already there on a fresh database: use
+# the add_missing_* helpers or IF NOT EXISTS rather than bare ALTERs.
+MIGRATIONS: list[tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "initial schema", initial_schema),
+    (2, "catch up databases created before migrations", catch_up_unversioned),
+    (3, "indexes for the admin user listings", admin_listing_indexes),
+    (4, "deliveries log", deliveries_log),
+    (5, "index for the scheduler's reminder change poll", reminder_change_index),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn: Connection) -> int:
+    """The newest applied migration; 0 for a database that has never been migrated."""
+    if not inspect(conn).has_table(schema_migrations.name):
+        return 0
+    return conn.execute(select(func.max(schema_migrations.c.version))).scalar() or 0
+
+
+def migrate(bind: Engine = engine) -> list[int]:
+    """Apply pending migrations, each in its own transaction; returns the versions applied."""
+    applied = []
+    with bind.connect() as conn:
+        postgres = conn.dialect.name == "postgresql"
+        if postgres:
+            conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": LOCK_KEY})
+            conn.commit()
+        try:
+            with conn.begin():
+                metadata.create_all(conn)
+            for version, name, upgrade in MIGRATIONS:
+                # Re-read per step: another runner may have applied it while we waited for the lock
+                with conn.begin():
+                    if current_version(conn) >= version:
+                        continue
+                    print(f"Applying migration {version}: {name}")
+                    upgrade(conn)
+                    conn.execute(schema_migrations.insert().values(version=version, name=name))
+                applied.append(version)
+        finally:
+            if postgres:
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": LOCK_KEY})
+                conn.commit()
+    return applied
+
+
+class SchemaOutdated(RuntimeError):
+    """The database is behind this release's migrations."""
+
+
+def require_latest(version: int) -> int:
+    """Raise SchemaOutdated if `version` is behind this release, so the process fails at boot
+    rather than on its first query against a missing column; ALLOW_OUTDATED_SCHEMA downgrades
+    that to a warning."""
+    if version < LATEST_VERSION:
+        message = (f"schema is at version {version} but this release expects {LATEST_VERSION}; "
+                   "run `python -m app.migrations` (or, locally, set AUTO_MIGRATE=true)")
+        if not settings.allow_outdated_schema:
+            raise SchemaOutdated(message)
+        print(f"Warning: {message}")
+    return version
+
+
+async def check_schema(bind: AsyncEngine) -> int:
+    """Startup check that the database has this code's migrations (see require_latest). Never migrates."""
+    async with bind.connect() as conn:
+        return require_latest(await conn.run_sync(current_version))
+
+
+def check_schema_sync(bind: Engine = engine) -> int:
+    """check_schema for processes without an event loop, such as the scheduler worker."""
+    with bind.connect() as conn:
+        return require_latest(current_version(conn))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nag Queen schema migrations")
+    parser.add_argument("--status", action="store_true", help="Print the schema version and exit")
+    args = parser.parse_args()
+
+    if args.status:
+        with engine.connect() as conn:
+            version = current_version(conn)
+        print(f"Schema version {version} (latest {LATEST_VERSION})")
+        return
+
+    applied = migrate()
+    print(f"Applied {len(applied)} migration(s); schema is at version {LATEST_VERSION}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, Boolean, Text, ForeignKey, Enum, Time, JSON
+from sqlalchemy import Column, String, DateTime, Boolean, Text, ForeignKey, Enum, Time, JSON, Index, Integer, text
 from sqlalchemy.orm import relationship
 import enum
 
@@ -16,6 +16,20 @@ class ScheduleType(enum.Enum):
     daily = "daily"
     weekly = "weekly"
     monthly = "monthly"
+    custom = "custom"  # Driven by Reminder.recurrence
+
+
+class MessageStatus(enum.Enum):
+    pending = "pending"
+    sent = "sent"
+    dead = "dead"  # Gave up after outbox_max_attempts
+
+
+class DeliveryStatus(enum.Enum):
+    sent = "sent"
+    failed = "failed"  # Will be retried
+    throttled = "throttled"  # Rate limited; deferred without using up an attempt
+    dead = "dead"  # The last attempt failed too
 
 
 class User(Base):
@@ -25,10 +39,17 @@ class User(Base):
     phone_number = Column(String(20), unique=True, nullable=False, index=True)
     is_approved = Column(Boolean, default=False)
     is_admin = Column(Boolean, default=False)
+    timezone = Column(String(64), nullable=False, default="UTC", server_default="UTC")  # Default for new reminders
     created_at = Column(DateTime, default=datetime.utcnow)
 
     reminders = relationship("Reminder", back_populates="user", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Keyset pagination of the admin listings, newest first: all users, and pending ones
+        Index("ix_users_created", "created_at", "id"),
+        Index("ix_users_approved_created", "is_approved", "created_at", "id"),
+    )
+
 
 class Reminder(Base):
     __tablename__ = "reminders"
@@ -40,19 +61,115 @@ class Reminder(Base):
     schedule_time = Column(Time, nullable=False)
     schedule_days = Column(JSON, nullable=True)  # For weekly: [0,1,2,3,4,5,6] = Mon-Sun
     schedule_day_of_month = Column(String(10), nullable=True)  # For monthly: "1", "15", "last"
-    next_run = Column(DateTime, nullable=False)
+    recurrence = Column(JSON, nullable=True)  # For custom: a schemas.Recurrence rule
+    timezone = Column(String(64), nullable=False, default="UTC", server_default="UTC")  # IANA zone of schedule_time
+    next_run = Column(DateTime, nullable=False)  # Always UTC
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Scheduler lease: set while a worker is sending this reminder
+    claimed_by = Column(String(64), nullable=True)
+    claimed_until = Column(DateTime, nullable=True)
+
+    # How far ahead reminder_occurrences has been filled in for this reminder
+    occurrences_until = Column(DateTime, nullable=True)
 
     user = relationship("User", back_populates="reminders")
 
+    __table_args__ = (
+        # Serves the scheduler's due-reminder scan; partial on Postgres so it only holds active rows
+        Index("ix_reminders_due", "is_active", "next_run", postgresql_where=text("is_active")),
+        # Keyset pagination of a user's reminders
+        Index("ix_reminders_user_created", "user_id", "created_at", "id"),
+        # Lets the listing ETag (count + latest change per user) come from the index alone
+        Index("ix_reminders_user_updated", "user_id", "updated_at"),
+        # Serves the scheduler's poll for reminders changed by other processes
+        Index("ix_reminders_updated", "updated_at"),
+        # Finds reminders whose materialized occurrences need topping up
+        Index("ix_reminders_occurrences_until", "occurrences_until", postgresql_where=text("is_active")),
+    )
+
+
+class ReminderOccurrence(Base):
+    """Materialized upcoming run times, so a calendar range is one index scan (see occurrences.py)."""
+    __tablename__ = "reminder_occurrences"
+
+    reminder_id = Column(String(36), ForeignKey("reminders.id", ondelete="CASCADE"), primary_key=True)
+    occurs_at = Column(DateTime, primary_key=True)
+    user_id = Column(String(36), nullable=False)  # Denormalized so the range scan needs no join
+
+    __table_args__ = (
+        Index("ix_reminder_occurrences_user_time", "user_id", "occurs_at"),
+    )
+
 
 class OTPCode(Base):
     __tablename__ = "otp_codes"
 
     id = Column(String(36), primary_key=True, default=generate_uuid)
-    phone_number = Column(String(20), nullable=False, index=True)
+    phone_number = Column(String(20), nullable=False)
     code = Column(String(6), nullable=False)
     expires_at = Column(DateTime, nullable=False)
     used = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Verification reads only a phone's newest code
+        Index("ix_otp_codes_phone_created", "phone_number", "created_at"),
+    )
+
+
+class OutboundMessage(Base):
+    """Outbox row for an SMS; the scheduler enqueues these and the dispatcher delivers them."""
+    __tablename__ = "outbound_messages"
+
+    id = Column(String(36), primary_key=True, default=generate_uuid)
+    idempotency_key = Column(String(128), unique=True, nullable=False)
+    reminder_id = Column(String(36), nullable=True, index=True)
+    phone_number = Column(String(20), nullable=False)
+    body = Column(Text, nullable=False)
+    status = Column(Enum(MessageStatus), nullable=False, default=MessageStatus.pending)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+    # Reminder occurrences this message delivers ({reminder_id, user_id, scheduled_for}), for the deliveries log
+    occurrences = Column(JSON, nullable=True)
+
+    # Dispatcher lease, as on Reminder
+    claimed_by = Column(String(64), nullable=True)
+    claimed_until = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index(
+            "ix_outbound_messages_ready", "status", "next_attempt_at",
+            postgresql_where=text("status = 'pending'")
+        ),
+    )
+
+
+class Delivery(Base):
+    """Append-only log of send attempts, one row per reminder occurrence in the message.
+
+    On Postgres it's range-partitioned by month of sent_at (see deliveries.py), so the partition
+    key is part of the primary key. No foreign keys: writes never touch the reminders table, and
+    the log outlives deleted reminders until retention drops it.
+    """
+    __tablename__ = "deliveries"
+
+    id = Column(String(36), primary_key=True, default=generate_uuid)
+    sent_at = Column(DateTime, primary_key=True)  # When the send was attempted, whatever the outcome
+    reminder_id = Column(String(36), nullable=False)
+    user_id = Column(String(36), nullable=False)
+    scheduled_for = Column(DateTime, nullable=False)  # The occurrence's next_run
+    status = Column(Enum(DeliveryStatus), nullable=False)
+    latency_ms = Column(Integer, nullable=False)  # Provider time to accept or refuse it; rate limit waits excluded
+    error = Column(Text, nullable=True)
+
+    __table_args__ = (
+        # Per-reminder history, newest first; on Postgres every partition gets its own copy
+        Index("ix_deliveries_reminder_sent", "reminder_id", "sent_at", "id"),
+        {"postgresql_partition_by": "RANGE (sent_at)"},
+    )
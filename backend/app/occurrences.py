@@ -0,0 +1,129 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import Row, delete, insert, or_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .config import get_settings
+from .models import Reminder, ReminderOccurrence
+from .recurrence import compile_rule, schedule_recurrence
+
+settings = get_settings()
+
+# How far past the horizon a top-up reaches, so a reminder is only revisited about once a week
+TOP_UP_SLACK = timedelta(days=7)
+
+
+def horizon(now: datetime) -> datetime:
+    """How far ahead reminder_occurrences is guaranteed to be filled in."""
+    return now + timedelta(days=settings.calendar_horizon_days)
+
+
+def expand(reminder: Row | Reminder, after: datetime, until: datetime) -> list[datetime]:
+    """Run times of `reminder` in (after, until], from its rule's cached expansion."""
+    if not reminder.is_active:
+        return []
+    rule = schedule_recurrence(
+        reminder.schedule_type.value, reminder.schedule_days, reminder.schedule_day_of_month, reminder.recurrence
+    )
+    if rule is None:
+        return [reminder.next_run] if after < reminder.next_run <= until else []
+    return compile_rule(rule, reminder.schedule_time, reminder.timezone).between(after, until)
+
+
+def build_top_up(
+    reminders: list,
+    user_ids: list[str],
+    covered_until: list[datetime | None],
+    now: datetime
+) -> tuple[list[dict], list[dict]]:
+    """Occurrence rows extending each reminder's materialized window to the horizon plus slack.
+
+    `covered_until` is how far each reminder is already materialized (None for nothing ahead);
+    ones covered past the horizon are skipped. Returns the rows to insert and the new
+    occurrences_until per reminder id.
+    """
+    until = horizon(now) + TOP_UP_SLACK
+    rows, windows = [], []
+    for reminder, user_id, covered in zip(reminders, user_ids, covered_until):
+        if covered is not None and covered >= horizon(now):
+            continue
+        after = max(covered, now) if covered is not None else now
+        rows += [
+            {"reminder_id": reminder.id, "user_id": user_id, "occurs_at": occurs_at}
+            for occurs_at in expand(reminder, after, until)
+        ]
+        windows.append({"id": reminder.id, "occurrences_until": until})
+    return rows, windows
+
+
+def insert_statement(dialect: str):
+    """INSERT for occurrence rows that skips ones already there."""
+    if dialect == "postgresql":
+        return postgresql.insert(ReminderOccurrence).on_conflict_do_nothing()
+    if dialect == "sqlite":
+        return sqlite.insert(ReminderOccurrence).on_conflict_do_nothing()
+    return insert(ReminderOccurrence)
+
+
+def clear_future(reminder_ids: list[str], now: datetime):
+    """DELETE of occurrences still ahead, for reminders whose schedule changed or stopped."""
+    return delete(ReminderOccurrence).where(
+        ReminderOccurrence.reminder_id.in_(reminder_ids),
+        ReminderOccurrence.occurs_at > now
+    )
+
+
+def top_up(db: Session, reminders: list[Row], now: datetime):
+    """Extend the occurrence windows of scheduler rows (which carry user_id). The caller commits."""
+    rows, windows = build_top_up(
+        reminders,
+        [reminder.user_id for reminder in reminders],
+        [reminder.occurrences_until for reminder in reminders],
+        now
+    )
+    if rows:
+        db.execute(insert_statement(db.get_bind().dialect.name), rows)
+    if windows:
+        db.execute(update(Reminder), windows)
+
+
+def refresh_occurrences(db: Session, now: datetime) -> int:
+    """Top up every active reminder whose window falls short of the horizon, and prune old rows.
+
+    Catches reminders that haven't fired lately; returns how many were topped up.
+    """
+    db.execute(delete(ReminderOccurrence).where(
+        ReminderOccurrence.occurs_at < now - timedelta(days=settings.calendar_retention_days)
+    ))
+    db.commit()
+
+    refreshed = 0
+    after = None
+    while True:
+        query = db.query(
+            Reminder.id,
+            Reminder.user_id,
+            Reminder.schedule_type,
+            Reminder.schedule_time,
+            Reminder.schedule_days,
+            Reminder.schedule_day_of_month,
+            Reminder.recurrence,
+            Reminder.timezone,
+            Reminder.next_run,
+            Reminder.is_active,
+            Reminder.occurrences_until
+        ).filter(
+            Reminder.is_active == True,
+            or_(Reminder.occurrences_until == None, Reminder.occurrences_until < horizon(now))
+        )
+        if after is not None:
+            query = query.filter(Reminder.id > after)
+        batch = query.order_by(Reminder.id).limit(settings.scheduler_batch_size).all()
+        if not batch:
+            return refreshed
+
+        top_up(db, batch, now)
+        db.commit()
+        refreshed += len(batch)
+        after = batch[-1].id
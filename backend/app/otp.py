@@ -0,0 +1,139 @@
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, or_, select, update
+
+from .cache import TTLCache
+from .config import get_settings
+from .database import AsyncSessionLocal
+from .models import OTPCode
+
+settings = get_settings()
+
+
+class OTPStore:
+    """Where issued codes live until they're used. Only a phone's latest code is valid."""
+
+    async def issue(self, phone_number: str, code: str):
+        raise NotImplementedError
+
+    async def consume(self, phone_number: str, code: str) -> bool:
+        """Check `code` and use it up; True at most once per issued code."""
+        raise NotImplementedError
+
+
+class MemoryOTPStore(OTPStore):
+    """Codes in a per-process TTL cache: no DB round trips at all.
+
+    Only for a single web process, since the code has to be verified by the process that
+    issued it. Entries are LRU-bounded, so a flood of requests can't exhaust memory.
+    """
+
+    def __init__(self, ttl: float, max_size: int):
+        self._codes: TTLCache[str, str] = TTLCache(max_size=max_size, ttl=ttl)
+
+    async def issue(self, phone_number: str, code: str):
+        self._codes.set(phone_number, code)
+
+    async def consume(self, phone_number: str, code: str) -> bool:
+        # No await between the check and the delete, so a code can't be used twice
+        expected = self._codes.get(phone_number)
+        if expected is None or not secrets.compare_digest(expected, code):
+            return False
+        self._codes.delete(phone_number)
+        return True
+
+
+class DatabaseOTPStore(OTPStore):
+    """Codes in the otp_codes table, shared by every process.
+
+    Issuing is a single INSERT: rather than marking older codes used, verification only looks
+    at the phone's newest code (one probe of the (phone_number, created_at) index). Used and
+    expired rows are deleted every `purge_interval` seconds, piggybacking on issue().
+    """
+
+    def __init__(self, ttl: float, purge_interval: float):
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self._next_purge = 0.0
+        self._purge_lock = threading.Lock()
+
+    async def issue(self, phone_number: str, code: str):
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as db:
+            db.add(OTPCode(
+                phone_number=phone_number,
+                code=code,
+                expires_at=now + timedelta(seconds=self.ttl),
+                created_at=now
+            ))
+            await db.commit()
+        await self._maybe_purge()
+
+    async def consume(self, phone_number: str, code: str) -> bool:
+        async with AsyncSessionLocal() as db:
+            latest = (await db.execute(
+                select(OTPCode.id, OTPCode.code, OTPCode.used, OTPCode.expires_at)
+                .where(OTPCode.phone_number == phone_number)
+                .order_by(OTPCode.created_at.desc())
+                .limit(1)
+            )).first()
+            if (
+                latest is None
+                or latest.used
+                or latest.expires_at <= datetime.utcnow()
+                or not secrets.compare_digest(latest.code, code)
+            ):
+                return False
+
+            # Conditional, so two concurrent verifications can't both use the code
+            result = await db.execute(
+                update(OTPCode).where(OTPCode.id == latest.id, OTPCode.used == False).values(used=True)
+            )
+            await db.commit()
+            return result.rowcount == 1
+
+    async def purge(self) -> int:
+        """Delete used and expired codes; returns how many."""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                delete(OTPCode).where(or_(OTPCode.used == True, OTPCode.expires_at <= datetime.utcnow()))
+            )
+            await db.commit()
+            return result.rowcount
+
+    async def _maybe_purge(self):
+        with self._purge_lock:
+            if time.monotonic() < self._next_purge:
+                return
+            self._next_purge = time.monotonic() + self.purge_interval
+        try:
+            await self.purge()
+        except Exception as e:
+            print(f"Failed to purge OTP codes: {e}")
+
+
+def create_otp_store() -> OTPStore:
+    ttl = settings.otp_expiration_minutes * 60
+    if settings.otp_store == "memory":
+        return MemoryOTPStore(ttl=ttl, max_size=settings.otp_memory_max_entries)
+    if settings.otp_store == "database":
+        return DatabaseOTPStore(ttl=ttl, purge_interval=settings.otp_purge_interval_seconds)
+    raise ValueError(f"Unknown OTP store: {settings.otp_store}")
+
+
+_store: OTPStore | None = None
+
+
+def get_otp_store() -> OTPStore:
+    global _store
+    if _store is None:
+        _store = create_otp_store()
+    return _store
+
+
+def set_otp_store(store: OTPStore):
+    global _store
+    _store = store
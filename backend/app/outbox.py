@@ -0,0 +1,274 @@
+import hashlib
+import random
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Iterator, Sequence, TypeVar
+
+from sqlalchemy import Row, and_, func, insert, not_, or_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .config import get_settings
+from .deliveries import delivery_rows, record_deliveries
+from .metrics import SMS_MESSAGES
+from .models import DeliveryStatus, MessageStatus, OutboundMessage
+from .sms import SMSError, SMSThrottled, get_transport
+
+settings = get_settings()
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def dispatch(send: Callable[[T], R], items: Sequence[T]) -> Iterator[R]:
+    """Run `send` over items on a bounded thread pool, yielding results in order as they finish."""
+    if not items:
+        return
+
+    workers = max(1, min(settings.sms_dispatch_concurrency, len(items)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sms-dispatch") as pool:
+        yield from pool.map(send, items)
+
+
+def reminder_message_key(reminder_id: str, scheduled_for: datetime) -> str:
+    """One message per reminder occurrence, however many times the occurrence is enqueued."""
+    return f"reminder:{reminder_id}:{scheduled_for.isoformat()}"
+
+
+def coalesced_message_key(reminders: Sequence[Row], part: int) -> str:
+    """reminder_message_key for one part of a combined message: the same occurrences always get the same keys."""
+    occurrences = sorted(f"{reminder.id}@{reminder.next_run.isoformat()}" for reminder in reminders)
+    return f"reminders:{hashlib.sha256('|'.join(occurrences).encode()).hexdigest()[:40]}:{part}"
+
+
+def pack_bodies(messages: Sequence[str], max_chars: int) -> list[tuple[str, int]]:
+    """Messages one per line, in as few bodies of at most `max_chars` as fit; splits only between messages.
+
+    Returns each body with how many of the messages (taken in order) it holds.
+    """
+    bodies, lines, length = [], [], 0
+    for message in messages:
+        line = f"- {message}"
+        if lines and length + 1 + len(line) > max_chars:
+            bodies.append(("\n".join(lines), len(lines)))
+            lines, length = [], 0
+        length += len(line) + (1 if lines else 0)
+        lines.append(line)
+    if lines:
+        bodies.append(("\n".join(lines), len(lines)))
+    return bodies
+
+
+def enqueue_messages(db: Session, messages: list[dict]):
+    """Insert outbox rows, skipping any whose idempotency key is already queued. The caller commits."""
+    if not messages:
+        return
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(OutboundMessage).on_conflict_do_nothing(index_elements=["idempotency_key"])
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(OutboundMessage).on_conflict_do_nothing(index_elements=["idempotency_key"])
+    else:
+        stmt = insert(OutboundMessage)
+    db.execute(stmt, messages)
+
+
+def cancel_messages(condition, reason: str):
+    """UPDATE dead-lettering the pending messages matching `condition`, e.g. those of a reminder that
+    was just deleted or paused, so retries stop. Run it in the same transaction as that change.
+
+    A message already mid-send still goes out (and is then marked sent); its retries don't.
+    """
+    return (
+        update(OutboundMessage)
+        .where(OutboundMessage.status == MessageStatus.pending, condition)
+        .values(status=MessageStatus.dead, last_error=f"Cancelled: {reason}")
+        .execution_options(synchronize_session=False)
+    )
+
+
+def backoff_delay(attempts: int) -> timedelta:
+    """Exponential backoff with jitter, so a provider outage doesn't end in a synchronized retry storm."""
+    delay = min(
+        settings.outbox_backoff_base_seconds * 2 ** (attempts - 1),
+        settings.outbox_backoff_max_seconds
+    )
+    return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+
+def claim_ready_messages(db: Session, now: datetime, limit: int, worker_id: str) -> tuple[list[Row], bool]:
+    """Lease up to `limit` pending messages whose next attempt is due.
+
+    Uses the same SKIP LOCKED + conditional UPDATE scheme as the reminder claim. Returns the
+    claimed rows and whether there were any candidates at all.
+    """
+    query = db.query(OutboundMessage.id).filter(
+        OutboundMessage.status == MessageStatus.pending,
+        OutboundMessage.next_attempt_at <= now,
+        or_(OutboundMessage.claimed_until == None, OutboundMessage.claimed_until < now)
+    ).order_by(OutboundMessage.next_attempt_at, OutboundMessage.id).limit(limit)
+    if db.get_bind().dialect.name == "postgresql":
+        query = query.with_for_update(skip_locked=True)
+
+    candidate_ids = [row.id for row in query]
+    if not candidate_ids:
+        db.commit()
+        return [], False
+
+    claim = f"{worker_id}:{uuid.uuid4().hex[:8]}"
+    db.query(OutboundMessage).filter(
+        OutboundMessage.id.in_(candidate_ids),
+        OutboundMessage.status == MessageStatus.pending,
+        OutboundMessage.next_attempt_at <= now,
+        or_(OutboundMessage.claimed_until == None, OutboundMessage.claimed_until < now)
+    ).update(
+        {"claimed_by": claim, "claimed_until": now + timedelta(seconds=settings.scheduler_lease_seconds)},
+        synchronize_session=False
+    )
+    db.commit()
+
+    claimed = db.query(
+        OutboundMessage.id,
+        OutboundMessage.phone_number,
+        OutboundMessage.body,
+        OutboundMessage.attempts,
+        OutboundMessage.occurrences
+    ).filter(
+        OutboundMessage.id.in_(candidate_ids),
+        OutboundMessage.claimed_by == claim
+    ).order_by(OutboundMessage.next_attempt_at, OutboundMessage.id).all()
+
+    return claimed, True
+
+
+def deliver(message: Row) -> tuple[SMSError | None, float]:
+    """Send one outbox message; returns the error (None on success) and the seconds the provider
+    took to accept or refuse it (any rate limit wait before the call isn't counted)."""
+    try:
+        return None, get_transport().send(message.phone_number, message.body)
+    except SMSError as e:
+        return e, e.seconds
+
+
+def record_results(db: Session, outcomes: list[tuple[Row, SMSError | None, float]]):
+    """Mark sent messages, schedule retries for failures (dead-lettering at the limit), log every
+    attempt to the deliveries table and commit.
+
+    Rate-limited sends are deferred rather than failed: they don't use up an attempt. Sends our own
+    limiter refused never reached the provider, so they aren't logged as attempts either.
+    """
+    now = datetime.utcnow()
+    release = {"claimed_by": None, "claimed_until": None}
+    deliveries = []
+
+    sent = [message.id for message, error, _ in outcomes if error is None]
+    if sent:
+        db.execute(
+            update(OutboundMessage)
+            .where(OutboundMessage.id.in_(sent))
+            .values(
+                status=MessageStatus.sent,
+                attempts=OutboundMessage.attempts + 1,
+                sent_at=now,
+                last_error=None,
+                **release
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    failed = []
+    for message, error, seconds in outcomes:
+        latency_ms = round(seconds * 1000)
+        if error is None:
+            deliveries += delivery_rows(message, DeliveryStatus.sent, now, latency_ms)
+            continue
+        last_error = str(error) or error.__class__.__name__
+        if isinstance(error, SMSThrottled):
+            SMS_MESSAGES.labels("deferred").inc()
+            failed.append({"id": message.id, "last_error": last_error,
+                           "next_attempt_at": now + timedelta(seconds=error.retry_after), **release})
+            if not error.local:
+                deliveries += delivery_rows(message, DeliveryStatus.throttled, now, latency_ms, last_error)
+            continue
+
+        SMS_MESSAGES.labels("failed").inc()
+        attempts = message.attempts + 1
+        if attempts >= settings.outbox_max_attempts:
+            SMS_MESSAGES.labels("dead").inc()
+            print(f"Giving up on SMS to {message.phone_number} after {attempts} attempts: {last_error}")
+            failed.append({"id": message.id, "status": MessageStatus.dead, "attempts": attempts,
+                           "last_error": last_error, **release})
+            deliveries += delivery_rows(message, DeliveryStatus.dead, now, latency_ms, last_error)
+        else:
+            SMS_MESSAGES.labels("retried").inc()
+            failed.append({"id": message.id, "attempts": attempts, "last_error": last_error,
+                           "next_attempt_at": now + backoff_delay(attempts), **release})
+            deliveries += delivery_rows(message, DeliveryStatus.failed, now, latency_ms, last_error)
+    SMS_MESSAGES.labels("sent").inc(len(sent))
+    if failed:
+        # Rows differ in their values, so these go as one executemany by primary key
+        db.execute(update(OutboundMessage), failed)
+
+    record_deliveries(db, deliveries)
+    db.commit()
+
+
+def drain_outbox(db: Session, worker_id: str) -> int:
+    """Deliver every message that is ready to send; returns the number of messages attempted."""
+    now = datetime.utcnow()
+    attempted = 0
+
+    while True:
+        messages, found = claim_ready_messages(db, now, settings.scheduler_batch_size, worker_id)
+        if not found:
+            break
+
+        # Commit as results come in, so a crash mid-batch only re-sends the unwritten chunk
+        chunk = []
+        for message, (error, seconds) in zip(messages, dispatch(deliver, messages)):
+            chunk.append((message, error, seconds))
+            if len(chunk) >= settings.scheduler_writeback_chunk_size:
+                record_results(db, chunk)
+                chunk = []
+        if chunk:
+            record_results(db, chunk)
+        attempted += len(messages)
+
+    return attempted
+
+
+def next_attempt_time(db: Session, now: datetime) -> datetime | None:
+    """When the scheduler should next wake for the outbox, or None if nothing is pending.
+
+    Unleased messages count from their next attempt. A message leased to another worker can't
+    be claimed until its lease lapses, so it counts from claimed_until; otherwise an overdue one
+    would wake this worker over and over while the other one sends it.
+    """
+    leased = and_(OutboundMessage.claimed_until != None, OutboundMessage.claimed_until > now)
+    ready_at, lease_ends = db.query(
+        func.min(OutboundMessage.next_attempt_at).filter(not_(leased)),
+        func.min(OutboundMessage.claimed_until).filter(leased)
+    ).filter(
+        OutboundMessage.status == MessageStatus.pending
+    ).one()
+    candidates = [when for when in (ready_at, lease_ends) if when is not None]
+    return min(candidates) if candidates else None
+
+
+def outbox_stats(db: Session) -> dict:
+    """Queue depth by status, plus how long the oldest pending message has been waiting."""
+    counts = dict(
+        db.query(OutboundMessage.status, func.count()).group_by(OutboundMessage.status).all()
+    )
+    oldest = db.query(func.min(OutboundMessage.created_at)).filter(
+        OutboundMessage.status == MessageStatus.pending
+    ).scalar()
+
+    return {
+        "pending": counts.get(MessageStatus.pending, 0),
+        "sent": counts.get(MessageStatus.sent, 0),
+        "dead": counts.get(MessageStatus.dead, 0),
+        "oldest_pending_seconds": (datetime.utcnow() - oldest).total_seconds() if oldest else None,
+    }
@@ -0,0 +1,45 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Hashable
+
+
+class SlidingWindowLimiter:
+    """Allows `limit` hits per key in any `window` seconds (0 disables).
+
+    Keeps a log of hit times per key, so there's no burst at window boundaries. Keys are
+    LRU-evicted past `max_keys`, which bounds memory when the keys come from attackers. State
+    is per-process: with N web processes a client gets up to N times the limit.
+    """
+
+    def __init__(self, limit: int, window: float, max_keys: int = 100000):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._hits: OrderedDict[Hashable, deque[float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: Hashable) -> float:
+        """Record a hit for `key`; returns 0 if allowed, else seconds until it would be (the hit isn't counted)."""
+        if self.limit <= 0:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            hits = self._hits.get(key)
+            if hits is None:
+                hits = self._hits[key] = deque()
+            self._hits.move_to_end(key)
+            while hits and hits[0] <= now - self.window:
+                hits.popleft()
+
+            if len(hits) >= self.limit:
+                return hits[0] + self.window - now
+
+            hits.append(now)
+            while len(self._hits) > self.max_keys:
+                self._hits.popitem(last=False)
+            return 0.0
+
+    def reset(self, key: Hashable):
+        with self._lock:
+            self._hits.pop(key, None)
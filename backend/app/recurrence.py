@@ -0,0 +1,216 @@
+import calendar
+import json
+import threading
+from bisect import bisect_right
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+
+from .timezones import UTC, get_zone_table
+
+# Most occurrences a rule keeps expanded at once; past this the window restarts at the query
+MAX_CACHED_OCCURRENCES = 2048
+# Consecutive periods without an occurrence before a rule is treated as exhausted
+# (e.g. "5th Friday" only every few months)
+MAX_EMPTY_PERIODS = 60
+# Occurrences expanded beyond what a query needs, so the next few queries are cache hits
+EXPAND_AHEAD = 32
+
+
+def _parse_time(value) -> time:
+    return value if isinstance(value, time) else time.fromisoformat(value)
+
+
+def _parse_date(value) -> date | None:
+    if value is None or isinstance(value, date):
+        return value
+    return date.fromisoformat(value)
+
+
+def _add_months(year: int, month: int, months: int) -> tuple[int, int]:
+    index = year * 12 + month - 1 + months
+    return index // 12, index % 12 + 1
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date | None:
+    """The nth `weekday` (0=Mon) of the month, or the last one for n=-1; None if there's no such day."""
+    first_weekday, days_in_month = calendar.monthrange(year, month)
+    if n == -1:
+        last = days_in_month - (calendar.weekday(year, month, days_in_month) - weekday) % 7
+        return date(year, month, last)
+    day = 1 + (weekday - first_weekday) % 7 + (n - 1) * 7
+    return date(year, month, day) if day <= days_in_month else None
+
+
+class CompiledRule:
+    """A recurrence rule reduced to period arithmetic, with a cached window of expanded occurrences.
+
+    Occurrences are naive UTC datetimes. A rule steps through periods (days, weeks or months,
+    `interval` at a time from `start`) and each period yields its dates times `times` on the
+    zone's wall clock. Rules are shared through compile_rule, so every reminder with the same
+    rule and zone reads the same expansion.
+    """
+
+    def __init__(self, recurrence: dict, schedule_time: time, timezone: str):
+        self.frequency = recurrence["frequency"]
+        self.interval = recurrence.get("interval") or 1
+        self.start = _parse_date(recurrence.get("start")) or date(2000, 1, 1)
+        self.until = _parse_date(recurrence.get("until"))
+        self.count = recurrence.get("count")
+        self.times = tuple(sorted({schedule_time, *(_parse_time(t) for t in recurrence.get("times") or [])}))
+        self.weekdays = tuple(sorted(
+            {day for day in recurrence.get("weekdays") or () if 0 <= day <= 6} or {self.start.weekday()}
+        ))
+        self.month_days = tuple(recurrence.get("month_days") or ())
+        self.nth_weekdays = tuple((item["n"], item["weekday"]) for item in recurrence.get("nth_weekdays") or ())
+        if not self.month_days and not self.nth_weekdays:
+            self.month_days = (str(self.start.day),)
+        self.zone = get_zone_table(timezone) if timezone and timezone != UTC else None
+
+        self._week_start = self.start - timedelta(days=self.start.weekday())
+        self._lock = threading.Lock()
+        self._occurrences: list[datetime] = []
+        self._first_period = 0
+        self._next_period = 0
+        self._exhausted = False
+
+    def _period_of(self, day: date) -> int:
+        if self.frequency == "daily":
+            return max((day - self.start).days // self.interval, 0)
+        if self.frequency == "weekly":
+            return max((day - self._week_start).days // 7 // self.interval, 0)
+        months = (day.year - self.start.year) * 12 + day.month - self.start.month
+        return max(months // self.interval, 0)
+
+    def _dates(self, period: int) -> list[date]:
+        if self.frequency == "daily":
+            return [self.start + timedelta(days=period * self.interval)]
+        if self.frequency == "weekly":
+            monday = self._week_start + timedelta(weeks=period * self.interval)
+            return [monday + timedelta(days=weekday) for weekday in self.weekdays]
+
+        year, month = _add_months(self.start.year, self.start.month, period * self.interval)
+        last_day = calendar.monthrange(year, month)[1]
+        days = {
+            date(year, month, last_day if day == "last" else min(int(day), last_day))
+            for day in self.month_days
+        }
+        for n, weekday in self.nth_weekdays:
+            day = _nth_weekday(year, month, weekday, n)
+            if day is not None:
+                days.add(day)
+        return sorted(days)
+
+    def _expand_period(self, period: int) -> list[datetime] | None:
+        """Occurrences in one period (start/until applied); None once the period is past `until`."""
+        dates = self._dates(period)
+        if self.until is not None and dates and dates[0] > self.until:
+            return None
+        occurrences = []
+        for day in dates:
+            if day < self.start or (self.until is not None and day > self.until):
+                continue
+            for moment in self.times:
+                local = datetime.combine(day, moment)
+                occurrences.append(self.zone.to_utc(local) if self.zone else local)
+        return occurrences
+
+    def _reset(self, period: int):
+        self._occurrences = []
+        self._first_period = self._next_period = period
+        self._exhausted = False
+
+    def _extend(self):
+        """Expand the next period into the window."""
+        empty = 0
+        while not self._exhausted:
+            occurrences = self._expand_period(self._next_period)
+            self._next_period += 1
+            if occurrences is None:
+                self._exhausted = True
+            elif occurrences:
+                self._occurrences.extend(occurrences)
+                if self.count is not None and len(self._occurrences) >= self.count:
+                    del self._occurrences[self.count:]
+                    self._exhausted = True
+                return
+            else:
+                empty += 1
+                if empty >= MAX_EMPTY_PERIODS:
+                    self._exhausted = True
+
+    def _window_after(self, after: datetime, needed: int) -> list[datetime]:
+        """Up to `needed` occurrences later than `after`, expanding the cached window as required."""
+        with self._lock:
+            if self.count is None:
+                # Counted rules are enumerated from the start; others jump to the query's period
+                local = self.zone.to_local(after) if self.zone else after
+                period = self._period_of(local.date() - timedelta(days=1))
+                if (
+                    period < self._first_period
+                    or (period > self._next_period and not self._exhausted)
+                    or len(self._occurrences) > MAX_CACHED_OCCURRENCES
+                    or (not self._occurrences and not self._exhausted)
+                ):
+                    self._reset(period)
+
+            index = bisect_right(self._occurrences, after)
+            if len(self._occurrences) - index < needed:
+                # Top up past what's needed, so the next few calls are pure lookups
+                while len(self._occurrences) - index < needed + EXPAND_AHEAD and not self._exhausted:
+                    self._extend()
+                    index = bisect_right(self._occurrences, after)
+            return self._occurrences[index:index + needed]
+
+    def next_after(self, after: datetime) -> datetime | None:
+        upcoming = self._window_after(after, 1)
+        return upcoming[0] if upcoming else None
+
+    def upcoming(self, after: datetime, limit: int) -> list[datetime]:
+        return self._window_after(after, limit)
+
+    def between(self, after: datetime, until: datetime) -> list[datetime]:
+        """Occurrences in (after, until], a window-sized chunk at a time."""
+        occurrences = []
+        while True:
+            chunk = self._window_after(after, EXPAND_AHEAD)
+            for occurrence in chunk:
+                if occurrence > until:
+                    return occurrences
+                occurrences.append(occurrence)
+            if len(chunk) < EXPAND_AHEAD:
+                return occurrences
+            after = chunk[-1]
+
+
+@lru_cache(maxsize=4096)
+def _compile(recurrence_json: str, schedule_time: time, timezone: str) -> CompiledRule:
+    return CompiledRule(json.loads(recurrence_json), schedule_time, timezone)
+
+
+def rule_key(recurrence: dict) -> str:
+    """Canonical form of a recurrence, for caching and batching."""
+    return json.dumps(recurrence, sort_keys=True, default=str)
+
+
+def compile_rule(recurrence: dict | str, schedule_time: time, timezone: str | None = None) -> CompiledRule:
+    """The shared compiled form of a rule (accepts a dict or its rule_key)."""
+    key = recurrence if isinstance(recurrence, str) else rule_key(recurrence)
+    return _compile(key, schedule_time, timezone or UTC)
+
+
+def schedule_recurrence(
+    schedule_type: str,
+    schedule_days: list[int] | None,
+    schedule_day_of_month: str | None,
+    recurrence: dict | None
+) -> dict | None:
+    """A classic schedule as a recurrence rule, so every type can be expanded; None for once."""
+    if schedule_type == "custom":
+        return recurrence
+    if schedule_type == "daily":
+        return {"frequency": "daily"}
+    if schedule_type == "weekly":
+        return {"frequency": "weekly", "weekdays": schedule_days or [0]}
+    if schedule_type == "monthly":
+        return {"frequency": "monthly", "month_days": [schedule_day_of_month or "1"]}
+    return None
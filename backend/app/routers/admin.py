@@ -1,81 +1,197 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import delete, func, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
-from ..database import get_db
-from ..schemas import UserResponse
-from ..auth import get_admin_user
-from ..models import User
+from ..cache import TTLCache
+from ..config import get_settings
+from ..database import get_async_db, get_read_db
+from ..schemas import UserResponse, OutboxStats, AdminStats, UserIds, BulkUserResult
+from ..auth import AuthUser, get_admin_user, invalidate_user
+from ..models import OutboundMessage, Reminder, User
+from ..outbox import cancel_messages, outbox_stats
+from ..pagination import encode_cursor, decode_cursor
+from ..serialization import USER_LIST, list_response
+
+settings = get_settings()
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
+USER_COLUMNS = (User.id, User.phone_number, User.is_approved, User.is_admin, User.timezone, User.created_at)
+
+stats_cache: TTLCache[str, dict] = TTLCache(max_size=1, ttl=settings.admin_stats_cache_seconds)
+
+
+async def list_page(db: AsyncSession, query, cursor: str | None, limit: int) -> Response:
+    """One page of users newest first, keyed on (created_at, id); the next page's cursor goes in X-Next-Cursor."""
+    if cursor is not None:
+        query = query.where(tuple_(User.created_at, User.id) < decode_cursor(cursor))
+    rows = (await db.execute(query.order_by(User.created_at.desc(), User.id.desc()).limit(limit + 1))).all()
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return list_response(rows, USER_LIST, headers)
+
 
 @router.get("/users", response_model=List[UserResponse])
-def list_users(
-    current_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db)
+async def list_users(
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=500),
+    current_user: AuthUser = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """List all users (admin only)."""
-    return db.query(User).order_by(User.created_at.desc()).all()
+    """List users newest first, a page at a time (admin only)."""
+    return await list_page(db, select(*USER_COLUMNS), cursor, limit)
 
 
 @router.get("/users/pending", response_model=List[UserResponse])
-def list_pending_users(
-    current_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db)
+async def list_pending_users(
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=500),
+    current_user: AuthUser = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """List users awaiting approval (admin only)."""
-    return db.query(User).filter(User.is_approved == False).order_by(User.created_at.desc()).all()
+    """List users awaiting approval newest first, a page at a time (admin only)."""
+    return await list_page(db, select(*USER_COLUMNS).where(User.is_approved == False), cursor, limit)
+
+
+@router.get("/stats", response_model=AdminStats)
+async def get_stats(
+    current_user: AuthUser = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """User and reminder counts (admin only), cached for admin_stats_cache_seconds."""
+    stats = stats_cache.get("stats")
+    if stats is None:
+        users, approved, admins = (await db.execute(select(
+            func.count(),
+            func.count().filter(User.is_approved == True),
+            func.count().filter(User.is_admin == True)
+        ))).one()
+        reminders, active = (await db.execute(select(
+            func.count(),
+            func.count().filter(Reminder.is_active == True)
+        ))).one()
+        stats = {
+            "users": users,
+            "approved_users": approved,
+            "pending_users": users - approved,
+            "admins": admins,
+            "reminders": reminders,
+            "active_reminders": active,
+            "generated_at": datetime.utcnow(),
+        }
+        stats_cache.set("stats", stats)
+    return stats
+
+
+@router.post("/users/approve", response_model=BulkUserResult)
+async def approve_users(
+    body: UserIds,
+    current_user: AuthUser = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Approve many pending users with one UPDATE (admin only)."""
+    result = await db.execute(
+        update(User)
+        .where(User.id.in_(body.user_ids), User.is_approved == False)
+        .values(is_approved=True)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    for user_id in body.user_ids:
+        invalidate_user(user_id)
+    stats_cache.clear()
+    return {"count": result.rowcount}
+
+
+@router.post("/users/reject", response_model=BulkUserResult)
+async def reject_users(
+    body: UserIds,
+    current_user: AuthUser = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Delete many pending users with one DELETE (admin only). Approved users and admins are skipped,
+    so there are no reminders to cascade to."""
+    result = await db.execute(
+        delete(User)
+        .where(User.id.in_(body.user_ids), User.is_approved == False, User.is_admin == False)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    for user_id in body.user_ids:
+        invalidate_user(user_id)
+    stats_cache.clear()
+    return {"count": result.rowcount}
 
 
 @router.post("/users/{user_id}/approve", response_model=UserResponse)
-def approve_user(
+async def approve_user(
     user_id: str,
-    current_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db)
+    current_user: AuthUser = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Approve a pending user (admin only)."""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.scalar(select(User).where(User.id == user_id))
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
     user.is_approved = True
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
+    invalidate_user(user_id)
+    stats_cache.clear()
     return user
 
 
 @router.post("/users/{user_id}/reject", status_code=status.HTTP_204_NO_CONTENT)
-def reject_user(
+async def reject_user(
     user_id: str,
-    current_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db)
+    current_user: AuthUser = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Reject and delete a pending user (admin only)."""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.scalar(select(User).where(User.id == user_id))
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
     if user.is_admin:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot delete admin user")
 
-    db.delete(user)
-    db.commit()
+    # Everything still queued for them, combined reminder messages included
+    await db.execute(cancel_messages(OutboundMessage.phone_number == user.phone_number, "user deleted"))
+    await db.delete(user)
+    await db.commit()
+    invalidate_user(user_id)
+    stats_cache.clear()
 
 
 @router.post("/users/{user_id}/make-admin", response_model=UserResponse)
-def make_admin(
+async def make_admin(
     user_id: str,
-    current_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db)
+    current_user: AuthUser = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Make a user an admin (admin only)."""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.scalar(select(User).where(User.id == user_id))
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
     user.is_admin = True
     user.is_approved = True
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
+    invalidate_user(user_id)
+    stats_cache.clear()
     return user
+
+
+@router.get("/outbox", response_model=OutboxStats)
+async def get_outbox_stats(
+    current_user: AuthUser = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Outbound SMS queue depth (admin only)."""
+    return await db.run_sync(outbox_stats)
@@ -1,19 +1,49 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from dataclasses import replace
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..database import get_db
-from ..schemas import OTPRequest, OTPVerify, Token, UserResponse
-from ..auth import create_otp, verify_otp, get_or_create_user, create_access_token, get_current_user
-from ..sms import send_otp
+from ..config import get_settings
+from ..database import get_async_db
 from ..models import User
+from ..schemas import OTPRequest, OTPVerify, Token, UserResponse, UserUpdate
+from ..auth import (
+    AuthUser, create_otp, verify_otp, get_or_create_user, create_access_token, get_current_user,
+    enforce_rate_limits, otp_request_limits, otp_verify_limits, invalidate_user
+)
+from ..sms import send_otp_async
+
+settings = get_settings()
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
+def client_ip(http_request: Request) -> str:
+    """The address per-IP limits are keyed on.
+
+    Behind trusted_proxy_hops proxies, each appends the address it saw to X-Forwarded-For, so
+    the client is that many entries from the right. Entries left of it are client-supplied and
+    never used, so rotating the header can't get around the limits.
+    """
+    if settings.trusted_proxy_hops:
+        forwarded = [
+            hop.strip()
+            for header in http_request.headers.getlist("x-forwarded-for")
+            for hop in header.split(",")
+            if hop.strip()
+        ]
+        if forwarded:
+            return forwarded[-min(settings.trusted_proxy_hops, len(forwarded))]
+    return http_request.client.host if http_request.client else "unknown"
+
+
 @router.post("/request-otp")
-def request_otp(request: OTPRequest, db: Session = Depends(get_db)):
-    code = create_otp(db, request.phone_number)
-    success = send_otp(request.phone_number, code)
+async def request_otp(request: OTPRequest, http_request: Request):
+    ip_limit, phone_limit = otp_request_limits
+    enforce_rate_limits((ip_limit, client_ip(http_request)), (phone_limit, request.phone_number))
+
+    code = await create_otp(request.phone_number)
+    success = await send_otp_async(request.phone_number, code)
 
     if not success:
         raise HTTPException(
@@ -25,19 +55,38 @@ def request_otp(request: OTPRequest, db: Session = Depends(get_db)):
 
 
 @router.post("/verify-otp", response_model=Token)
-def verify_otp_endpoint(request: OTPVerify, db: Session = Depends(get_db)):
-    if not verify_otp(db, request.phone_number, request.code):
+async def verify_otp_endpoint(
+    request: OTPVerify,
+    http_request: Request,
+    db: AsyncSession = Depends(get_async_db)
+):
+    ip_limit, phone_limit = otp_verify_limits
+    enforce_rate_limits((ip_limit, client_ip(http_request)), (phone_limit, request.phone_number))
+
+    if not await verify_otp(request.phone_number, request.code):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired OTP"
         )
 
-    user = get_or_create_user(db, request.phone_number)
+    user = await get_or_create_user(db, request.phone_number)
     token = create_access_token(user.id)
 
     return Token(access_token=token)
 
 
 @router.get("/me", response_model=UserResponse)
-def get_me(current_user: User = Depends(get_current_user)):
+async def get_me(current_user: AuthUser = Depends(get_current_user)):
     return current_user
+
+
+@router.put("/me", response_model=UserResponse)
+async def update_me(
+    update_request: UserUpdate,
+    current_user: AuthUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    await db.execute(update(User).where(User.id == current_user.id).values(timezone=update_request.timezone))
+    await db.commit()
+    invalidate_user(current_user.id)
+    return replace(current_user, timezone=update_request.timezone)
@@ -1,129 +1,404 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
-import calendar
-
-from ..database import get_db
-from ..schemas import ReminderCreate, ReminderUpdate, ReminderResponse
-from ..auth import get_approved_user
-from ..models import User, Reminder, ScheduleType
+import zlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import delete, func, insert, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import bulk, occurrences
+from ..config import get_settings
+from ..database import AsyncSessionLocal, get_async_db, get_read_db
+from ..schemas import (
+    ReminderCreate, ReminderImport, ReminderUpdate, ReminderResponse, ScheduleType, BulkImportResult, Recurrence,
+    UpcomingOccurrences, CalendarEntry, DeliveryResponse
+)
+from ..auth import AuthUser, get_approved_user
+from ..models import Delivery, OutboundMessage, Reminder, ReminderOccurrence, generate_uuid
+from ..models import ScheduleType as ModelScheduleType
+from ..fire_queue import fire_queue
+from ..outbox import cancel_messages
+from ..schedule import calculate_next_run
+from ..recurrence import compile_rule, schedule_recurrence
+from ..timezones import local_now
+from ..pagination import encode_cursor, decode_cursor
+from ..serialization import CALENDAR, DELIVERY_LIST, REMINDER_LIST, list_response
+
+settings = get_settings()
 
 router = APIRouter(prefix="/reminders", tags=["reminders"])
 
+MAX_IMPORT_ERRORS = 1000
 
-def calculate_next_run(
-    schedule_type: ScheduleType,
-    schedule_time,
-    schedule_days: list[int] | None = None,
-    schedule_day_of_month: str | None = None,
-    schedule_date = None
-) -> datetime:
-    now = datetime.utcnow()
-    today = now.date()
 
-    # For one-time reminders with a specific date
-    if schedule_type.value == "once" and schedule_date:
-        return datetime.combine(schedule_date, schedule_time)
+# Columns ReminderResponse needs, selected directly so listings skip ORM hydration
+RESPONSE_COLUMNS = (
+    Reminder.id,
+    Reminder.message,
+    Reminder.schedule_type,
+    Reminder.schedule_time,
+    Reminder.schedule_days,
+    Reminder.schedule_day_of_month,
+    Reminder.recurrence,
+    Reminder.timezone,
+    Reminder.next_run,
+    Reminder.is_active,
+    Reminder.created_at,
+)
 
-    # Combine today's date with the schedule time
-    next_run = datetime.combine(today, schedule_time)
 
-    # If the time has already passed today, start from tomorrow
-    if next_run <= now:
-        next_run += timedelta(days=1)
+# Fields whose change moves next_run
+SCHEDULE_FIELDS = (
+    "schedule_type", "schedule_time", "schedule_days", "schedule_day_of_month", "recurrence", "timezone"
+)
 
-    if schedule_type.value == "once":
-        return next_run
 
-    elif schedule_type.value == "daily":
-        return next_run
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
 
-    elif schedule_type.value == "weekly":
-        if not schedule_days:
-            schedule_days = [0]  # Default to Monday
 
-        # Find the next valid day
-        for _ in range(7):
-            if next_run.weekday() in schedule_days:
-                return next_run
-            next_run += timedelta(days=1)
+@router.get("", response_model=list[ReminderResponse])
+async def list_reminders(
+    request: Request,
+    is_active: bool | None = None,
+    schedule_type: ScheduleType | None = None,
+    next_run_from: datetime | None = None,
+    next_run_to: datetime | None = None,
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=500),
+    current_user: AuthUser = Depends(get_approved_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """List reminders oldest first, a page at a time; the next page's cursor is in X-Next-Cursor.
+
+    The rows are serialized as they come from the database (see serialization.py), so headers
+    go on the returned response.
+    """
+    # Weak ETag from the user's reminder count and latest change, plus the query itself
+    count, last_updated = (await db.execute(
+        select(func.count(), func.max(Reminder.updated_at)).where(Reminder.user_id == current_user.id)
+    )).one()
+    etag = f'W/"{count}-{last_updated.timestamp() if last_updated else 0}-{zlib.crc32(request.url.query.encode()):x}"'
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    query = select(*RESPONSE_COLUMNS).where(Reminder.user_id == current_user.id)
+    if is_active is not None:
+        query = query.where(Reminder.is_active == is_active)
+    if schedule_type is not None:
+        query = query.where(Reminder.schedule_type == schedule_type.value)
+    if next_run_from is not None:
+        query = query.where(Reminder.next_run >= as_utc(next_run_from))
+    if next_run_to is not None:
+        query = query.where(Reminder.next_run < as_utc(next_run_to))
+    if cursor is not None:
+        query = query.where(tuple_(Reminder.created_at, Reminder.id) > decode_cursor(cursor))
+
+    # One extra row tells us whether there's another page
+    rows = (await db.execute(query.order_by(Reminder.created_at, Reminder.id).limit(limit + 1))).all()
+    headers = {"ETag": etag}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return list_response(rows, REMINDER_LIST, headers)
+
+
+def stored_recurrence(recurrence: Recurrence | None, timezone: str) -> dict | None:
+    """A rule as stored on the reminder: JSON-ready, with `start` pinned to today in its zone if unset.
+
+    Pinning the start keeps "every 3 days" and counts anchored to when the rule was set up.
+    """
+    if recurrence is None:
+        return None
+    rule = recurrence.model_dump(mode="json")
+    if rule["start"] is None:
+        rule["start"] = local_now(timezone).date().isoformat()
+    return rule
+
+
+async def materialize_occurrences(
+    db: AsyncSession,
+    reminders: list[Reminder],
+    user_id: str,
+    replace: bool = False
+):
+    """Fill in the calendar occurrences of reminders whose schedule was just set, and their
+    occurrences_until. With `replace`, upcoming rows from the old schedule go first. The caller commits.
 
-    elif schedule_type.value == "monthly":
-        day = schedule_day_of_month or "1"
+    Expansion happens before anything is written, so the write transaction stays short.
+    """
+    now = datetime.utcnow()
+    rows, windows = occurrences.build_top_up(reminders, [user_id] * len(reminders), [None] * len(reminders), now)
+    until = {window["id"]: window["occurrences_until"] for window in windows}
+    for reminder in reminders:
+        reminder.occurrences_until = until.get(reminder.id)
+    # The session doesn't autoflush: the reminder rows must exist before their occurrences
+    await db.flush()
+
+    if replace:
+        await db.execute(occurrences.clear_future([reminder.id for reminder in reminders], now))
+    if rows:
+        await db.execute(occurrences.insert_statement(db.bind.dialect.name), rows)
+
+
+def describe_error(e: Exception) -> str:
+    if isinstance(e, ValidationError):
+        return "; ".join(f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in e.errors())
+    return str(e)
+
+
+def import_row(reminder: ReminderImport, user: AuthUser, now: datetime) -> dict:
+    """The reminders row for one imported reminder. Raises ValueError if its schedule can't be
+    worked out, so the row is reported rather than failing its chunk."""
+    schedule_type = ModelScheduleType(reminder.schedule_type.value)
+    timezone = reminder.timezone or user.timezone
+    recurrence = stored_recurrence(reminder.recurrence, timezone) if schedule_type == ModelScheduleType.custom else None
+    next_run = calculate_next_run(
+        schedule_type,
+        reminder.schedule_time,
+        reminder.schedule_days,
+        reminder.schedule_day_of_month,
+        reminder.schedule_date,
+        timezone,
+        recurrence,
+        now=now
+    )
+    return {
+        "id": generate_uuid(),
+        "user_id": user.id,
+        "message": reminder.message,
+        "schedule_type": schedule_type,
+        "schedule_time": reminder.schedule_time,
+        "schedule_days": reminder.schedule_days,
+        "schedule_day_of_month": reminder.schedule_day_of_month,
+        "recurrence": recurrence,
+        "timezone": timezone,
+        # A rule that has already run its course is imported paused
+        "next_run": next_run or now,
+        "is_active": reminder.is_active and next_run is not None,
+    }
+
+
+async def insert_reminders(db: AsyncSession, user: AuthUser, rows: list[dict]):
+    """Insert prepared reminder rows with one executemany, with their calendar occurrences, and commit."""
+    # Calendar occurrences, expanded from transient objects before the rows go in
+    occurrence_rows, windows = occurrences.build_top_up(
+        [Reminder(**row) for row in rows], [user.id] * len(rows), [None] * len(rows), datetime.utcnow()
+    )
+    until = {window["id"]: window["occurrences_until"] for window in windows}
+    for row in rows:
+        row["occurrences_until"] = until.get(row["id"])
 
-        for _ in range(12):  # Try up to 12 months
-            year = next_run.year
-            month = next_run.month
-            last_day = calendar.monthrange(year, month)[1]
+    await db.execute(insert(Reminder), rows)
+    if occurrence_rows:
+        await db.execute(occurrences.insert_statement(db.bind.dialect.name), occurrence_rows)
+    await db.commit()
 
-            if day == "last":
-                target_day = last_day
-            else:
-                target_day = min(int(day), last_day)
+    for row in rows:
+        if row["is_active"]:
+            fire_queue.schedule(row["id"], row["next_run"])
 
-            candidate = datetime(year, month, target_day, schedule_time.hour, schedule_time.minute)
 
-            if candidate > now:
-                return candidate
+@router.post("/import", response_model=BulkImportResult)
+async def import_reminders(
+    request: Request,
+    current_user: AuthUser = Depends(get_approved_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Create reminders from a streamed NDJSON body, or CSV with `Content-Type: text/csv`.
+
+    Rows are validated like POST /reminders and inserted in chunks, each committed on its own,
+    so a bad row doesn't sink the rest; invalid rows are reported by line number.
+    """
+    is_csv = request.headers.get("content-type", "").startswith("text/csv")
+    header = None
+    batch: list[dict] = []
+    created = 0
+    seen = 0
+    errors = []
+    errors_truncated = False
+
+    def add_error(line_number: int, e: Exception):
+        nonlocal errors_truncated
+        if len(errors) < MAX_IMPORT_ERRORS:
+            errors.append({"line": line_number, "error": describe_error(e)})
+        else:
+            errors_truncated = True
+
+    lines = bulk.iter_lines(request.stream())
+    records = bulk.iter_csv_records(lines) if is_csv else bulk.iter_records(lines)
+    now = datetime.utcnow()
+    line_number = 0
+    while True:
+        # Only reading the body is guarded here: an insert that fails is a server error, not a bad row
+        try:
+            line_number, record = await anext(records)
+        except StopAsyncIteration:
+            break
+        except (ValueError, UnicodeDecodeError) as e:
+            # Unreadable body (oversized line, bad encoding): keep what was already committed
+            add_error(line_number + 1, e)
+            break
+
+        if is_csv and header is None:
+            try:
+                header = bulk.parse_csv_header(record)
+            except ValueError as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+            continue
+
+        seen += 1
+        if seen > settings.bulk_import_max_rows:
+            add_error(line_number, ValueError(f"Import is limited to {settings.bulk_import_max_rows} rows"))
+            break
+
+        try:
+            row = bulk.parse_csv(record, header) if is_csv else bulk.parse_ndjson(record)
+            batch.append(import_row(ReminderImport.model_validate(row), current_user, now))
+        except ValueError as e:
+            add_error(line_number, e)
+            continue
+
+        if len(batch) >= settings.bulk_import_chunk_size:
+            await insert_reminders(db, current_user, batch)
+            created += len(batch)
+            batch = []
+
+    if batch:
+        await insert_reminders(db, current_user, batch)
+        created += len(batch)
+
+    return {"created": created, "errors": errors, "errors_truncated": errors_truncated}
+
+
+@router.get("/export")
+async def export_reminders(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    current_user: AuthUser = Depends(get_approved_user)
+):
+    """Stream all of the user's reminders as NDJSON or CSV, in a format /reminders/import accepts."""
+    user_id = current_user.id
+
+    async def body():
+        # The session lives in the generator: request-scoped dependencies close before streaming starts
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(
+                select(*RESPONSE_COLUMNS)
+                .where(Reminder.user_id == user_id)
+                .order_by(Reminder.created_at, Reminder.id)
+                .execution_options(yield_per=500)
+            )
+            if format == "csv":
+                yield bulk.csv_header()
+            async for rows in result.partitions():
+                yield bulk.to_csv(rows) if format == "csv" else bulk.to_ndjson(rows)
+
+    return StreamingResponse(
+        body(),
+        media_type="text/csv" if format == "csv" else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="reminders.{format}"'}
+    )
 
-            # Move to next month
-            if month == 12:
-                next_run = datetime(year + 1, 1, 1, schedule_time.hour, schedule_time.minute)
-            else:
-                next_run = datetime(year, month + 1, 1, schedule_time.hour, schedule_time.minute)
 
-    return next_run
+def as_utc(value: datetime) -> datetime:
+    """Naive UTC, as stored, from a query parameter that may carry an offset."""
+    return value.astimezone(dt_timezone.utc).replace(tzinfo=None) if value.tzinfo else value
 
 
-@router.get("", response_model=list[ReminderResponse])
-def list_reminders(
-    current_user: User = Depends(get_approved_user),
-    db: Session = Depends(get_db)
+@router.get("/calendar", response_model=list[CalendarEntry])
+async def calendar(
+    start: datetime = Query(..., alias="from"),
+    end: datetime = Query(..., alias="to"),
+    current_user: AuthUser = Depends(get_approved_user),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    reminders = db.query(Reminder).filter(Reminder.user_id == current_user.id).all()
-    return reminders
+    """Every run of the user's reminders in [from, to), in time order, from reminder_occurrences.
+
+    Occurrences are materialized calendar_horizon_days ahead and kept calendar_retention_days
+    back, so that's the range this can answer.
+    """
+    start, end = as_utc(start), as_utc(end)
+    if end <= start:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'to' must be after 'from'")
+    if end - start > timedelta(days=settings.calendar_horizon_days + settings.calendar_retention_days):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Calendar range is too long")
+
+    rows = await db.execute(
+        select(ReminderOccurrence.reminder_id, ReminderOccurrence.occurs_at, Reminder.message)
+        .join(Reminder, Reminder.id == ReminderOccurrence.reminder_id)
+        .where(
+            ReminderOccurrence.user_id == current_user.id,
+            ReminderOccurrence.occurs_at >= start,
+            ReminderOccurrence.occurs_at < end
+        )
+        .order_by(ReminderOccurrence.occurs_at, ReminderOccurrence.reminder_id)
+    )
+    return list_response(rows, CALENDAR)
 
 
 @router.post("", response_model=ReminderResponse, status_code=status.HTTP_201_CREATED)
-def create_reminder(
+async def create_reminder(
     reminder: ReminderCreate,
-    current_user: User = Depends(get_approved_user),
-    db: Session = Depends(get_db)
+    current_user: AuthUser = Depends(get_approved_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
+    timezone = reminder.timezone or current_user.timezone
+    recurrence = None
+    if reminder.schedule_type == ScheduleType.custom:
+        recurrence = stored_recurrence(reminder.recurrence, timezone)
     next_run = calculate_next_run(
         reminder.schedule_type,
         reminder.schedule_time,
         reminder.schedule_days,
         reminder.schedule_day_of_month,
-        reminder.schedule_date
+        reminder.schedule_date,
+        timezone,
+        recurrence
     )
+    if next_run is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Recurrence has no upcoming occurrences"
+        )
 
     db_reminder = Reminder(
+        id=generate_uuid(),
         user_id=current_user.id,
         message=reminder.message,
         schedule_type=reminder.schedule_type,
         schedule_time=reminder.schedule_time,
         schedule_days=reminder.schedule_days,
         schedule_day_of_month=reminder.schedule_day_of_month,
-        next_run=next_run
+        recurrence=recurrence,
+        timezone=timezone,
+        next_run=next_run,
+        is_active=True
     )
     db.add(db_reminder)
-    db.commit()
-    db.refresh(db_reminder)
+    await materialize_occurrences(db, [db_reminder], current_user.id)
+    await db.commit()
+    await db.refresh(db_reminder)
+    fire_queue.schedule(db_reminder.id, db_reminder.next_run)
 
     return db_reminder
 
 
 @router.get("/{reminder_id}", response_model=ReminderResponse)
-def get_reminder(
+async def get_reminder(
     reminder_id: str,
-    current_user: User = Depends(get_approved_user),
-    db: Session = Depends(get_db)
+    current_user: AuthUser = Depends(get_approved_user),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    reminder = db.query(Reminder).filter(
-        Reminder.id == reminder_id,
-        Reminder.user_id == current_user.id
-    ).first()
+    reminder = await db.scalar(
+        select(Reminder).where(
+            Reminder.id == reminder_id,
+            Reminder.user_id == current_user.id
+        )
+    )
 
     if not reminder:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Reminder not found")
@@ -131,54 +406,160 @@ def get_reminder(
     return reminder
 
 
+@router.get("/{reminder_id}/upcoming", response_model=UpcomingOccurrences)
+async def preview_upcoming(
+    reminder_id: str,
+    limit: int = Query(10, ge=1, le=100),
+    current_user: AuthUser = Depends(get_approved_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """The reminder's next `limit` run times (UTC), read from the rule's cached expansion."""
+    reminder = (await db.execute(
+        select(*RESPONSE_COLUMNS).where(
+            Reminder.id == reminder_id,
+            Reminder.user_id == current_user.id
+        )
+    )).first()
+
+    if not reminder:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Reminder not found")
+
+    occurrences = []
+    if reminder.is_active:
+        occurrences.append(reminder.next_run)
+        rule = schedule_recurrence(
+            reminder.schedule_type.value, reminder.schedule_days, reminder.schedule_day_of_month, reminder.recurrence
+        )
+        if rule is not None:
+            occurrences += compile_rule(rule, reminder.schedule_time, reminder.timezone).upcoming(
+                reminder.next_run, limit - 1
+            )
+
+    return {"reminder_id": reminder.id, "occurrences": occurrences}
+
+
+@router.get("/{reminder_id}/history", response_model=list[DeliveryResponse])
+async def delivery_history(
+    reminder_id: str,
+    cursor: str | None = None,
+    limit: int = Query(50, ge=1, le=500),
+    current_user: AuthUser = Depends(get_approved_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """The reminder's send attempts newest first, a page at a time; the next page's cursor is in X-Next-Cursor.
+
+    sent_at is bounded below by the reminder's creation (or the retention cutoff) and above by
+    the cursor, so on Postgres only the monthly partitions that can hold its rows are scanned.
+    """
+    created_at = await db.scalar(
+        select(Reminder.created_at).where(Reminder.id == reminder_id, Reminder.user_id == current_user.id)
+    )
+    if created_at is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Reminder not found")
+
+    retained_from = datetime.utcnow() - timedelta(days=settings.delivery_retention_days)
+    query = select(
+        Delivery.id, Delivery.scheduled_for, Delivery.sent_at, Delivery.status, Delivery.latency_ms, Delivery.error
+    ).where(Delivery.reminder_id == reminder_id, Delivery.sent_at >= max(created_at, retained_from))
+    if cursor is not None:
+        sent_at, delivery_id = decode_cursor(cursor)
+        # The plain bound is what partition pruning can use; the tuple one breaks ties
+        query = query.where(Delivery.sent_at <= sent_at, tuple_(Delivery.sent_at, Delivery.id) < (sent_at, delivery_id))
+
+    rows = (await db.execute(query.order_by(Delivery.sent_at.desc(), Delivery.id.desc()).limit(limit + 1))).all()
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(rows[-1].sent_at, rows[-1].id)
+    return list_response(rows, DELIVERY_LIST, headers)
+
+
 @router.put("/{reminder_id}", response_model=ReminderResponse)
-def update_reminder(
+async def update_reminder(
     reminder_id: str,
     update: ReminderUpdate,
-    current_user: User = Depends(get_approved_user),
-    db: Session = Depends(get_db)
+    current_user: AuthUser = Depends(get_approved_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    reminder = db.query(Reminder).filter(
-        Reminder.id == reminder_id,
-        Reminder.user_id == current_user.id
-    ).first()
+    reminder = await db.scalar(
+        select(Reminder).where(
+            Reminder.id == reminder_id,
+            Reminder.user_id == current_user.id
+        )
+    )
 
     if not reminder:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Reminder not found")
 
     update_data = update.model_dump(exclude_unset=True)
+    # Null means unchanged: a reminder always has a zone
+    if update_data.get("timezone", "") is None:
+        del update_data["timezone"]
+    if "recurrence" in update_data:
+        update_data["recurrence"] = stored_recurrence(
+            update.recurrence, update_data.get("timezone") or reminder.timezone
+        )
 
     for field, value in update_data.items():
         setattr(reminder, field, value)
 
     # Recalculate next_run if schedule changed
-    if any(f in update_data for f in ["schedule_type", "schedule_time", "schedule_days", "schedule_day_of_month"]):
-        reminder.next_run = calculate_next_run(
+    if any(f in update_data for f in SCHEDULE_FIELDS):
+        if reminder.schedule_type.value == "custom" and reminder.recurrence is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="recurrence is required for custom schedules"
+            )
+        next_run = calculate_next_run(
             reminder.schedule_type,
             reminder.schedule_time,
             reminder.schedule_days,
-            reminder.schedule_day_of_month
+            reminder.schedule_day_of_month,
+            timezone=reminder.timezone,
+            recurrence=reminder.recurrence
         )
-
-    db.commit()
-    db.refresh(reminder)
+        if next_run is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Recurrence has no upcoming occurrences"
+            )
+        reminder.next_run = next_run
+
+    if any(f in update_data for f in (*SCHEDULE_FIELDS, "is_active")):
+        await materialize_occurrences(db, [reminder], current_user.id, replace=True)
+    if update_data.get("is_active") is False:
+        # Messages coalesced with other reminders still go out; only this one's own are stopped
+        await db.execute(cancel_messages(OutboundMessage.reminder_id == reminder.id, "reminder paused"))
+
+    await db.commit()
+    await db.refresh(reminder)
+
+    if reminder.is_active:
+        fire_queue.schedule(reminder.id, reminder.next_run)
+    else:
+        fire_queue.discard(reminder.id)
 
     return reminder
 
 
 @router.delete("/{reminder_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_reminder(
+async def delete_reminder(
     reminder_id: str,
-    current_user: User = Depends(get_approved_user),
-    db: Session = Depends(get_db)
+    current_user: AuthUser = Depends(get_approved_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    reminder = db.query(Reminder).filter(
-        Reminder.id == reminder_id,
-        Reminder.user_id == current_user.id
-    ).first()
+    reminder = await db.scalar(
+        select(Reminder).where(
+            Reminder.id == reminder_id,
+            Reminder.user_id == current_user.id
+        )
+    )
 
     if not reminder:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Reminder not found")
 
-    db.delete(reminder)
-    db.commit()
+    await db.execute(delete(ReminderOccurrence).where(ReminderOccurrence.reminder_id == reminder_id))
+    await db.execute(cancel_messages(OutboundMessage.reminder_id == reminder_id, "reminder deleted"))
+    await db.delete(reminder)
+    await db.commit()
+    fire_queue.discard(reminder_id)
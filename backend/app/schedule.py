@@ -0,0 +1,165 @@
+import calendar
+from datetime import datetime, time, timedelta
+
+from .models import ScheduleType
+from .recurrence import compile_rule, rule_key
+from .timezones import UTC, ZoneTable, get_zone_table
+
+ALL_WEEKDAYS = 0b1111111
+
+
+def weekday_mask(schedule_days: list[int] | None) -> int:
+    """Compile weekly schedule days (0=Mon .. 6=Sun) into a bitmask; bit n set = weekday n."""
+    if not schedule_days:
+        return 1  # Default to Monday
+    mask = 0
+    for day in schedule_days:
+        if 0 <= day <= 6:
+            mask |= 1 << day
+    return mask
+
+
+def _days_until(mask: int, weekday: int) -> int | None:
+    """Days from `weekday` to the next weekday in `mask` (0 if it's in the mask), without looping."""
+    if not mask:
+        return None
+    # Rotate so bit 0 is `weekday`, then the lowest set bit is the answer
+    rotated = ((mask >> weekday) | (mask << (7 - weekday))) & ALL_WEEKDAYS
+    return (rotated & -rotated).bit_length() - 1
+
+
+def _monthly_candidate(year: int, month: int, day_of_month: str, schedule_time: time) -> datetime:
+    last_day = calendar.monthrange(year, month)[1]
+    target_day = last_day if day_of_month == "last" else min(int(day_of_month), last_day)
+    return datetime(year, month, target_day, schedule_time.hour, schedule_time.minute)
+
+
+def _next_run(
+    schedule_type: ScheduleType,
+    schedule_time: time,
+    mask: int,
+    day_of_month: str | None,
+    now: datetime
+) -> datetime:
+    # Combine today's date with the schedule time; if it has already passed, start from tomorrow
+    next_run = datetime.combine(now.date(), schedule_time)
+    if next_run <= now:
+        next_run += timedelta(days=1)
+
+    if schedule_type.value == "weekly":
+        days = _days_until(mask, next_run.weekday())
+        # No valid weekday: fall through a week, as the day-by-day search used to
+        return next_run + timedelta(days=7 if days is None else days)
+
+    if schedule_type.value == "monthly":
+        day = day_of_month or "1"
+        candidate = _monthly_candidate(next_run.year, next_run.month, day, schedule_time)
+        if candidate > now:
+            return candidate
+        year, month = (next_run.year + 1, 1) if next_run.month == 12 else (next_run.year, next_run.month + 1)
+        return _monthly_candidate(year, month, day, schedule_time)
+
+    # once (without a date) and daily
+    return next_run
+
+
+def _next_run_in_zone(
+    schedule_type: ScheduleType,
+    schedule_time: time,
+    mask: int,
+    day_of_month: str | None,
+    zone: ZoneTable,
+    local_now: datetime,
+    now: datetime
+) -> datetime:
+    """_next_run on the zone's wall clock, converted back to UTC."""
+    local_next = _next_run(schedule_type, schedule_time, mask, day_of_month, local_now)
+    next_run = zone.to_utc(local_next, after=now)
+    if next_run is None:
+        # That wall time's only remaining reading already passed (the repeated hour after a fall-back)
+        next_run = zone.to_utc(_next_run(schedule_type, schedule_time, mask, day_of_month, local_next), after=now)
+    return next_run
+
+
+def calculate_next_run(
+    schedule_type: ScheduleType,
+    schedule_time,
+    schedule_days: list[int] | None = None,
+    schedule_day_of_month: str | None = None,
+    schedule_date = None,
+    timezone: str | None = None,
+    recurrence: dict | None = None,
+    now: datetime | None = None
+) -> datetime | None:
+    """Next run in naive UTC, for a schedule on the wall clock of `timezone` (UTC by default).
+
+    Only custom schedules can run out (past their end date or count), giving None.
+    """
+    if schedule_type.value == "custom":
+        return compile_rule(recurrence, schedule_time, timezone).next_after(now or datetime.utcnow())
+
+    zone = get_zone_table(timezone) if timezone and timezone != UTC else None
+
+    # For one-time reminders with a specific date
+    if schedule_type.value == "once" and schedule_date:
+        local = datetime.combine(schedule_date, schedule_time)
+        return zone.to_utc(local) if zone else local
+
+    now = now or datetime.utcnow()
+    mask = weekday_mask(schedule_days)
+    if zone is None:
+        return _next_run(schedule_type, schedule_time, mask, schedule_day_of_month, now)
+    return _next_run_in_zone(
+        schedule_type, schedule_time, mask, schedule_day_of_month, zone, zone.to_local(now), now
+    )
+
+
+def calculate_next_runs(
+    schedule_types: list[ScheduleType],
+    schedule_times: list[time],
+    weekday_masks: list[int],
+    days_of_month: list[str | None],
+    timezones: list[str | None] | None = None,
+    recurrences: list[dict | None] | None = None,
+    now: datetime | None = None
+) -> list[datetime | None]:
+    """Batch calculate_next_run over parallel columns of schedule fields.
+
+    Every row is evaluated against the same `now`, and each distinct (schedule, zone) is
+    computed once, so a burst of reminders sharing a few schedules (everyone at 09:00 daily)
+    costs a handful of calculations rather than one per reminder. Each zone's local time is
+    worked out once per batch too.
+    """
+    now = now or datetime.utcnow()
+    if timezones is None:
+        timezones = [UTC] * len(schedule_types)
+    if recurrences is None:
+        recurrences = [None] * len(schedule_types)
+    # Custom rules are keyed by their canonical form; their expansion is cached across batches too
+    rule_keys = [
+        rule_key(recurrence) if schedule_type == ScheduleType.custom else None
+        for schedule_type, recurrence in zip(schedule_types, recurrences)
+    ]
+    computed: dict[tuple, datetime | None] = {}
+    local_nows: dict[str, tuple[ZoneTable, datetime]] = {}
+    results = []
+
+    for key in zip(schedule_types, schedule_times, weekday_masks, days_of_month, timezones, rule_keys):
+        if key in computed:
+            results.append(computed[key])
+            continue
+
+        name = key[4]
+        if key[5] is not None:
+            next_run = compile_rule(key[5], key[1], name).next_after(now)
+        elif not name or name == UTC:
+            next_run = _next_run(*key[:4], now)
+        else:
+            if name not in local_nows:
+                zone = get_zone_table(name)
+                local_nows[name] = (zone, zone.to_local(now))
+            next_run = _next_run_in_zone(*key[:4], *local_nows[name], now)
+        computed[key] = next_run
+        results.append(next_run)
+
+    return results
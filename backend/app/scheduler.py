@@ -1,42 +1,284 @@
-from datetime import datetime
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.schedulers.blocking import BlockingScheduler
+from sqlalchemy import DateTime, Row, String, column, or_, tuple_, update, values
 from sqlalchemy.orm import Session
 
+from .config import get_settings
 from .database import SessionLocal
-from .models import Reminder, ScheduleType
-from .sms import send_reminder
-from .routers.reminders import calculate_next_run
+from .deliveries import maintain_deliveries
+from .fire_queue import fire_queue
+from .migrations import check_schema_sync, migrate
+from .metrics import DISPATCH_LAG_SECONDS, REMINDERS_COALESCED, REMINDERS_DUE, SCHEDULER_TICK_SECONDS
+from .models import User, Reminder, ScheduleType
+from .occurrences import refresh_occurrences, top_up
+from .outbox import (
+    coalesced_message_key, drain_outbox, enqueue_messages, next_attempt_time, pack_bodies, reminder_message_key
+)
+from .schedule import calculate_next_runs, weekday_mask
+
+settings = get_settings()
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim_due_batch(
+    db: Session,
+    now: datetime,
+    after: tuple[datetime, str] | None,
+    limit: int
+) -> tuple[list[Row], tuple[datetime, str] | None]:
+    """Lease the next page of due reminders to this worker and load them.
+
+    Candidates are ordered by (next_run, id) and keyed off the last row seen. On Postgres
+    they are locked with SKIP LOCKED so concurrent workers pick disjoint rows; everywhere
+    the lease is taken with a conditional UPDATE, so a row is only ever claimed once.
+    Returns the claimed rows and the keyset cursor to resume from (None when done).
+    """
+    query = db.query(Reminder.id, Reminder.next_run).filter(
+        Reminder.is_active == True,
+        Reminder.next_run <= now,
+        or_(Reminder.claimed_until == None, Reminder.claimed_until < now)
+    )
+    if after is not None:
+        query = query.filter(tuple_(Reminder.next_run, Reminder.id) > after)
+    query = query.order_by(Reminder.next_run, Reminder.id).limit(limit)
+    if db.get_bind().dialect.name == "postgresql":
+        query = query.with_for_update(skip_locked=True)
+
+    candidates = query.all()
+    if not candidates:
+        db.commit()
+        return [], None
+
+    cursor = (candidates[-1].next_run, candidates[-1].id)
+    return lease_reminders(db, [row.id for row in candidates], now, now), cursor
+
+
+def claim_early(db: Session, now: datetime, user_ids: set[str], until: datetime) -> list[Row]:
+    """Lease the reminders of `user_ids` that fall due after `now` but by `until`, so they go out
+    in the same message as what's due now (coalescing)."""
+    query = db.query(Reminder.id).filter(
+        Reminder.user_id.in_(user_ids),
+        Reminder.is_active == True,
+        Reminder.next_run > now,
+        Reminder.next_run <= until,
+        or_(Reminder.claimed_until == None, Reminder.claimed_until < now)
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        query = query.with_for_update(skip_locked=True)
+
+    candidate_ids = [row.id for row in query]
+    if not candidate_ids:
+        db.commit()
+        return []
+    return lease_reminders(db, candidate_ids, until, now)
+
+
+def lease_reminders(db: Session, candidate_ids: list[str], due_by: datetime, now: datetime) -> list[Row]:
+    """Claim candidates still due by `due_by` and unleased, commit, and load the ones we got."""
+    claim = f"{WORKER_ID}:{uuid.uuid4().hex[:8]}"
+    # Re-check the due conditions: another worker may have finished with a candidate since we read it
+    db.query(Reminder).filter(
+        Reminder.id.in_(candidate_ids),
+        Reminder.is_active == True,
+        Reminder.next_run <= due_by,
+        or_(Reminder.claimed_until == None, Reminder.claimed_until < now)
+    ).update(
+        {"claimed_by": claim, "claimed_until": now + timedelta(seconds=settings.scheduler_lease_seconds)},
+        synchronize_session=False
+    )
+    db.commit()
+
+    # Plain rows rather than ORM objects: nothing for the session to track while we send
+    return db.query(
+        Reminder.id,
+        Reminder.user_id,
+        Reminder.message,
+        Reminder.next_run,
+        Reminder.schedule_type,
+        Reminder.schedule_time,
+        Reminder.schedule_days,
+        Reminder.schedule_day_of_month,
+        Reminder.recurrence,
+        Reminder.timezone,
+        Reminder.is_active,
+        Reminder.occurrences_until,
+        User.phone_number
+    ).join(Reminder.user).filter(
+        Reminder.id.in_(candidate_ids),
+        Reminder.claimed_by == claim
+    ).order_by(Reminder.next_run, Reminder.id).all()
+
+
+def bulk_reschedule(db: Session, next_runs: list[tuple[str, datetime]]):
+    """Set new next_run values and release the leases in one statement (Postgres) or one executemany."""
+    if db.get_bind().dialect.name == "postgresql":
+        new_values = values(
+            column("id", String),
+            column("next_run", DateTime),
+            name="new_values"
+        ).data(next_runs)
+        db.execute(
+            update(Reminder)
+            .where(Reminder.id == new_values.c.id)
+            .values(next_run=new_values.c.next_run, claimed_by=None, claimed_until=None)
+            .execution_options(synchronize_session=False)
+        )
+    else:
+        db.execute(
+            update(Reminder),
+            [
+                {"id": reminder_id, "next_run": next_run, "claimed_by": None, "claimed_until": None}
+                for reminder_id, next_run in next_runs
+            ]
+        )
+
+
+def write_back(db: Session, reminders: list[Row], after: datetime | None = None):
+    """Apply the post-enqueue state transitions for a chunk of reminders. The caller commits.
+
+    Recurring reminders move to their first run after `after` (default now).
+    """
+    deactivate = [reminder.id for reminder in reminders if reminder.schedule_type == ScheduleType.once]
+    recurring = [reminder for reminder in reminders if reminder.schedule_type != ScheduleType.once]
+
+    # Recurring reminders get rescheduled, computed for the whole chunk at once (each zone's
+    # local time is resolved once per chunk, not per reminder)
+    rescheduled = []
+    if recurring:
+        next_runs = calculate_next_runs(
+            [reminder.schedule_type for reminder in recurring],
+            [reminder.schedule_time for reminder in recurring],
+            [weekday_mask(reminder.schedule_days) for reminder in recurring],
+            [reminder.schedule_day_of_month for reminder in recurring],
+            [reminder.timezone for reminder in recurring],
+            [reminder.recurrence for reminder in recurring],
+            now=after
+        )
+        for reminder, next_run in zip(recurring, next_runs):
+            if next_run is None:
+                # A custom rule that has run its course
+                deactivate.append(reminder.id)
+            else:
+                rescheduled.append((reminder.id, next_run))
+
+    # One-time reminders (and finished rules) get deactivated
+    if deactivate:
+        db.execute(
+            update(Reminder)
+            .where(Reminder.id.in_(deactivate))
+            .values(is_active=False, claimed_by=None, claimed_until=None)
+            .execution_options(synchronize_session=False)
+        )
+
+    if rescheduled:
+        bulk_reschedule(db, rescheduled)
+        # Keep the calendar filled ahead; most reminders are already covered and skipped. Ones never
+        # materialized are left to refresh_calendar, so a backlog of them doesn't slow the tick
+        rescheduled_ids = {reminder_id for reminder_id, _ in rescheduled}
+        top_up(db, [
+            reminder for reminder in recurring
+            if reminder.id in rescheduled_ids and reminder.occurrences_until is not None
+        ], datetime.utcnow())
+
+
+def message_occurrences(reminders: list[Row]) -> list[dict]:
+    """What a message delivers, as carried on its outbox row for the deliveries log."""
+    return [
+        {"reminder_id": reminder.id, "user_id": reminder.user_id, "scheduled_for": reminder.next_run.isoformat()}
+        for reminder in reminders
+    ]
+
+
+def recipient_messages(reminders: list[Row], now: datetime) -> list[dict]:
+    """Outbox rows for one recipient's reminders: their own message for a lone reminder, otherwise
+    one combined message, split between reminders when it's over sms_coalesce_max_chars."""
+    if len(reminders) == 1:
+        reminder = reminders[0]
+        return [{
+            "idempotency_key": reminder_message_key(reminder.id, reminder.next_run),
+            "reminder_id": reminder.id,
+            "phone_number": reminder.phone_number,
+            "body": reminder.message,
+            "next_attempt_at": now,
+            "occurrences": message_occurrences(reminders)
+        }]
+
+    messages, start = [], 0
+    bodies = pack_bodies([reminder.message for reminder in reminders], settings.sms_coalesce_max_chars)
+    for part, (body, count) in enumerate(bodies):
+        messages.append({
+            "idempotency_key": coalesced_message_key(reminders, part),
+            "reminder_id": None,
+            "phone_number": reminders[0].phone_number,
+            "body": body,
+            "next_attempt_at": now,
+            "occurrences": message_occurrences(reminders[start:start + count])
+        })
+        start += count
+    return messages
+
+
+def process_due_batch(db: Session, due_reminders: list[Row]):
+    """Enqueue messages for due reminders and advance their schedules, committing chunk by chunk.
+
+    Delivery (and retrying it) is the outbox's job, so the reminder moves on as soon as its
+    message is durably queued. With sms_coalesce, each recipient's reminders (plus any of theirs
+    due within sms_coalesce_window_seconds) share one message.
+    """
+    now = datetime.utcnow()
+    chunk_size = settings.scheduler_writeback_chunk_size
+
+    REMINDERS_DUE.inc(len(due_reminders))
+    for reminder in due_reminders:
+        DISPATCH_LAG_SECONDS.observe((now - reminder.next_run).total_seconds())
+
+    window_end = now + timedelta(seconds=settings.sms_coalesce_window_seconds)
+    if settings.sms_coalesce:
+        early = claim_early(db, now, {reminder.user_id for reminder in due_reminders}, window_end)
+        groups: dict[str, list[Row]] = {}
+        for reminder in [*due_reminders, *early]:
+            groups.setdefault(reminder.phone_number, []).append(reminder)
+        recipients = list(groups.values())
+        REMINDERS_COALESCED.inc(sum(len(group) - 1 for group in recipients))
+    else:
+        recipients = [[reminder] for reminder in due_reminders]
+
+    # Chunks of whole groups, so a recipient's message and transitions commit together
+    chunk: list[Row] = []
+    messages: list[dict] = []
+    for index, group in enumerate(recipients):
+        chunk += group
+        messages += recipient_messages(group, now)
+        if len(chunk) < chunk_size and index < len(recipients) - 1:
+            continue
+
+        enqueue_messages(db, messages)
+        write_back(db, [reminder for reminder in chunk if reminder.next_run <= now])
+        # Pulled forward by coalescing: move past the occurrence that just went out early
+        write_back(db, [reminder for reminder in chunk if reminder.next_run > now], after=window_end)
+        db.commit()
+        chunk, messages = [], []
 
 
 def process_due_reminders():
     db: Session = SessionLocal()
     try:
         now = datetime.utcnow()
+        after = None
 
-        # Find all due reminders
-        due_reminders = db.query(Reminder).filter(
-            Reminder.next_run <= now,
-            Reminder.is_active == True
-        ).all()
-
-        for reminder in due_reminders:
-            # Send the SMS
-            success = send_reminder(reminder.user.phone_number, reminder.message)
-
-            if success:
-                if reminder.schedule_type == ScheduleType.once:
-                    # One-time reminders get deactivated
-                    reminder.is_active = False
-                else:
-                    # Recurring reminders get rescheduled
-                    reminder.next_run = calculate_next_run(
-                        reminder.schedule_type,
-                        reminder.schedule_time,
-                        reminder.schedule_days,
-                        reminder.schedule_day_of_month
-                    )
+        while True:
+            due_reminders, after = claim_due_batch(db, now, after, settings.scheduler_batch_size)
+            if after is None:
+                break
 
-        db.commit()
+            process_due_batch(db, due_reminders)
 
     except Exception as e:
         print(f"Error processing reminders: {e}")
@@ -45,13 +287,230 @@ def process_due_reminders():
         db.close()
 
 
-scheduler = BackgroundScheduler()
+def process_outbox():
+    db: Session = SessionLocal()
+    try:
+        drain_outbox(db, WORKER_ID)
+    except Exception as e:
+        print(f"Error sending queued messages: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+_next_calendar_refresh = 0.0
 
 
-def start_scheduler():
-    scheduler.add_job(process_due_reminders, "interval", minutes=1, id="process_reminders")
+def refresh_calendar():
+    """Top up materialized occurrences at most once per calendar_refresh_interval_seconds."""
+    global _next_calendar_refresh
+    if time.monotonic() < _next_calendar_refresh:
+        return
+    _next_calendar_refresh = time.monotonic() + settings.calendar_refresh_interval_seconds
+
+    db: Session = SessionLocal()
+    try:
+        refresh_occurrences(db, datetime.utcnow())
+    except Exception as e:
+        print(f"Error refreshing calendar occurrences: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+_next_delivery_maintenance = 0.0
+
+
+def maintain_delivery_log():
+    """Run deliveries log upkeep (partitions, retention, compaction) at most once per
+    delivery_maintenance_interval_seconds."""
+    global _next_delivery_maintenance
+    if time.monotonic() < _next_delivery_maintenance:
+        return
+    _next_delivery_maintenance = time.monotonic() + settings.delivery_maintenance_interval_seconds
+
+    db: Session = SessionLocal()
+    try:
+        maintain_deliveries(db, datetime.utcnow())
+    except Exception as e:
+        print(f"Error maintaining the deliveries log: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def load_fire_queue(db: Session, now: datetime):
+    """Load reminders firing within the look-ahead window into the in-process heap."""
+    loaded_until = now + timedelta(seconds=settings.scheduler_lookahead_seconds)
+    upcoming = db.query(Reminder.id, Reminder.next_run).filter(
+        Reminder.is_active == True,
+        Reminder.next_run > now,
+        Reminder.next_run <= loaded_until
+    ).all()
+
+    fire_queue.load([(row.id, row.next_run) for row in upcoming], loaded_until)
+
+
+_changes_seen_at: datetime | None = None
+
+
+def watch_reminders():
+    """Feed the fire queue reminders changed by other processes since the last poll.
+
+    The API keeps the queue current for its own scheduler, but a standalone worker (or another
+    API process) only hears about edits here, once per scheduler_change_poll_seconds rather than
+    once per look-ahead window. Polls overlap by one interval, so a change committed a little
+    after its updated_at isn't missed; seeing a change twice is harmless.
+    """
+    global _changes_seen_at
+    now = datetime.utcnow()
+    since, _changes_seen_at = _changes_seen_at, now
+    if since is None:
+        # First poll: the first tick's load covers everything so far
+        return
+
+    db: Session = SessionLocal()
+    try:
+        changed = db.query(Reminder.id, Reminder.next_run, Reminder.is_active).filter(
+            Reminder.updated_at > since - timedelta(seconds=settings.scheduler_change_poll_seconds),
+            # Leased ones are being sent and get rescheduled when they're done
+            or_(Reminder.claimed_until == None, Reminder.claimed_until < now)
+        ).all()
+    except Exception as e:
+        print(f"Error polling for reminder changes: {e}")
+        return
+    finally:
+        db.close()
+
+    for row in changed:
+        if row.is_active:
+            fire_queue.schedule(row.id, row.next_run)
+        else:
+            fire_queue.discard(row.id)
+
+
+JOB_ID = "process_reminders"
+WATCH_JOB_ID = "watch_reminders"
+
+scheduler = None
+_wake_lock = threading.Lock()
+
+
+def _arm(when: datetime):
+    """(Re)arm the scheduler job to run at `when` (naive UTC) unless it already runs earlier.
+    Call with _wake_lock held."""
+    if scheduler is None:
+        return
+    run_date = when.replace(tzinfo=timezone.utc)
+    job = scheduler.get_job(JOB_ID)
+    current = getattr(job, "next_run_time", None)
+    if current is not None and current <= run_date:
+        return
+    scheduler.add_job(
+        run_tick,
+        "date",
+        run_date=run_date,
+        id=JOB_ID,
+        replace_existing=True,
+        misfire_grace_time=None
+    )
+
+
+def wake_at(when: datetime):
+    """Make the scheduler run by `when` (naive UTC)."""
+    with _wake_lock:
+        _arm(when)
+
+
+def schedule_next_tick():
+    """Arm the next tick, for the next reminder or outbox retry, whichever is first.
+
+    The tick that just ran has used up its job, so any job there now was set by wake_at while it
+    ran, and is kept if it's earlier. The fire queue is read under the same lock, so a reminder
+    scheduled while this runs is either in that read or wakes us through wake_at afterwards.
+    """
+    now = datetime.utcnow()
+    retry_at = None
+    loaded = False
+    db: Session = SessionLocal()
+    try:
+        fire_queue.pop_due(now)
+        if fire_queue.needs_reload(now):
+            load_fire_queue(db, now)
+        loaded = True
+
+        # Also wake for the next outbox retry
+        retry_at = next_attempt_time(db, now)
+    except Exception as e:
+        print(f"Error loading upcoming reminders: {e}")
+    finally:
+        db.close()
+
+    with _wake_lock:
+        if loaded:
+            when = fire_queue.next_wakeup(now)
+        else:
+            when = now + timedelta(seconds=settings.scheduler_lookahead_seconds)
+        if retry_at is not None:
+            when = max(min(when, retry_at), now)
+        _arm(when)
+
+
+def run_tick():
+    with SCHEDULER_TICK_SECONDS.time():
+        process_due_reminders()
+        process_outbox()
+        refresh_calendar()
+        maintain_delivery_log()
+    schedule_next_tick()
+
+
+def _start(target):
+    global scheduler
+    scheduler = target
+    fire_queue.listener = wake_at
+    # Run once straight away to catch anything that came due while we were down
+    wake_at(datetime.utcnow())
+    scheduler.add_job(
+        watch_reminders,
+        "interval",
+        seconds=settings.scheduler_change_poll_seconds,
+        id=WATCH_JOB_ID,
+        next_run_time=datetime.now(timezone.utc)
+    )
     scheduler.start()
 
 
+def start_scheduler():
+    if not settings.run_scheduler:
+        return
+    _start(BackgroundScheduler(timezone=timezone.utc))
+
+
 def stop_scheduler():
-    scheduler.shutdown()
+    global scheduler
+    fire_queue.listener = None
+    # Detach under the lock, then shut down outside it: shutdown waits for a running tick, which
+    # may itself be waiting on _wake_lock to re-arm
+    with _wake_lock:
+        stopping, scheduler = scheduler, None
+    if stopping is not None and stopping.running:
+        stopping.shutdown()
+
+
+def main():
+    """Run the scheduler on its own, outside the API processes."""
+    # The same startup schema check as the API's
+    if settings.auto_migrate:
+        migrate()
+    else:
+        check_schema_sync()
+    print(f"Scheduler worker {WORKER_ID} started")
+    try:
+        _start(BlockingScheduler(timezone=timezone.utc))
+    except (KeyboardInterrupt, SystemExit):
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,20 @@
-from pydantic import BaseModel, Field
+from pydantic import AfterValidator, BaseModel, Field, model_validator
 from datetime import datetime, time, date
-from typing import Optional
+from typing import Annotated, Literal, Optional
 from enum import Enum
 
+from .timezones import validate_timezone
+
+# An IANA zone name such as "America/New_York"
+TimezoneName = Annotated[str, AfterValidator(validate_timezone)]
+
 
 class ScheduleType(str, Enum):
     once = "once"
     daily = "daily"
     weekly = "weekly"
     monthly = "monthly"
+    custom = "custom"
 
 
 # Auth schemas
@@ -31,13 +37,40 @@ class UserResponse(BaseModel):
     phone_number: str
     is_approved: bool
     is_admin: bool
+    timezone: str
     created_at: datetime
 
     class Config:
         from_attributes = True
 
 
+class UserUpdate(BaseModel):
+    timezone: TimezoneName = Field(..., description="Default zone for new reminders")
+
+
 # Reminder schemas
+class NthWeekday(BaseModel):
+    weekday: int = Field(..., ge=0, le=6, description="0=Mon, 6=Sun")
+    n: Literal[1, 2, 3, 4, 5, -1] = Field(..., description="1st to 5th, or -1 for the last")
+
+
+class Recurrence(BaseModel):
+    """Rule for custom schedules: every `interval` days/weeks/months, at schedule_time plus `times`."""
+    frequency: Literal["daily", "weekly", "monthly"]
+    interval: int = Field(1, ge=1, le=366)
+    times: list[time] = Field(default_factory=list, max_length=24, description="Extra times of day")
+    weekdays: list[Annotated[int, Field(ge=0, le=6)]] = Field(
+        default_factory=list, description="For weekly: 0=Mon, 6=Sun; defaults to the start's weekday"
+    )
+    month_days: list[Annotated[str, Field(pattern=r"^([1-9]|[12]\d|3[01]|last)$")]] = Field(
+        default_factory=list, description="For monthly: 1-31 or 'last'"
+    )
+    nth_weekdays: list[NthWeekday] = Field(default_factory=list, description="For monthly, e.g. 2nd Tuesday")
+    start: Optional[date] = Field(None, description="First day of the rule; defaults to today")
+    until: Optional[date] = Field(None, description="Last day of the rule, inclusive")
+    count: Optional[int] = Field(None, ge=1, le=1000, description="Stop after this many occurrences")
+
+
 class ReminderCreate(BaseModel):
     message: str = Field(..., min_length=1, max_length=500)
     schedule_type: ScheduleType
@@ -45,6 +78,19 @@ class ReminderCreate(BaseModel):
     schedule_date: Optional[date] = Field(None, description="For once: specific date")
     schedule_days: Optional[list[int]] = Field(None, description="For weekly: 0=Mon, 6=Sun")
     schedule_day_of_month: Optional[str] = Field(None, description="For monthly: 1-31 or 'last'")
+    recurrence: Optional[Recurrence] = Field(None, description="For custom: the recurrence rule")
+    timezone: Optional[TimezoneName] = Field(None, description="Zone of schedule_time; defaults to the user's")
+
+    @model_validator(mode="after")
+    def check_recurrence(self):
+        if self.schedule_type == ScheduleType.custom and self.recurrence is None:
+            raise ValueError("recurrence is required for custom schedules")
+        return self
+
+
+class ReminderImport(ReminderCreate):
+    """A row of POST /reminders/import; exports carry is_active, so paused reminders stay paused."""
+    is_active: bool = True
 
 
 class ReminderUpdate(BaseModel):
@@ -54,6 +100,8 @@ class ReminderUpdate(BaseModel):
     schedule_date: Optional[date] = None
     schedule_days: Optional[list[int]] = None
     schedule_day_of_month: Optional[str] = None
+    recurrence: Optional[Recurrence] = None
+    timezone: Optional[TimezoneName] = None
     is_active: Optional[bool] = None
 
 
@@ -64,9 +112,75 @@ class ReminderResponse(BaseModel):
     schedule_time: time
     schedule_days: Optional[list[int]]
     schedule_day_of_month: Optional[str]
+    recurrence: Optional[Recurrence] = None
+    timezone: str
     next_run: datetime
     is_active: bool
     created_at: datetime
 
     class Config:
         from_attributes = True
+
+
+class UpcomingOccurrences(BaseModel):
+    reminder_id: str
+    occurrences: list[datetime]
+
+
+class CalendarEntry(BaseModel):
+    reminder_id: str
+    occurs_at: datetime
+    message: str
+
+
+class DeliveryStatus(str, Enum):
+    sent = "sent"
+    failed = "failed"
+    throttled = "throttled"
+    dead = "dead"
+
+
+class DeliveryResponse(BaseModel):
+    id: str
+    scheduled_for: datetime
+    sent_at: datetime
+    status: DeliveryStatus
+    latency_ms: int
+    error: Optional[str]
+
+
+class BulkImportError(BaseModel):
+    line: int
+    error: str
+
+
+class BulkImportResult(BaseModel):
+    created: int
+    errors: list[BulkImportError]
+    errors_truncated: bool = False
+
+
+# Admin schemas
+class UserIds(BaseModel):
+    user_ids: list[str] = Field(..., min_length=1, max_length=1000)
+
+
+class BulkUserResult(BaseModel):
+    count: int  # Users approved or deleted; ids that didn't qualify are skipped
+
+
+class AdminStats(BaseModel):
+    users: int
+    approved_users: int
+    pending_users: int
+    admins: int
+    reminders: int
+    active_reminders: int
+    generated_at: datetime  # Served from a short-lived cache, so this may be a few seconds old
+
+
+class OutboxStats(BaseModel):
+    pending: int
+    sent: int
+    dead: int
+    oldest_pending_seconds: Optional[float]
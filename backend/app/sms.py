@@ -1,37 +1,383 @@
-from twilio.rest import Client
+import asyncio
+import random
+import threading
+import time
+
 from .config import get_settings
+from .metrics import SMS_MESSAGES, SMS_SEND_SECONDS, SMS_THROTTLE_REFUSED, SMS_THROTTLE_WAIT_SECONDS, SMS_THROTTLED
 
 settings = get_settings()
 
 
-def get_twilio_client() -> Client | None:
-    if not settings.twilio_account_sid or not settings.twilio_auth_token:
-        return None
-    return Client(settings.twilio_account_sid, settings.twilio_auth_token)
+class SMSError(Exception):
+    """Raised by a transport when a message could not be delivered to the provider.
+
+    `seconds` is how long the provider took to refuse it (0 if the message never got that far).
+    """
+
+    seconds = 0.0
+
+
+class SMSThrottled(SMSError):
+    """The send was deferred by rate limiting; try again after `retry_after` seconds.
+
+    `local` is set when our own limiter refused it, so the provider never saw the message.
+    """
+
+    def __init__(self, message: str, retry_after: float, local: bool = False):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.local = local
+
+
+def observe_provider_call(start: float) -> float:
+    """Seconds since `start`, taken just before a provider call, recorded in SMS_SEND_SECONDS.
+
+    Transports time only the call itself: rate limit waits go to SMS_THROTTLE_WAIT_SECONDS.
+    """
+    seconds = time.perf_counter() - start
+    SMS_SEND_SECONDS.observe(seconds)
+    return seconds
+
+
+class TokenBucket:
+    """Token bucket allowing `rate` sends per second with bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available, after refilling up to `now`. Not thread-safe."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+    def take(self):
+        # Tokens may go negative: that's a reservation later senders have to wait out
+        self.tokens -= 1
+
+    def drain(self, seconds: float):
+        """Penalize the bucket after the provider pushed back, so the next send waits `seconds`."""
+        self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+
+class SenderPool:
+    """Rate limits sends per sender number and spreads them over every configured number.
+
+    acquire() reserves a slot on whichever number frees up first and returns it with the
+    time to wait before sending. Slots further out than `max_wait` aren't reserved;
+    the send is refused with SMSThrottled so a queue can defer it instead of failing it.
+    Refusals are told to come back one slot apart at the lane's combined rate, so a deferred
+    backlog returns at the pace it can be sent rather than all at once.
+
+    Each number's rate is split in two lanes: `priority_share` of it for priority sends (OTP
+    codes, which someone is waiting on) and the rest for everything else, so a burst of
+    reminders can't use up the slots a login needs. Limits are per process.
+    """
+
+    def __init__(self, numbers: list[str], rate: float, burst: float, max_wait: float, priority_share: float = 0.0):
+        self.numbers = numbers
+        self.rate = rate
+        self.max_wait = max_wait
+        self.lanes = {
+            priority: {number: TokenBucket(rate * share, max(burst * share, 1)) for number in numbers}
+            for priority, share in ((True, priority_share), (False, 1 - priority_share))
+            if share > 0
+        }
+        # Per lane, the monotonic time the next refused send is deferred to
+        self._deferred = {priority: 0.0 for priority in self.lanes}
+        self._lock = threading.Lock()
+
+    def acquire(self, priority: bool = False) -> tuple[str, float]:
+        if not self.rate:
+            return self.numbers[0], 0.0
+
+        # With no lane of its own, a send shares the other one
+        lane = priority if priority in self.lanes else not priority
+        buckets = self.lanes[lane]
+        label = "high" if priority else "normal"
+        with self._lock:
+            now = time.monotonic()
+            number, wait = min(
+                ((number, bucket.wait_time(now)) for number, bucket in buckets.items()),
+                key=lambda item: item[1]
+            )
+            if wait > self.max_wait:
+                SMS_THROTTLE_REFUSED.labels(label).inc()
+                retry_at = max(now + wait, self._deferred[lane])
+                self._deferred[lane] = retry_at + 1 / sum(bucket.rate for bucket in buckets.values())
+                raise SMSThrottled(
+                    f"All sender numbers are rate limited for {wait:.1f}s", retry_after=retry_at - now, local=True
+                )
+
+            buckets[number].take()
+        if wait:
+            SMS_THROTTLED.labels(label).inc()
+            SMS_THROTTLE_WAIT_SECONDS.labels(label).inc(wait)
+        return number, wait
+
+    def acquire_sync(self, priority: bool = False) -> str:
+        number, wait = self.acquire(priority)
+        if wait:
+            time.sleep(wait)
+        return number
+
+    async def acquire_async(self, priority: bool = False) -> str:
+        number, wait = self.acquire(priority)
+        if wait:
+            await asyncio.sleep(wait)
+        return number
+
+    def backoff(self, number: str) -> float:
+        """The provider returned 429 for `number`; hold it back for a second's worth of sends."""
+        retry_after = max(1.0, 1 / self.rate) if self.rate else 1.0
+        if self.rate:
+            with self._lock:
+                for buckets in self.lanes.values():
+                    buckets[number].drain(retry_after)
+        return retry_after
+
+
+class SMSTransport:
+    """Sends SMS messages. One instance is shared by every request and scheduler thread.
+
+    `priority` sends (OTP codes) draw on their own share of any rate limit. Sends return how long
+    the provider took, without any rate limit wait.
+    """
+
+    def send(self, to: str, body: str, priority: bool = False) -> float:
+        raise NotImplementedError
+
+    async def send_async(self, to: str, body: str, priority: bool = False) -> float:
+        return await asyncio.to_thread(self.send, to, body, priority)
+
+    def close(self) -> None:
+        pass
+
+    async def aclose(self) -> None:
+        self.close()
+
+
+class TwilioTransport(SMSTransport):
+    """Twilio client that keeps its HTTP connections alive between messages.
+
+    The SDK (with requests and aiohttp behind it) is imported here rather than at module level:
+    it's a few hundred ms of every boot, and most processes don't send until much later, if at all.
+    """
+
+    def __init__(self, account_sid: str, auth_token: str, senders: SenderPool, pool_size: int, timeout: float):
+        from requests.adapters import HTTPAdapter
+        from twilio.http.http_client import TwilioHttpClient
+        from twilio.rest import Client
+
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.senders = senders
+        self.timeout = timeout
+
+        http_client = TwilioHttpClient(pool_connections=True, timeout=timeout)
+        http_client.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+        self.client = Client(account_sid, auth_token, http_client=http_client)
+
+        # aiohttp sessions are bound to the loop they were created on
+        self._async_client = None
+        self._async_loop = None
+
+    def _error(self, from_number: str, e: Exception, seconds: float) -> SMSError:
+        from twilio.base.exceptions import TwilioRestException
 
+        if isinstance(e, TwilioRestException) and e.status == 429:
+            retry_after = self.senders.backoff(from_number)
+            error = SMSThrottled(f"Twilio rate limited {from_number}", retry_after=retry_after)
+        else:
+            error = SMSError(str(e))
+        error.seconds = seconds
+        return error
 
-def send_sms(to: str, message: str) -> bool:
-    client = get_twilio_client()
-    if not client:
-        print(f"[DEV MODE] SMS to {to}: {message}")
+    def send(self, to: str, body: str, priority: bool = False) -> float:
+        from_number = self.senders.acquire_sync(priority)
+        start = time.perf_counter()
+        try:
+            self.client.messages.create(body=body, from_=from_number, to=to)
+        except Exception as e:
+            raise self._error(from_number, e, observe_provider_call(start)) from e
+        return observe_provider_call(start)
+
+    def _get_async_client(self):
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            from twilio.http.async_http_client import AsyncTwilioHttpClient
+            from twilio.rest import Client
+
+            http_client = AsyncTwilioHttpClient(pool_connections=True, timeout=self.timeout)
+            self._async_client = Client(self.account_sid, self.auth_token, http_client=http_client)
+            self._async_loop = loop
+        return self._async_client
+
+    async def send_async(self, to: str, body: str, priority: bool = False) -> float:
+        client = self._get_async_client()
+        from_number = await self.senders.acquire_async(priority)
+        start = time.perf_counter()
+        try:
+            await client.messages.create_async(body=body, from_=from_number, to=to)
+        except Exception as e:
+            raise self._error(from_number, e, observe_provider_call(start)) from e
+        return observe_provider_call(start)
+
+    def close(self) -> None:
+        self.client.http_client.session.close()
+
+    async def aclose(self) -> None:
+        self.close()
+        if self._async_client is not None:
+            await self._async_client.http_client.close()
+            self._async_client = None
+
+
+class ConsoleTransport(SMSTransport):
+    """Development transport used when no Twilio credentials are configured."""
+
+    def send(self, to: str, body: str, priority: bool = False) -> float:
+        print(f"[DEV MODE] SMS to {to}: {body}")
+        return 0.0
+
+    async def send_async(self, to: str, body: str, priority: bool = False) -> float:
+        return self.send(to, body)
+
+
+class FakeTransport(SMSTransport):
+    """In-process transport with injectable latency and failures, for benchmarks and load tests."""
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.sent = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    def _record(self, start: float) -> float:
+        seconds = observe_provider_call(start)
+        failed = self.failure_rate and random.random() < self.failure_rate
+        with self._lock:
+            if failed:
+                self.failed += 1
+            else:
+                self.sent += 1
+        if failed:
+            error = SMSError("Simulated provider failure")
+            error.seconds = seconds
+            raise error
+        return seconds
+
+    def send(self, to: str, body: str, priority: bool = False) -> float:
+        start = time.perf_counter()
+        if self.latency:
+            time.sleep(self.latency)
+        return self._record(start)
+
+    async def send_async(self, to: str, body: str, priority: bool = False) -> float:
+        start = time.perf_counter()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._record(start)
+
+
+_transport: SMSTransport | None = None
+_transport_lock = threading.Lock()
+
+
+def create_transport() -> SMSTransport:
+    kind = settings.sms_transport
+    if kind == "auto":
+        kind = "twilio" if settings.twilio_account_sid and settings.twilio_auth_token else "console"
+
+    if kind == "twilio":
+        numbers = [n.strip() for n in settings.twilio_phone_numbers.split(",") if n.strip()]
+        senders = SenderPool(
+            numbers or [settings.twilio_phone_number],
+            rate=settings.sms_rate_per_second,
+            burst=settings.sms_burst or max(settings.sms_rate_per_second, 1),
+            max_wait=settings.sms_max_throttle_wait_seconds,
+            priority_share=settings.sms_otp_share
+        )
+        return TwilioTransport(
+            settings.twilio_account_sid,
+            settings.twilio_auth_token,
+            senders,
+            pool_size=max(settings.sms_dispatch_concurrency, 1),
+            timeout=settings.sms_timeout_seconds
+        )
+    if kind == "console":
+        return ConsoleTransport()
+    if kind == "fake":
+        return FakeTransport(latency=settings.sms_fake_latency_ms / 1000)
+    raise ValueError(f"Unknown SMS transport: {settings.sms_transport}")
+
+
+def get_transport() -> SMSTransport:
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = create_transport()
+    return _transport
+
+
+def set_transport(transport: SMSTransport | None) -> None:
+    """Replace the shared transport, e.g. with a FakeTransport for benchmarks."""
+    global _transport
+    with _transport_lock:
+        _transport = transport
+
+
+async def close_transport() -> None:
+    global _transport
+    with _transport_lock:
+        transport, _transport = _transport, None
+    if transport is not None:
+        await transport.aclose()
+
+
+def send_sms(to: str, message: str, priority: bool = False) -> bool:
+    try:
+        get_transport().send(to, message, priority)
+        SMS_MESSAGES.labels("sent").inc()
         return True
+    except SMSError as e:
+        SMS_MESSAGES.labels("failed").inc()
+        print(f"Failed to send SMS: {e}")
+        return False
+
 
+async def send_sms_async(to: str, message: str, priority: bool = False) -> bool:
     try:
-        client.messages.create(
-            body=message,
-            from_=settings.twilio_phone_number,
-            to=to
-        )
+        await get_transport().send_async(to, message, priority)
+        SMS_MESSAGES.labels("sent").inc()
         return True
-    except Exception as e:
+    except SMSError as e:
+        SMS_MESSAGES.labels("failed").inc()
         print(f"Failed to send SMS: {e}")
         return False
 
 
+def format_otp_message(code: str) -> str:
+    return f"Your Nag Queen verification code is: {code}"
+
+
 def send_otp(phone_number: str, code: str) -> bool:
-    message = f"Your Nag Queen verification code is: {code}"
-    return send_sms(phone_number, message)
+    return send_sms(phone_number, format_otp_message(code), priority=True)
+
+
+async def send_otp_async(phone_number: str, code: str) -> bool:
+    return await send_sms_async(phone_number, format_otp_message(code), priority=True)
 
 
 def send_reminder(phone_number: str, reminder_message: str) -> bool:
     return send_sms(phone_number, reminder_message)
+
+
+async def send_reminder_async(phone_number: str, reminder_message: str) -> bool:
+    return await send_sms_async(phone_number, reminder_message)
@@ -0,0 +1,96 @@
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+# Set when app.main starts importing (it imports this module first), so "imports" covers the app's own
+STARTED = time.perf_counter()
+
+# SDKs that only some processes need; seeing one in a web replica's imports is a cold start regression
+LAZY_MODULES = ("twilio", "aiohttp", "apscheduler")
+
+
+class StartupProfile:
+    """Time spent in each startup phase of this process, logged once it's ready to serve."""
+
+    def __init__(self, started: float = STARTED):
+        self.started = started
+        self.last = started
+        self.phases: list[tuple[str, float]] = []
+
+    def mark(self, phase: str):
+        """Close `phase`: it ran from the previous mark (or the start) until now."""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    @property
+    def total(self) -> float:
+        return self.last - self.started
+
+    def report(self) -> str:
+        phases = ", ".join(f"{phase} {seconds * 1000:.0f}ms" for phase, seconds in self.phases)
+        return f"Startup: ready in {self.total:.2f}s ({phases})"
+
+
+startup_profile = StartupProfile()
+
+
+def import_times(module: str = "app.main") -> list[tuple[str, int, int]]:
+    """(name, self, cumulative microseconds) per module a fresh interpreter imports for `module`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=Path(__file__).resolve().parent.parent,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(own), int(cumulative)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile how long an API process takes to become ready")
+    parser.add_argument("--top", type=int, default=15, help="How many packages to list by import time")
+    args = parser.parse_args()
+
+    # Profile a web replica: a scheduler here would start sending reminders
+    os.environ["RUN_SCHEDULER"] = "false"
+
+    rows = import_times()
+    # Self times add up without double counting, so they attribute the total to packages
+    by_package = defaultdict(int)
+    for name, own, _ in rows:
+        by_package[name.split(".")[0]] += own
+    total = sum(cumulative for name, _, cumulative in rows if name in ("app", "app.main"))
+    print(f"Importing app.main: {total / 1e6:.2f}s")
+    for package, micros in sorted(by_package.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {package:<30} {micros / 1000:8.1f}ms")
+    eager = sorted({name.split(".")[0] for name, _, _ in rows if name.split(".")[0] in LAZY_MODULES})
+    if eager:
+        print(f"Imported eagerly (should load on first use): {', '.join(eager)}")
+
+    # Then a full boot in this process. Run with -m, this module is __main__: importing it by name
+    # gives the instance app.main marks, with its clock starting now
+    from .startup import startup_profile as profile
+    from .main import app, lifespan
+
+    async def boot():
+        async with lifespan(app):
+            pass
+
+    asyncio.run(boot())
+    print(f"Ready to serve after {profile.total:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import threading
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+UTC = "UTC"
+
+# Offsets are sampled this often when building a table; transitions closer together are missed
+SAMPLE_STEP = timedelta(days=1)
+# Years either side of the current one covered up front; tables grow on demand past that
+YEARS_BEFORE = 1
+YEARS_AFTER = 5
+
+
+def validate_timezone(name: str) -> str:
+    """Return `name` if it's a known IANA zone, else raise ValueError."""
+    try:
+        ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown timezone: {name}")
+    return name
+
+
+class ZoneTable:
+    """A zone's UTC offsets as sorted transition instants, so conversions are a bisect.
+
+    Built once per zone by sampling zoneinfo and bisecting each change down to the second;
+    after that, converting a time never touches zoneinfo. All datetimes are naive; UTC ones
+    are the same naive UTC the database stores.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._zone = ZoneInfo(name)
+        self._lock = threading.Lock()
+        year = datetime.utcnow().year
+        self._build(year - YEARS_BEFORE, year + YEARS_AFTER)
+
+    def _offset(self, utc: datetime) -> timedelta:
+        return utc.replace(tzinfo=timezone.utc).astimezone(self._zone).utcoffset()
+
+    def _build(self, first_year: int, last_year: int):
+        start = datetime(first_year, 1, 1)
+        end = datetime(last_year + 1, 1, 1)
+        starts = [start]
+        offsets = [self._offset(start)]
+
+        sample = start
+        while sample < end:
+            following = min(sample + SAMPLE_STEP, end)
+            offset = self._offset(following)
+            if offset != offsets[-1]:
+                # The change is somewhere in (sample, following]: bisect to the second
+                low, high = sample, following
+                while high - low > timedelta(seconds=1):
+                    middle = low + (high - low) / 2
+                    if self._offset(middle) == offsets[-1]:
+                        low = middle
+                    else:
+                        high = middle
+                starts.append(high.replace(microsecond=0))
+                offsets.append(offset)
+            sample = following
+
+        # Swapped in together so readers never see a half-built table
+        self._table = (start, end, starts, offsets, first_year, last_year)
+
+    def _covering(self, utc: datetime) -> tuple:
+        table = self._table
+        if table[0] <= utc < table[1]:
+            return table
+        with self._lock:
+            _, _, _, _, first_year, last_year = self._table
+            self._build(min(first_year, utc.year - 1), max(last_year, utc.year + 1))
+            return self._table
+
+    def offset_at(self, utc: datetime) -> timedelta:
+        _, _, starts, offsets, _, _ = self._covering(utc)
+        return offsets[bisect_right(starts, utc) - 1]
+
+    def to_local(self, utc: datetime) -> datetime:
+        return utc + self.offset_at(utc)
+
+    def to_utc(self, local: datetime, after: datetime | None = None) -> datetime | None:
+        """The UTC instant of wall time `local`: the earliest reading later than `after`, if given.
+
+        A time repeated by a DST fall-back has two readings. A time skipped by a spring-forward
+        is moved forward by the gap, as zoneinfo does. Returns None only when every reading is
+        at or before `after`.
+        """
+        # No zone is more than a day from UTC, so these bracket any transition near `local`
+        before = self.offset_at(local - timedelta(days=1))
+        later = self.offset_at(local + timedelta(days=1))
+        readings = sorted({local - offset for offset in (before, later) if self.offset_at(local - offset) == offset})
+        if not readings:
+            readings = [local - before]
+        if after is not None:
+            readings = [reading for reading in readings if reading > after]
+        return readings[0] if readings else None
+
+
+@lru_cache(maxsize=None)
+def get_zone_table(name: str) -> ZoneTable:
+    return ZoneTable(name)
+
+
+def local_now(name: str | None, now: datetime | None = None) -> datetime:
+    """The current (or `now`'s) wall-clock time in zone `name`."""
+    now = now or datetime.utcnow()
+    return get_zone_table(name).to_local(now) if name and name != UTC else now
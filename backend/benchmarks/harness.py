@@ -0,0 +1,81 @@
+import json
+import resource
+import sys
+import time
+from pathlib import Path
+
+P99_FLOOR_MS = 1.0
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def summarize(name: str, latencies: list[float], elapsed: float, operations: int, **extra) -> dict:
+    """Throughput plus p50/p99 latency in milliseconds for one benchmark."""
+    latencies = sorted(latencies)
+    result = {
+        "name": name,
+        "operations": operations,
+        "seconds": round(elapsed, 4),
+        "throughput": round(operations / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        **extra
+    }
+    print(f"{name:<28} {result['throughput']:>12.1f}/s  p50 {result['p50_ms']:>9.3f}ms  "
+          f"p99 {result['p99_ms']:>9.3f}ms  rss {result['peak_rss_mb']:.0f}MB")
+    return result
+
+
+def time_calls(fn, iterations: int) -> tuple[list[float], float]:
+    """Call `fn` `iterations` times; returns per-call latencies and total elapsed seconds."""
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        call_start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - call_start)
+    return latencies, time.perf_counter() - start
+
+
+def save_baseline(path: Path, params: dict, results: list[dict]):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"params": params, "results": results}, indent=2) + "\n")
+    print(f"Baseline written to {path}")
+
+
+def compare_baseline(path: Path, params: dict, results: list[dict], tolerance: float) -> list[str]:
+    """Regressions against a stored baseline: throughput below, or p99 above, it by more than `tolerance`.
+
+    p99 also has to grow by at least P99_FLOOR_MS, so sub-millisecond jitter isn't reported.
+    """
+    baseline = json.loads(path.read_text())
+    if baseline["params"] != params:
+        print(f"Warning: baseline {path} was recorded with different parameters: {baseline['params']}")
+
+    previous = {result["name"]: result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get(result["name"])
+        if before is None:
+            continue
+        if result["throughput"] < before["throughput"] * (1 - tolerance):
+            regressions.append(f"{result['name']}: throughput {result['throughput']}/s "
+                               f"vs baseline {before['throughput']}/s")
+        if result["p99_ms"] > max(before["p99_ms"] * (1 + tolerance), before["p99_ms"] + P99_FLOOR_MS):
+            regressions.append(f"{result['name']}: p99 {result['p99_ms']}ms vs baseline {before['p99_ms']}ms")
+        if result.get("errors", 0) > before.get("errors", 0):
+            regressions.append(f"{result['name']}: {result['errors']} failed requests")
+    return regressions
@@ -0,0 +1,91 @@
+"""Benchmark suite for the scheduler, schedule math, auth dependency, API routes and response encoding.
+
+    python -m benchmarks.run                                      # SQLite scratch database
+    python -m benchmarks.run --database-url postgresql://localhost/nagqueen_bench
+    python -m benchmarks.run --save-baseline benchmarks/baselines/sqlite.json
+    python -m benchmarks.run --compare benchmarks/baselines/sqlite.json   # exits 1 on a regression
+
+The database is dropped and reseeded on every run, so never point it at real data.
+Baselines are only comparable when recorded on the same machine with the same parameters.
+"""
+import argparse
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+BENCHMARKS = ("schedule", "scheduler", "auth", "api", "serialization")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Nag Queen benchmarks")
+    parser.add_argument("--database-url", default="sqlite:///./benchmark.db",
+                        help="Scratch database; its tables are dropped and recreated")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--reminders", type=int, default=20000)
+    parser.add_argument("--skew", type=float, default=0.25,
+                        help="Fraction of reminders that are daily at 09:00 and due on every round")
+    parser.add_argument("--sms-latency-ms", type=int, default=5, help="Latency of each fake SMS send")
+    parser.add_argument("--rounds", type=int, default=3, help="Scheduler ticks to run over the 09:00 spike")
+    parser.add_argument("--iterations", type=int, default=20000, help="Calls for the schedule and auth benchmarks")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per API route")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients for the API routes")
+    parser.add_argument("--items", type=int, default=10000, help="List length for the serialization benchmark")
+    parser.add_argument("--encodes", type=int, default=20, help="Encodes of each list in the serialization benchmark")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument("--save-baseline", type=Path)
+    parser.add_argument("--compare", type=Path)
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed relative drop in throughput (or rise in p99) against the baseline")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    # Settings are read once at import, so configure the app before importing it
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["SMS_TRANSPORT"] = "fake"
+    os.environ["SMS_FAKE_LATENCY_MS"] = str(args.sms_latency_ms)
+    os.environ["RUN_SCHEDULER"] = "false"
+
+    from app.database import SessionLocal, engine
+    from . import harness, scenarios, seed
+
+    params = {
+        "database": engine.dialect.name,
+        **{key: value for key, value in vars(args).items()
+           if key not in ("database_url", "only", "save_baseline", "compare", "tolerance")}
+    }
+
+    seed.reset_database()
+    with SessionLocal() as db:
+        seeded = seed.seed(db, args.users, args.reminders, args.skew)
+    print(f"Seeded {args.users} users and {args.reminders} reminders ({seeded['due']} due at 09:00)\n")
+
+    results = []
+    if "schedule" in args.only:
+        results += scenarios.bench_calculate_next_run(args.iterations)
+    if "scheduler" in args.only:
+        results += scenarios.bench_scheduler(args.rounds, seeded["due"])
+    if "auth" in args.only:
+        results += asyncio.run(scenarios.bench_auth(seeded["user_ids"], args.iterations))
+    if "api" in args.only:
+        results += asyncio.run(scenarios.bench_api(seeded["user_ids"], args.requests, args.concurrency))
+    if "serialization" in args.only:
+        results += scenarios.bench_serialization(args.items, args.encodes)
+
+    if args.save_baseline:
+        harness.save_baseline(args.save_baseline, params, results)
+    if args.compare:
+        regressions = harness.compare_baseline(args.compare, params, results, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print("No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
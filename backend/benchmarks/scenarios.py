@@ -0,0 +1,198 @@
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, time as time_of_day
+
+import httpx
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import func, select
+
+from app.auth import create_access_token, get_approved_user, user_cache
+from app.database import ReadSessionLocal, SessionLocal
+from app.main import app
+from app.models import MessageStatus, OutboundMessage, ScheduleType, User
+from app.routers.admin import USER_COLUMNS
+from app.routers.reminders import RESPONSE_COLUMNS
+from app.schedule import calculate_next_run, calculate_next_runs, weekday_mask
+from app.scheduler import process_due_reminders, process_outbox
+from app.serialization import REMINDER_LIST, USER_LIST, FastJSONResponse, row_dicts
+from app.sms import get_transport
+
+from .harness import summarize, time_calls
+from .seed import make_skew_due
+
+
+def bench_calculate_next_run(iterations: int) -> list[dict]:
+    """Single-row calculate_next_run over random schedules, then the batched form on the 09:00 spike."""
+    rng = random.Random(0)
+    now = datetime.utcnow()
+    schedules = []
+    for _ in range(1000):
+        schedule_type = rng.choice([ScheduleType.daily, ScheduleType.weekly, ScheduleType.monthly])
+        schedules.append((
+            schedule_type,
+            time_of_day(rng.randrange(24), rng.randrange(60)),
+            sorted(rng.sample(range(7), rng.randint(1, 7))) if schedule_type == ScheduleType.weekly else None,
+            rng.choice(["1", "15", "31", "last"]) if schedule_type == ScheduleType.monthly else None
+        ))
+
+    position = iter(range(iterations))
+
+    def single():
+        schedule = schedules[next(position) % len(schedules)]
+        calculate_next_run(*schedule, now=now)
+
+    latencies, elapsed = time_calls(single, iterations)
+    results = [summarize("calculate_next_run", latencies, elapsed, iterations)]
+
+    batch = [(ScheduleType.daily, time_of_day(9, 0), None, None)] * 1000
+    columns = (
+        [schedule[0] for schedule in batch],
+        [schedule[1] for schedule in batch],
+        [weekday_mask(schedule[2]) for schedule in batch],
+        [schedule[3] for schedule in batch]
+    )
+    rounds = max(iterations // len(batch), 1)
+    latencies, elapsed = time_calls(lambda: calculate_next_runs(*columns, now=now), rounds)
+    results.append(summarize("calculate_next_runs_skewed", latencies, elapsed, rounds * len(batch)))
+    return results
+
+
+def bench_scheduler(rounds: int, due: int) -> list[dict]:
+    """Full ticks over the 09:00 spike: claim + enqueue + reschedule, then delivery through the fake transport."""
+    transport = get_transport()
+    enqueue_latencies, deliver_latencies, tick_latencies = [], [], []
+
+    for round_number in range(rounds):
+        if round_number:
+            with SessionLocal() as db:
+                make_skew_due(db)
+        sent_before = transport.sent
+
+        start = time.perf_counter()
+        process_due_reminders()
+        enqueued = time.perf_counter()
+        process_outbox()
+        finished = time.perf_counter()
+
+        enqueue_latencies.append(enqueued - start)
+        deliver_latencies.append(finished - enqueued)
+        tick_latencies.append(finished - start)
+
+        if transport.sent - sent_before != due:
+            with SessionLocal() as db:
+                pending = db.scalar(select(func.count()).where(OutboundMessage.status == MessageStatus.pending))
+            print(f"Warning: round {round_number} sent {transport.sent - sent_before} of {due} ({pending} pending)")
+
+    return [
+        summarize("scheduler_enqueue", enqueue_latencies, sum(enqueue_latencies), due * rounds),
+        summarize("scheduler_deliver", deliver_latencies, sum(deliver_latencies), due * rounds),
+        summarize("scheduler_tick", tick_latencies, sum(tick_latencies), due * rounds),
+    ]
+
+
+async def _time_async_calls(fn, iterations: int) -> tuple[list[float], float]:
+    latencies = []
+    start = time.perf_counter()
+    for i in range(iterations):
+        call_start = time.perf_counter()
+        await fn(i)
+        latencies.append(time.perf_counter() - call_start)
+    return latencies, time.perf_counter() - start
+
+
+async def bench_auth(user_ids: list[str], iterations: int) -> list[dict]:
+    """The auth dependency with a cold user cache (a DB lookup every call) and a warm one."""
+    credentials = [
+        HTTPAuthorizationCredentials(scheme="Bearer", credentials=create_access_token(user_id))
+        for user_id in user_ids[:100]
+    ]
+    results = []
+    async with ReadSessionLocal() as db:
+        async def cold(i):
+            user_cache.clear()
+            await get_approved_user(credentials[i % len(credentials)], db)
+
+        async def warm(i):
+            await get_approved_user(credentials[i % len(credentials)], db)
+
+        latencies, elapsed = await _time_async_calls(cold, iterations)
+        results.append(summarize("auth_dependency_cold", latencies, elapsed, iterations))
+        latencies, elapsed = await _time_async_calls(warm, iterations)
+        results.append(summarize("auth_dependency_cached", latencies, elapsed, iterations))
+    return results
+
+
+async def _load(send, total: int, concurrency: int) -> tuple[list[float], float, int]:
+    """Run `total` requests from `concurrency` concurrent clients; returns latencies, elapsed and errors."""
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def client():
+        nonlocal errors
+        for i in remaining:
+            start = time.perf_counter()
+            response = await send(i)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return latencies, time.perf_counter() - start, errors
+
+
+async def bench_api(user_ids: list[str], total: int, concurrency: int) -> list[dict]:
+    """In-process load test of the main routes through the full ASGI stack (middleware included)."""
+    headers = [{"Authorization": f"Bearer {create_access_token(user_id)}"} for user_id in user_ids[:100]]
+    new_reminder = {"message": "Benchmark", "schedule_type": "daily", "schedule_time": "09:00"}
+
+    routes = {
+        "api_get_me": lambda client, i: client.get("/auth/me", headers=headers[i % len(headers)]),
+        "api_list_reminders": lambda client, i: client.get(
+            "/reminders", params={"limit": 100}, headers=headers[i % len(headers)]
+        ),
+        "api_create_reminder": lambda client, i: client.post(
+            "/reminders", json=new_reminder, headers=headers[i % len(headers)]
+        ),
+    }
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        for name, route in routes.items():
+            latencies, elapsed, errors = await _load(lambda i: route(client, i), total, concurrency)
+            results.append(summarize(name, latencies, elapsed, total, errors=errors))
+    return results
+
+
+def bench_serialization(items: int, rounds: int) -> list[dict]:
+    """Encoding `items`-long reminder and user lists: the response_model path vs serialization.py's.
+
+    The response_model path is what FastAPI does with a returned list: validate every row into
+    the model, then dump it. The fast path builds dicts from the rows and encodes them as they are.
+    """
+    with SessionLocal() as db:
+        reminders = db.execute(select(*RESPONSE_COLUMNS).limit(items)).all()
+        users = db.execute(select(*USER_COLUMNS).order_by(User.created_at)).all()
+    # Fewer users than items are seeded, so repeat them to the same length
+    users = (users * (items // max(len(users), 1) + 1))[:items]
+
+    results = []
+    for kind, rows, adapter in (("reminders", reminders, REMINDER_LIST), ("users", users, USER_LIST)):
+        def validated():
+            return adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+
+        def fast():
+            return FastJSONResponse(row_dicts(rows)).body
+
+        if json.loads(validated()) != json.loads(fast()):
+            print(f"Warning: the fast path's {kind} JSON differs from the response model's")
+
+        latencies, elapsed = time_calls(validated, rounds)
+        results.append(summarize(f"serialize_{kind}_validated", latencies, elapsed, rounds * len(rows)))
+        latencies, elapsed = time_calls(fast, rounds)
+        results.append(summarize(f"serialize_{kind}_fast", latencies, elapsed, rounds * len(rows)))
+    return results
@@ -0,0 +1,109 @@
+import random
+import uuid
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from app.database import Base, engine
+from app.deliveries import ensure_partitions
+from app.models import User, Reminder, ScheduleType, OutboundMessage
+from app.schedule import calculate_next_run
+
+SKEW_TIME = time(9, 0)
+CHUNK_SIZE = 1000
+
+
+def reset_database():
+    """Drop and recreate every table. Only ever point the benchmarks at a scratch database."""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        ensure_partitions(conn, datetime.utcnow())
+
+
+def _random_schedule(rng: random.Random) -> dict:
+    schedule_type = rng.choice([ScheduleType.daily, ScheduleType.weekly, ScheduleType.monthly, ScheduleType.once])
+    schedule = {
+        "schedule_type": schedule_type,
+        # Off the hour, so none of these coincide with the 09:00 spike
+        "schedule_time": time(rng.randrange(24), rng.randrange(1, 60, 5)),
+        "schedule_days": None,
+        "schedule_day_of_month": None,
+    }
+    if schedule_type == ScheduleType.weekly:
+        schedule["schedule_days"] = sorted(rng.sample(range(7), rng.randint(1, 7)))
+    elif schedule_type == ScheduleType.monthly:
+        schedule["schedule_day_of_month"] = rng.choice([str(rng.randint(1, 31)), "last"])
+    return schedule
+
+
+def seed(db: Session, users: int, reminders: int, skew: float, random_seed: int = 0) -> dict:
+    """Insert `users` approved users and `reminders` reminders spread across them.
+
+    A `skew` fraction of the reminders are daily at 09:00 and already due, so one tick has to
+    work through all of them - the morning spike real traffic produces. The rest get random
+    schedules with a future next_run.
+    """
+    rng = random.Random(random_seed)
+    now = datetime.utcnow()
+
+    user_rows = [
+        {"id": str(uuid.uuid4()), "phone_number": f"+1555{i:07d}", "is_approved": True,
+         "is_admin": i == 0, "created_at": now}
+        for i in range(users)
+    ]
+    for start in range(0, len(user_rows), CHUNK_SIZE):
+        db.execute(insert(User), user_rows[start:start + CHUNK_SIZE])
+
+    skewed = int(reminders * skew)
+    reminder_rows = []
+    for i in range(reminders):
+        if i < skewed:
+            schedule = {"schedule_type": ScheduleType.daily, "schedule_time": SKEW_TIME,
+                        "schedule_days": None, "schedule_day_of_month": None}
+            next_run = now - timedelta(minutes=1)
+        else:
+            schedule = _random_schedule(rng)
+            next_run = calculate_next_run(
+                schedule["schedule_type"],
+                schedule["schedule_time"],
+                schedule["schedule_days"],
+                schedule["schedule_day_of_month"],
+                now.date() + timedelta(days=2) if schedule["schedule_type"] == ScheduleType.once else None,
+                # At least an hour out, so they don't fire in the middle of a benchmark
+                now=now + timedelta(hours=1)
+            )
+        reminder_rows.append({
+            "id": str(uuid.uuid4()),
+            "user_id": user_rows[i % users]["id"],
+            "message": f"Benchmark reminder {i}",
+            "next_run": next_run,
+            "is_active": True,
+            "created_at": now,
+            "updated_at": now,
+            **schedule
+        })
+        if len(reminder_rows) >= CHUNK_SIZE:
+            db.execute(insert(Reminder), reminder_rows)
+            reminder_rows = []
+    if reminder_rows:
+        db.execute(insert(Reminder), reminder_rows)
+
+    db.commit()
+    return {"user_ids": [row["id"] for row in user_rows], "due": skewed}
+
+
+def make_skew_due(db: Session) -> int:
+    """Put every 09:00 reminder back in the past for another round, and clear the sent queue.
+
+    The next_run moves each round, so the outbox idempotency keys don't collide with earlier rounds.
+    """
+    result = db.execute(
+        update(Reminder)
+        .where(Reminder.schedule_time == SKEW_TIME, Reminder.schedule_type == ScheduleType.daily)
+        .values(next_run=datetime.utcnow() - timedelta(minutes=1), is_active=True)
+    )
+    db.execute(OutboundMessage.__table__.delete())
+    db.commit()
+    return result.rowcount
@@ -0,0 +1,96 @@
+import os
+import tempfile
+from pathlib import Path
+
+# Settings are read once at import, so configure the app before anything imports it
+_scratch = Path(tempfile.mkdtemp(prefix="nagqueen-tests-"))
+os.environ["DATABASE_URL"] = f"sqlite:///{_scratch / 'test.db'}"
+os.environ["SMS_TRANSPORT"] = "fake"
+os.environ["SMS_FAKE_LATENCY_MS"] = "0"
+os.environ["RUN_SCHEDULER"] = "false"
+os.environ["AUTO_MIGRATE"] = "true"
+
+from datetime import datetime, time, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import migrations
+from app.auth import create_access_token
+from app.database import Base, SessionLocal, engine
+from app.main import app
+from app.models import OutboundMessage, Reminder, ScheduleType, User
+
+
+@pytest.fixture
+def db():
+    """A session on a freshly migrated database, dropped again afterwards."""
+    migrations.migrate(engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+        migrations.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def client(db):
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def user(db) -> User:
+    user = User(phone_number="+15550000001", is_approved=True)
+    db.add(user)
+    db.commit()
+    return user
+
+
+@pytest.fixture
+def auth_headers(user) -> dict:
+    return {"Authorization": f"Bearer {create_access_token(user.id)}"}
+
+
+@pytest.fixture
+def admin(db) -> User:
+    admin = User(phone_number="+15550000009", is_approved=True, is_admin=True)
+    db.add(admin)
+    db.commit()
+    return admin
+
+
+@pytest.fixture
+def admin_headers(admin) -> dict:
+    return {"Authorization": f"Bearer {create_access_token(admin.id)}"}
+
+
+@pytest.fixture
+def add_reminder(db, user):
+    """Factory for the test user's reminders: one-time at 09:00, due at `next_run`, unless `fields` say otherwise."""
+    def add(next_run: datetime, **fields) -> Reminder:
+        fields.setdefault("message", "hi")
+        fields.setdefault("schedule_type", ScheduleType.once)
+        fields.setdefault("schedule_time", time(9, 0))
+        reminder = Reminder(user_id=user.id, next_run=next_run, **fields)
+        db.add(reminder)
+        db.commit()
+        return reminder
+    return add
+
+
+@pytest.fixture
+def add_message(db):
+    """Factory for pending outbox messages to the test user, with `key` as body and ready to send
+    unless `fields` say otherwise."""
+    def add(key: str, **fields) -> OutboundMessage:
+        fields.setdefault("phone_number", "+15550000001")
+        fields.setdefault("body", key)
+        fields.setdefault("next_attempt_at", datetime.utcnow() - timedelta(seconds=1))
+        message = OutboundMessage(idempotency_key=key, **fields)
+        db.add(message)
+        db.commit()
+        return message
+    return add
@@ -0,0 +1,146 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import auth
+from app.database import AsyncSessionLocal
+from app.models import User
+from app.routers import admin as admin_router
+
+
+@pytest.fixture(autouse=True)
+def empty_stats_cache():
+    admin_router.stats_cache.clear()
+    yield
+    admin_router.stats_cache.clear()
+
+
+@pytest.fixture
+def add_users(db, admin):
+    """Users older than the admin, newest first; every other one pending. Two share a created_at."""
+    def add(count: int) -> list[User]:
+        users = [
+            User(
+                phone_number=f"+1555100{n:04d}",
+                is_approved=n % 2 == 1,
+                created_at=admin.created_at - timedelta(minutes=n // 2 * 2 + 1)
+            )
+            for n in range(count)
+        ]
+        db.add_all(users)
+        db.commit()
+        return users
+    return add
+
+
+def walk(client, headers, path: str, limit: int) -> list[list[str]]:
+    """The ids on each page of an admin listing, following X-Next-Cursor to the end."""
+    pages, params = [], {"limit": limit}
+    while True:
+        response = client.get(path, headers=headers, params=params)
+        assert response.status_code == 200
+        pages.append([user["id"] for user in response.json()])
+        if "X-Next-Cursor" not in response.headers:
+            return pages
+        params["cursor"] = response.headers["X-Next-Cursor"]
+
+
+def newest_first(users: list[User]) -> list[str]:
+    return [user.id for user in sorted(users, key=lambda user: (user.created_at, user.id), reverse=True)]
+
+
+def test_user_listing_pages_through_every_user_newest_first(client, admin, admin_headers, add_users):
+    users = add_users(5)
+
+    pages = walk(client, admin_headers, "/admin/users", limit=2)
+    assert [len(page) for page in pages] == [2, 2, 2]
+    assert sum(pages, []) == newest_first([admin, *users])
+
+
+def test_pending_listing_pages_through_pending_users(client, admin_headers, add_users):
+    users = add_users(6)
+
+    pages = walk(client, admin_headers, "/admin/users/pending", limit=2)
+    assert [len(page) for page in pages] == [2, 1]
+    assert sum(pages, []) == newest_first([user for user in users if not user.is_approved])
+
+
+def test_a_listing_that_fits_one_page_has_no_cursor(client, admin_headers, add_users):
+    add_users(1)
+    assert [len(page) for page in walk(client, admin_headers, "/admin/users", limit=2)] == [2]
+
+
+def test_invalid_cursor_is_rejected(client, admin_headers):
+    response = client.get("/admin/users", headers=admin_headers, params={"cursor": "not a cursor"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_stats_are_cached_until_an_admin_change(client, db, admin_headers, add_users, add_reminder):
+    users = add_users(3)
+    add_reminder(datetime.utcnow() + timedelta(hours=1))
+    add_reminder(datetime.utcnow() + timedelta(hours=1), is_active=False)
+
+    stats = client.get("/admin/stats", headers=admin_headers).json()
+    # The admin, the reminders' owner and the added users
+    assert {key: stats[key] for key in ("users", "approved_users", "pending_users", "admins")} == {
+        "users": 5, "approved_users": 3, "pending_users": 2, "admins": 1
+    }
+    assert (stats["reminders"], stats["active_reminders"]) == (2, 1)
+
+    db.add(User(phone_number="+15559999999"))
+    db.commit()
+    assert client.get("/admin/stats", headers=admin_headers).json() == stats
+
+    client.post(f"/admin/users/{users[0].id}/approve", headers=admin_headers)
+    stats = client.get("/admin/stats", headers=admin_headers).json()
+    assert (stats["users"], stats["pending_users"]) == (6, 2)
+
+
+def test_bulk_approve_approves_only_pending_users(client, db, admin_headers, add_users):
+    users = add_users(4)
+
+    response = client.post(
+        "/admin/users/approve", headers=admin_headers, json={"user_ids": [user.id for user in users] + ["missing"]}
+    )
+    assert response.json() == {"count": 2}
+    db.expire_all()
+    assert all(user.is_approved for user in users)
+
+
+def test_bulk_reject_skips_approved_users_and_admins(client, db, admin, admin_headers, add_users):
+    users = add_users(4)
+
+    response = client.post(
+        "/admin/users/reject", headers=admin_headers, json={"user_ids": [admin.id] + [user.id for user in users]}
+    )
+    assert response.json() == {"count": 2}
+    remaining = {user.id for user in db.query(User.id)}
+    assert remaining == {admin.id} | {user.id for user in users if user.is_approved}
+
+
+@pytest.mark.parametrize("user_ids", [[], [str(n) for n in range(1001)]], ids=["empty", "too many"])
+def test_bulk_requests_are_bounded(client, admin_headers, user_ids):
+    for action in ("approve", "reject"):
+        response = client.post(f"/admin/users/{action}", headers=admin_headers, json={"user_ids": user_ids})
+        assert response.status_code == 422
+
+
+def test_bulk_endpoints_are_admin_only(client, auth_headers):
+    response = client.post("/admin/users/approve", headers=auth_headers, json={"user_ids": ["x"]})
+    assert response.status_code == 403
+
+
+def test_only_the_first_user_becomes_an_admin(db, monkeypatch):
+    monkeypatch.setattr(auth, "_users_exist", False)
+
+    async def sign_up(phone_number: str) -> User:
+        async with AsyncSessionLocal() as session:
+            return await auth.get_or_create_user(session, phone_number)
+
+    first = asyncio.run(sign_up("+15550000001"))
+    assert (first.is_admin, first.is_approved) == (True, True)
+    second = asyncio.run(sign_up("+15550000002"))
+    assert (second.is_admin, second.is_approved) == (False, False)
+    assert asyncio.run(sign_up("+15550000001")).id == first.id
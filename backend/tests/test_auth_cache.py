@@ -0,0 +1,128 @@
+import pytest
+
+from app import cache
+from app.auth import create_access_token, invalidate_user, user_cache
+from app.cache import TTLCache
+from app.models import User
+
+
+@pytest.fixture(autouse=True)
+def empty_user_cache():
+    user_cache.clear()
+    yield
+    user_cache.clear()
+
+
+@pytest.fixture
+def pending_user(db) -> User:
+    user = User(phone_number="+15550000002", is_approved=False)
+    db.add(user)
+    db.commit()
+    return user
+
+
+def headers_for(user: User) -> dict:
+    return {"Authorization": f"Bearer {create_access_token(user.id)}"}
+
+
+def test_authenticated_user_is_served_from_the_cache(client, db, user, auth_headers):
+    assert client.get("/auth/me", headers=auth_headers).json()["timezone"] == "UTC"
+
+    # Changed behind the API's back, so only visible once the entry is dropped
+    user.timezone = "Europe/Paris"
+    db.commit()
+    assert client.get("/auth/me", headers=auth_headers).json()["timezone"] == "UTC"
+
+    invalidate_user(user.id)
+    assert client.get("/auth/me", headers=auth_headers).json()["timezone"] == "Europe/Paris"
+
+
+def test_deleted_user_is_rejected_once_invalidated(client, db, user, auth_headers):
+    assert client.get("/auth/me", headers=auth_headers).status_code == 200
+    db.delete(user)
+    db.commit()
+
+    invalidate_user(user.id)
+    response = client.get("/auth/me", headers=auth_headers)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "User not found"
+
+
+def test_updating_the_timezone_refreshes_the_cached_user(client, auth_headers):
+    client.get("/auth/me", headers=auth_headers)
+
+    response = client.put("/auth/me", headers=auth_headers, json={"timezone": "Asia/Tokyo"})
+    assert response.json()["timezone"] == "Asia/Tokyo"
+    assert client.get("/auth/me", headers=auth_headers).json()["timezone"] == "Asia/Tokyo"
+
+
+@pytest.mark.parametrize("approve", [
+    lambda client, headers, user_id: client.post(f"/admin/users/{user_id}/approve", headers=headers),
+    lambda client, headers, user_id: client.post("/admin/users/approve", headers=headers, json={"user_ids": [user_id]}),
+], ids=["single", "bulk"])
+def test_approval_takes_effect_on_the_next_request(client, admin_headers, pending_user, approve):
+    headers = headers_for(pending_user)
+    response = client.get("/reminders", headers=headers)
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Account pending approval"
+
+    assert approve(client, admin_headers, pending_user.id).status_code == 200
+    assert client.get("/reminders", headers=headers).status_code == 200
+
+
+@pytest.mark.parametrize("reject", [
+    lambda client, headers, user_id: client.post(f"/admin/users/{user_id}/reject", headers=headers),
+    lambda client, headers, user_id: client.post("/admin/users/reject", headers=headers, json={"user_ids": [user_id]}),
+], ids=["single", "bulk"])
+def test_rejected_user_loses_access_on_the_next_request(client, admin_headers, pending_user, reject):
+    headers = headers_for(pending_user)
+    assert client.get("/auth/me", headers=headers).status_code == 200
+
+    assert reject(client, admin_headers, pending_user.id).is_success
+    assert client.get("/auth/me", headers=headers).status_code == 401
+
+
+def test_new_admin_gets_admin_access_on_the_next_request(client, admin_headers, user, auth_headers):
+    response = client.get("/admin/users", headers=auth_headers)
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Admin access required"
+
+    assert client.post(f"/admin/users/{user.id}/make-admin", headers=admin_headers).status_code == 200
+    assert client.get("/admin/users", headers=auth_headers).status_code == 200
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_ttl_cache_entries_expire(clock):
+    entries = TTLCache(max_size=10, ttl=60)
+    entries.set("a", 1)
+
+    clock[0] += 59
+    assert entries.get("a") == 1
+    clock[0] += 1
+    assert entries.get("a") is None
+    assert len(entries) == 0
+
+
+def test_ttl_cache_evicts_the_least_recently_used(clock):
+    entries = TTLCache(max_size=2, ttl=60)
+    entries.set("a", 1)
+    entries.set("b", 2)
+    assert entries.get("a") == 1
+
+    entries.set("c", 3)
+    assert entries.get("b") is None
+    assert entries.get("a") == 1
+    assert entries.get("c") == 3
+
+
+@pytest.mark.parametrize("max_size, ttl", [(0, 60), (10, 0)])
+def test_ttl_cache_can_be_disabled(max_size, ttl):
+    entries = TTLCache(max_size=max_size, ttl=ttl)
+    entries.set("a", 1)
+    assert entries.get("a") is None
@@ -0,0 +1,148 @@
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import select
+
+from app import occurrences
+from app.models import Reminder, ReminderOccurrence, ScheduleType, User
+
+DAILY = {"message": "stretch", "schedule_type": "daily", "schedule_time": "09:00:00"}
+
+
+def calendar(client, headers, start: datetime, end: datetime):
+    return client.get(
+        "/reminders/calendar", headers=headers, params={"from": start.isoformat(), "to": end.isoformat()}
+    )
+
+
+def occurrence_times(db, reminder_id: str) -> list[datetime]:
+    return db.scalars(
+        select(ReminderOccurrence.occurs_at)
+        .where(ReminderOccurrence.reminder_id == reminder_id)
+        .order_by(ReminderOccurrence.occurs_at)
+    ).all()
+
+
+def test_creating_a_reminder_fills_in_its_calendar(client, db, auth_headers):
+    now = datetime.utcnow()
+    created = client.post("/reminders", headers=auth_headers, json=DAILY).json()
+
+    entries = calendar(client, auth_headers, now, now + timedelta(days=7)).json()
+    assert len(entries) == 7
+    assert {entry["message"] for entry in entries} == {"stretch"}
+    assert {entry["reminder_id"] for entry in entries} == {created["id"]}
+    assert entries[0]["occurs_at"] == created["next_run"]
+    times = [datetime.fromisoformat(entry["occurs_at"]) for entry in entries]
+    assert all(later - earlier == timedelta(days=1) for earlier, later in zip(times, times[1:]))
+
+    # Materialized past the horizon, so the scheduler needn't revisit it for a while
+    reminder = db.get(Reminder, created["id"])
+    assert reminder.occurrences_until >= occurrences.horizon(now)
+    assert occurrence_times(db, reminder.id)[-1] <= reminder.occurrences_until
+
+
+def test_calendar_interleaves_reminders_in_time_order(client, auth_headers):
+    client.post("/reminders", headers=auth_headers, json=DAILY)
+    client.post("/reminders", headers=auth_headers, json={**DAILY, "message": "water", "schedule_time": "08:00:00"})
+    client.post("/reminders", headers=auth_headers, json={**DAILY, "schedule_type": "weekly", "schedule_days": [0]})
+
+    now = datetime.utcnow()
+    entries = calendar(client, auth_headers, now, now + timedelta(days=14)).json()
+    assert len(entries) == 14 + 14 + 2
+    assert [entry["occurs_at"] for entry in entries] == sorted(entry["occurs_at"] for entry in entries)
+
+
+def test_calendar_only_shows_the_callers_reminders(client, db, auth_headers):
+    other = User(phone_number="+15550000002", is_approved=True)
+    db.add(other)
+    db.commit()
+    theirs = Reminder(
+        user_id=other.id, message="theirs", schedule_type=ScheduleType.once,
+        schedule_time=time(9, 0), next_run=datetime.utcnow() + timedelta(hours=1)
+    )
+    db.add(theirs)
+    db.commit()
+    db.add(ReminderOccurrence(reminder_id=theirs.id, user_id=other.id, occurs_at=theirs.next_run))
+    db.commit()
+
+    now = datetime.utcnow()
+    assert calendar(client, auth_headers, now, now + timedelta(days=1)).json() == []
+
+
+def test_rescheduling_replaces_upcoming_occurrences(client, db, auth_headers):
+    created = client.post("/reminders", headers=auth_headers, json=DAILY).json()
+
+    response = client.put(f"/reminders/{created['id']}", headers=auth_headers, json={"schedule_time": "18:30:00"})
+    assert response.status_code == 200
+    times = occurrence_times(db, created["id"])
+    assert times
+    assert {occurs_at.time() for occurs_at in times} == {time(18, 30)}
+
+    # Renaming leaves the schedule, and so the rows, alone
+    client.put(f"/reminders/{created['id']}", headers=auth_headers, json={"message": "renamed"})
+    assert occurrence_times(db, created["id"]) == times
+
+
+def test_pausing_clears_upcoming_occurrences_and_resuming_restores_them(client, db, auth_headers):
+    created = client.post("/reminders", headers=auth_headers, json=DAILY).json()
+    before = occurrence_times(db, created["id"])
+
+    client.put(f"/reminders/{created['id']}", headers=auth_headers, json={"is_active": False})
+    assert occurrence_times(db, created["id"]) == []
+
+    client.put(f"/reminders/{created['id']}", headers=auth_headers, json={"is_active": True})
+    assert occurrence_times(db, created["id"])[0] == before[0]
+
+
+def test_calendar_rejects_empty_and_oversized_ranges(client, auth_headers):
+    now = datetime.utcnow()
+    assert calendar(client, auth_headers, now, now).status_code == 400
+    assert calendar(client, auth_headers, now, now + timedelta(days=365)).status_code == 400
+
+
+def test_refresh_fills_in_reminders_never_materialized(db, add_reminder):
+    now = datetime.utcnow()
+    reminder = add_reminder(now + timedelta(hours=1), schedule_type=ScheduleType.daily)
+    paused = add_reminder(now + timedelta(hours=1), schedule_type=ScheduleType.daily, is_active=False)
+
+    assert occurrences.refresh_occurrences(db, now) == 1
+    db.expire_all()
+    assert reminder.occurrences_until == occurrences.horizon(now) + occurrences.TOP_UP_SLACK
+    assert len(occurrence_times(db, reminder.id)) >= 62
+    assert occurrence_times(db, paused.id) == []
+
+    # Covered past the horizon now, so the next refresh has nothing to do
+    assert occurrences.refresh_occurrences(db, now + timedelta(days=1)) == 0
+
+
+def test_refresh_prunes_occurrences_past_retention(db, add_reminder):
+    now = datetime.utcnow()
+    reminder = add_reminder(now - timedelta(days=40), is_active=False)
+    db.add_all([
+        ReminderOccurrence(reminder_id=reminder.id, user_id=reminder.user_id, occurs_at=now - timedelta(days=days_ago))
+        for days_ago in (40, 10)
+    ])
+    db.commit()
+
+    occurrences.refresh_occurrences(db, now)
+    assert occurrence_times(db, reminder.id) == [now - timedelta(days=10)]
+
+
+def test_top_up_skips_reminders_already_covered_past_the_horizon(add_reminder):
+    now = datetime.utcnow()
+    reminder = add_reminder(now + timedelta(hours=1), schedule_type=ScheduleType.daily)
+
+    rows, windows = occurrences.build_top_up([reminder], [reminder.user_id], [occurrences.horizon(now)], now)
+    assert (rows, windows) == ([], [])
+
+    # Short of it: only what lies past the existing window is added
+    covered = now + timedelta(days=60)
+    rows, windows = occurrences.build_top_up([reminder], [reminder.user_id], [covered], now)
+    assert rows and all(row["occurs_at"] > covered for row in rows)
+    assert windows == [{"id": reminder.id, "occurrences_until": occurrences.horizon(now) + occurrences.TOP_UP_SLACK}]
+
+
+def test_one_time_reminders_occur_once(add_reminder):
+    now = datetime.utcnow()
+    reminder = add_reminder(now + timedelta(days=3))
+    assert occurrences.expand(reminder, now, occurrences.horizon(now)) == [reminder.next_run]
+    assert occurrences.expand(reminder, now + timedelta(days=4), occurrences.horizon(now)) == []
@@ -0,0 +1,27 @@
+from starlette.requests import Request
+
+from app.routers import auth
+
+
+def make_request(forwarded: list[str], peer: str = "10.0.0.2") -> Request:
+    headers = [(b"x-forwarded-for", value.encode()) for value in forwarded]
+    return Request({"type": "http", "headers": headers, "client": (peer, 1234)})
+
+
+def test_uses_the_peer_without_trusted_proxies(monkeypatch):
+    monkeypatch.setattr(auth.settings, "trusted_proxy_hops", 0)
+    assert auth.client_ip(make_request(["203.0.113.9"])) == "10.0.0.2"
+
+
+def test_ignores_client_supplied_entries(monkeypatch):
+    monkeypatch.setattr(auth.settings, "trusted_proxy_hops", 1)
+    # The client sent "1.2.3.4"; the proxy appended the address it actually saw
+    assert auth.client_ip(make_request(["1.2.3.4, 203.0.113.9"])) == "203.0.113.9"
+    assert auth.client_ip(make_request(["5.6.7.8", "203.0.113.9"])) == "203.0.113.9"
+
+
+def test_counts_hops_from_the_right(monkeypatch):
+    monkeypatch.setattr(auth.settings, "trusted_proxy_hops", 2)
+    assert auth.client_ip(make_request(["1.2.3.4, 203.0.113.9, 10.0.0.1"])) == "203.0.113.9"
+    assert auth.client_ip(make_request(["203.0.113.9"])) == "203.0.113.9"
+    assert auth.client_ip(make_request([])) == "10.0.0.2"
@@ -0,0 +1,33 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+from app.deliveries import drop_expired_partitions, month_start, partition_name
+
+
+class RecordingConnection:
+    """Stands in for a Postgres connection: lists the given partitions, records the rest."""
+
+    def __init__(self, partitions: list[str]):
+        self.partitions = partitions
+        self.statements = []
+
+    def execute(self, statement):
+        if "pg_inherits" in str(statement):
+            return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: self.partitions))
+        self.statements.append(str(statement))
+
+
+def test_retention_drops_whole_expired_months_only():
+    conn = RecordingConnection(["deliveries_y2026m01", "deliveries_y2026m02", "deliveries_y2026m03"])
+    assert drop_expired_partitions(conn, datetime(2026, 3, 1)) == ["deliveries_y2026m01", "deliveries_y2026m02"]
+    assert conn.statements == ["DROP TABLE IF EXISTS deliveries_y2026m01", "DROP TABLE IF EXISTS deliveries_y2026m02"]
+
+
+def test_retention_skips_partitions_it_didnt_name():
+    conn = RecordingConnection(["deliveries_default", "deliveries_y2025m12", "deliveries_archive_2019"])
+    assert drop_expired_partitions(conn, datetime(2026, 3, 1)) == ["deliveries_y2025m12"]
+
+
+def test_partition_names_and_month_arithmetic():
+    assert partition_name(month_start(datetime(2026, 11, 15, 13), 2)) == "deliveries_y2027m01"
+    assert month_start(datetime(2026, 3, 31), -3) == datetime(2025, 12, 1)
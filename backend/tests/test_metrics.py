@@ -0,0 +1,24 @@
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.metrics import instrument_engine
+
+
+def observed(name: str) -> float:
+    return REGISTRY.get_sample_value("nagqueen_db_query_seconds_count", {"engine": name}) or 0
+
+
+def test_failed_statements_leave_nothing_behind():
+    bind = create_engine("sqlite://")
+    instrument_engine(bind, "test-failures")
+
+    with bind.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM missing"))
+        conn.execute(text("SELECT 1"))
+        assert "query_start" not in conn.info
+    assert observed("test-failures") == 1
+    bind.dispose()
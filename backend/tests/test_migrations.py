@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app import migrations, scheduler
+
+
+@pytest.fixture
+def scratch_url(tmp_path) -> str:
+    return f"sqlite:///{tmp_path / 'scratch.db'}"
+
+
+def check(url: str) -> int:
+    async def run():
+        bind = create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://"))
+        try:
+            return await migrations.check_schema(bind)
+        finally:
+            await bind.dispose()
+    return asyncio.run(run())
+
+
+def test_startup_refuses_an_outdated_schema(scratch_url):
+    with pytest.raises(migrations.SchemaOutdated):
+        check(scratch_url)
+
+
+def test_outdated_schema_can_be_allowed(scratch_url, monkeypatch):
+    monkeypatch.setattr(migrations.settings, "allow_outdated_schema", True)
+    assert check(scratch_url) == 0
+
+
+def test_migrate_brings_a_database_up_to_date_once(scratch_url):
+    bind = create_engine(scratch_url)
+    assert migrations.migrate(bind) == [version for version, _, _ in migrations.MIGRATIONS]
+    assert migrations.migrate(bind) == []
+    bind.dispose()
+
+    assert check(scratch_url) == migrations.LATEST_VERSION
+
+
+def test_sync_check_matches_the_async_one(scratch_url, monkeypatch):
+    bind = create_engine(scratch_url)
+    with pytest.raises(migrations.SchemaOutdated):
+        migrations.check_schema_sync(bind)
+    monkeypatch.setattr(migrations.settings, "allow_outdated_schema", True)
+    assert migrations.check_schema_sync(bind) == 0
+    bind.dispose()
+
+
+def test_scheduler_worker_refuses_an_outdated_schema(monkeypatch):
+    started = []
+    monkeypatch.setattr(scheduler.settings, "auto_migrate", False)
+    monkeypatch.setattr(scheduler, "_start", started.append)
+
+    # The test database is empty until the db fixture migrates it
+    with pytest.raises(migrations.SchemaOutdated):
+        scheduler.main()
+    assert started == []
+
+
+def test_scheduler_worker_starts_on_a_current_schema(db, monkeypatch):
+    started = []
+    monkeypatch.setattr(scheduler.settings, "auto_migrate", False)
+    monkeypatch.setattr(scheduler, "_start", started.append)
+
+    scheduler.main()
+    assert len(started) == 1
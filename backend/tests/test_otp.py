@@ -0,0 +1,172 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app import auth, otp, ratelimit
+from app.models import OTPCode
+from app.ratelimit import SlidingWindowLimiter
+from app.routers import auth as auth_router
+
+PHONE = "+15550000001"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ratelimit.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    """Fresh OTP limiters for the API tests: 2 requests per phone and 4 per IP, 5 verifications per phone."""
+    monkeypatch.setattr(auth_router, "otp_request_limits", (SlidingWindowLimiter(4, 900), SlidingWindowLimiter(2, 900)))
+    monkeypatch.setattr(auth_router, "otp_verify_limits", (SlidingWindowLimiter(50, 900), SlidingWindowLimiter(5, 900)))
+    monkeypatch.setattr(otp, "_store", None)
+
+
+def test_memory_store_codes_are_single_use(clock):
+    async def run():
+        store = otp.MemoryOTPStore(ttl=300, max_size=10)
+        await store.issue(PHONE, "111111")
+        return [
+            await store.consume(PHONE, "999999"),
+            await store.consume("+15550000002", "111111"),
+            await store.consume(PHONE, "111111"),
+            await store.consume(PHONE, "111111"),
+        ]
+
+    assert asyncio.run(run()) == [False, False, True, False]
+
+
+def test_memory_store_only_accepts_the_latest_unexpired_code(clock):
+    async def run():
+        store = otp.MemoryOTPStore(ttl=300, max_size=10)
+        await store.issue(PHONE, "111111")
+        await store.issue(PHONE, "222222")
+        superseded = await store.consume(PHONE, "111111")
+
+        clock[0] += 300
+        expired = await store.consume(PHONE, "222222")
+        return superseded, expired
+
+    assert asyncio.run(run()) == (False, False)
+
+
+def test_database_store_codes_are_single_use_and_only_the_latest_counts(db):
+    async def run():
+        store = otp.DatabaseOTPStore(ttl=300, purge_interval=300)
+        await store.issue(PHONE, "111111")
+        await store.issue(PHONE, "222222")
+        return [
+            await store.consume(PHONE, "111111"),
+            await store.consume(PHONE, "222222"),
+            await store.consume(PHONE, "222222"),
+        ]
+
+    assert asyncio.run(run()) == [False, True, False]
+
+
+def test_database_store_rejects_expired_codes(db):
+    db.add(OTPCode(
+        phone_number=PHONE,
+        code="111111",
+        expires_at=datetime.utcnow() - timedelta(seconds=1),
+        created_at=datetime.utcnow() - timedelta(minutes=5)
+    ))
+    db.commit()
+
+    store = otp.DatabaseOTPStore(ttl=300, purge_interval=300)
+    assert asyncio.run(store.consume(PHONE, "111111")) is False
+
+
+def test_database_store_purges_used_and_expired_codes(db):
+    now = datetime.utcnow()
+    db.add_all([
+        OTPCode(phone_number=PHONE, code="111111", used=True, expires_at=now + timedelta(minutes=5), created_at=now),
+        OTPCode(phone_number=PHONE, code="222222", expires_at=now - timedelta(seconds=1), created_at=now),
+        OTPCode(phone_number=PHONE, code="333333", expires_at=now + timedelta(minutes=5), created_at=now),
+    ])
+    db.commit()
+
+    store = otp.DatabaseOTPStore(ttl=300, purge_interval=300)
+    assert asyncio.run(store.purge()) == 2
+    assert db.scalars(select(OTPCode.code)).all() == ["333333"]
+
+
+def test_limiter_allows_the_limit_in_any_window(clock):
+    limiter = SlidingWindowLimiter(limit=2, window=60)
+    assert limiter.hit("a") == 0
+    clock[0] += 10
+    assert limiter.hit("a") == 0
+    assert limiter.hit("a") == 50
+    assert limiter.hit("b") == 0
+
+    # The first hit leaves the window, the refused one was never counted
+    clock[0] += 50
+    assert limiter.hit("a") == 0
+    assert limiter.hit("a") == 10
+
+
+def test_limiter_can_be_reset_or_disabled(clock):
+    limiter = SlidingWindowLimiter(limit=1, window=60)
+    limiter.hit("a")
+    assert limiter.hit("a") > 0
+    limiter.reset("a")
+    assert limiter.hit("a") == 0
+
+    disabled = SlidingWindowLimiter(limit=0, window=60)
+    assert all(disabled.hit("a") == 0 for _ in range(10))
+
+
+def test_limiter_forgets_the_least_recently_used_keys(clock):
+    limiter = SlidingWindowLimiter(limit=1, window=60, max_keys=2)
+    limiter.hit("a")
+    limiter.hit("b")
+    limiter.hit("c")
+    assert limiter.hit("a") == 0
+    assert limiter.hit("c") > 0
+
+
+def test_otp_requests_are_limited_per_phone(client, limits):
+    for _ in range(2):
+        assert client.post("/auth/request-otp", json={"phone_number": PHONE}).status_code == 200
+
+    response = client.post("/auth/request-otp", json={"phone_number": PHONE})
+    assert response.status_code == 429
+    assert 0 < int(response.headers["Retry-After"]) <= 900
+    # Refused by the phone limit, but the IP limit before it was still charged (3 of 4)
+    assert client.post("/auth/request-otp", json={"phone_number": "+15550000002"}).status_code == 200
+
+
+def test_otp_requests_are_limited_per_ip(client, limits):
+    for n in range(4):
+        assert client.post("/auth/request-otp", json={"phone_number": f"+1555000001{n}"}).status_code == 200
+    assert client.post("/auth/request-otp", json={"phone_number": "+15550000020"}).status_code == 429
+
+
+def test_verifying_an_otp_signs_in_once(client, limits, monkeypatch):
+    monkeypatch.setattr(auth, "generate_otp", lambda: "123456")
+    client.post("/auth/request-otp", json={"phone_number": PHONE})
+
+    wrong = client.post("/auth/verify-otp", json={"phone_number": PHONE, "code": "000000"})
+    assert wrong.status_code == 401
+    response = client.post("/auth/verify-otp", json={"phone_number": PHONE, "code": "123456"})
+    assert response.status_code == 200
+    token = response.json()["access_token"]
+    assert client.get("/auth/me", headers={"Authorization": f"Bearer {token}"}).json()["phone_number"] == PHONE
+
+    reused = client.post("/auth/verify-otp", json={"phone_number": PHONE, "code": "123456"})
+    assert reused.status_code == 401
+
+
+def test_otp_verification_attempts_are_limited_per_phone(client, limits):
+    client.post("/auth/request-otp", json={"phone_number": PHONE})
+    for _ in range(5):
+        client.post("/auth/verify-otp", json={"phone_number": PHONE, "code": "000000"})
+
+    response = client.post("/auth/verify-otp", json={"phone_number": PHONE, "code": "000000"})
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
@@ -0,0 +1,88 @@
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from app.models import MessageStatus, OutboundMessage
+from app.outbox import claim_ready_messages, deliver, next_attempt_time
+from app.sms import SenderPool, TwilioTransport, set_transport
+
+
+
+def test_next_attempt_time_waits_out_another_workers_lease(db, add_message):
+    now = datetime.utcnow()
+    add_message("overdue", next_attempt_at=now - timedelta(seconds=30))
+
+    claimed, _ = claim_ready_messages(db, now, 10, "worker-a")
+    assert len(claimed) == 1
+
+    # Worker B sees the overdue message, but it's leased: wake when the lease lapses, not now
+    lease_ends = db.query(OutboundMessage.claimed_until).scalar()
+    assert lease_ends > now
+    assert next_attempt_time(db, now) == lease_ends
+    assert claim_ready_messages(db, now, 10, "worker-b") == ([], False)
+
+
+def test_next_attempt_time_prefers_ready_messages(db, add_message):
+    now = datetime.utcnow()
+    add_message("leased", next_attempt_at=now - timedelta(seconds=30))
+    claim_ready_messages(db, now, 10, "worker-a")
+    add_message("retry", next_attempt_at=now + timedelta(seconds=5))
+
+    assert next_attempt_time(db, now) == now + timedelta(seconds=5)
+
+
+def test_next_attempt_time_reclaims_expired_leases(db, add_message):
+    now = datetime.utcnow()
+    message = add_message("expired", next_attempt_at=now - timedelta(seconds=30))
+    message.claimed_by, message.claimed_until = "worker-a", now - timedelta(seconds=1)
+    db.commit()
+
+    assert next_attempt_time(db, now) == now - timedelta(seconds=30)
+
+
+def test_next_attempt_time_ignores_finished_messages(db, add_message):
+    now = datetime.utcnow()
+    message = add_message("sent", next_attempt_at=now)
+    message.status = MessageStatus.sent
+    db.commit()
+
+    assert next_attempt_time(db, now) is None
+
+
+def twilio_behind_a_limiter(create) -> TwilioTransport:
+    transport = TwilioTransport("AC0", "token", SenderPool(["+15550000107"], rate=10.0, burst=1, max_wait=5.0),
+                                pool_size=1, timeout=1.0)
+    transport.client = SimpleNamespace(messages=SimpleNamespace(create=create))
+    return transport
+
+
+def slow_provider(seconds: float, error: Exception | None = None):
+    def create(**message):
+        time.sleep(seconds)
+        if error is not None:
+            raise error
+    return create
+
+
+def test_delivery_latency_leaves_out_the_rate_limit_wait():
+    message = SimpleNamespace(phone_number="+15550000001", body="hi")
+    set_transport(twilio_behind_a_limiter(slow_provider(0.01)))
+    try:
+        outcomes = [deliver(message), deliver(message)]
+    finally:
+        set_transport(None)
+
+    # The second send waited ~0.1s for the limiter before its 0.01s call
+    for error, seconds in outcomes:
+        assert error is None and 0.01 <= seconds < 0.05
+
+
+def test_refused_delivery_reports_the_providers_time():
+    message = SimpleNamespace(phone_number="+15550000001", body="hi")
+    set_transport(twilio_behind_a_limiter(slow_provider(0.02, RuntimeError("invalid number"))))
+    try:
+        error, seconds = deliver(message)
+    finally:
+        set_transport(None)
+
+    assert str(error) == "invalid number" and error.seconds == seconds >= 0.02
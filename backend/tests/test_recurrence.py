@@ -0,0 +1,116 @@
+import calendar
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from app import recurrence as recurrence_module
+from app.recurrence import CompiledRule, compile_rule
+
+
+def reference(rule: dict, schedule_time: time, zone: str, after: datetime, until: datetime) -> list[datetime]:
+    """Occurrences in (after, until] found the slow way: test every day, convert with zoneinfo."""
+    start = date.fromisoformat(rule.get("start", "2000-01-01"))
+    last = date.fromisoformat(rule["until"]) if rule.get("until") else None
+    interval = rule.get("interval", 1)
+    weekdays = rule.get("weekdays") or [start.weekday()]
+    month_days = rule.get("month_days") or ([] if rule.get("nth_weekdays") else [str(start.day)])
+    times = sorted({schedule_time, *(time.fromisoformat(t) for t in rule.get("times", []))})
+
+    def matches(day: date) -> bool:
+        if rule["frequency"] == "daily":
+            return (day - start).days % interval == 0
+        if rule["frequency"] == "weekly":
+            week_start = start - timedelta(days=start.weekday())
+            return day.weekday() in weekdays and (day - week_start).days // 7 % interval == 0
+        months = (day.year - start.year) * 12 + day.month - start.month
+        if months % interval:
+            return False
+        days_in_month = calendar.monthrange(day.year, day.month)[1]
+        for month_day in month_days:
+            if day.day == (days_in_month if month_day == "last" else min(int(month_day), days_in_month)):
+                return True
+        for item in rule.get("nth_weekdays", []):
+            if day.weekday() == item["weekday"] and (
+                day.day + 7 > days_in_month if item["n"] == -1 else (day.day - 1) // 7 + 1 == item["n"]
+            ):
+                return True
+        return False
+
+    occurrences, day = [], start
+    while day <= until.date() + timedelta(days=1) and (last is None or day <= last):
+        if matches(day):
+            for moment in times:
+                local = datetime.combine(day, moment, tzinfo=ZoneInfo(zone))
+                occurrences.append(local.astimezone(timezone.utc).replace(tzinfo=None))
+        day += timedelta(days=1)
+    if rule.get("count"):
+        occurrences = occurrences[:rule["count"]]
+    return [occurrence for occurrence in occurrences if after < occurrence <= until]
+
+
+RULES = [
+    ({"frequency": "daily"}, time(9, 0), "UTC"),
+    ({"frequency": "daily", "interval": 3, "start": "2025-01-07", "times": ["18:30"]}, time(9, 0), "Europe/Berlin"),
+    ({"frequency": "weekly", "weekdays": [0, 4], "start": "2025-02-03"}, time(9, 0), "America/New_York"),
+    ({"frequency": "weekly", "interval": 2, "weekdays": [6], "start": "2025-01-01"}, time(9, 0), "Australia/Sydney"),
+    ({"frequency": "monthly", "month_days": ["31", "15"], "start": "2025-01-01"}, time(9, 0), "UTC"),
+    ({"frequency": "monthly", "month_days": ["last"], "interval": 2, "start": "2025-01-01"}, time(9, 0), "Asia/Kolkata"),
+    ({"frequency": "monthly", "nth_weekdays": [{"n": 2, "weekday": 1}, {"n": -1, "weekday": 4}],
+      "start": "2025-01-01"}, time(9, 0), "America/Chicago"),
+    ({"frequency": "monthly", "nth_weekdays": [{"n": 5, "weekday": 4}], "start": "2025-01-01"}, time(9, 0), "UTC"),
+    ({"frequency": "daily", "start": "2025-03-01", "until": "2025-04-15"}, time(9, 0), "Europe/London"),
+    ({"frequency": "weekly", "weekdays": [1, 3], "start": "2025-01-01", "count": 25}, time(9, 0), "UTC"),
+    # 02:30 doesn't exist on the spring-forward day and happens twice on the fall-back one
+    ({"frequency": "daily", "start": "2025-03-01"}, time(2, 30), "America/New_York"),
+]
+
+
+@pytest.mark.parametrize("rule,schedule_time,zone", RULES)
+def test_expansion_matches_the_reference(rule, schedule_time, zone):
+    compiled = CompiledRule(rule, schedule_time, zone)
+    after, until = datetime(2025, 1, 1), datetime(2027, 1, 1)
+    expected = reference(rule, schedule_time, zone, after, until)
+    assert expected
+
+    assert compiled.between(after, until) == expected
+    assert compiled.upcoming(after, 5) == expected[:5]
+
+    # Stepping one occurrence at a time, as the scheduler does
+    stepped, moment = [], after
+    while (moment := compiled.next_after(moment)) is not None and moment <= until:
+        stepped.append(moment)
+    assert stepped == expected
+
+
+def test_cached_window_answers_queries_in_any_order(monkeypatch):
+    # A small window, so queries keep restarting and extending it
+    monkeypatch.setattr(recurrence_module, "MAX_CACHED_OCCURRENCES", 40)
+    rule = {"frequency": "weekly", "weekdays": [0, 2, 4], "start": "2024-06-01", "times": ["21:00"]}
+    compiled = CompiledRule(rule, time(7, 15), "Europe/Paris")
+    expected = reference(rule, time(7, 15), "Europe/Paris", datetime(2024, 6, 1), datetime(2030, 1, 1))
+
+    for after in (datetime(2028, 3, 1), datetime(2024, 7, 1), datetime(2029, 12, 1), datetime(2024, 6, 1),
+                  datetime(2026, 10, 25, 5), datetime(2026, 10, 25, 6)):
+        assert compiled.upcoming(after, 5) == [moment for moment in expected if moment > after][:5]
+
+
+def test_count_is_from_the_start_not_the_query():
+    rule = {"frequency": "daily", "start": "2025-01-01", "count": 3}
+    compiled = CompiledRule(rule, time(9, 0), "UTC")
+
+    assert compiled.next_after(datetime(2025, 1, 2, 12)) == datetime(2025, 1, 3, 9)
+    assert compiled.next_after(datetime(2025, 1, 3, 9)) is None
+    assert compiled.upcoming(datetime(2024, 1, 1), 10) == [datetime(2025, 1, day, 9) for day in (1, 2, 3)]
+
+
+def test_rules_are_compiled_once_per_rule_and_zone():
+    rule = {"frequency": "weekly", "weekdays": [1], "interval": 2}
+    shared = compile_rule(rule, time(8, 0), "Europe/Rome")
+
+    # Key order doesn't matter, and the rule's key works as well as the rule
+    assert compile_rule(dict(reversed(list(rule.items()))), time(8, 0), "Europe/Rome") is shared
+    assert compile_rule(recurrence_module.rule_key(rule), time(8, 0), "Europe/Rome") is shared
+    assert compile_rule(rule, time(8, 0), "Europe/Madrid") is not shared
+    assert compile_rule(rule, time(8, 1), "Europe/Rome") is not shared
+    assert compile_rule(rule, time(8, 0)) is compile_rule(rule, time(8, 0), "UTC")
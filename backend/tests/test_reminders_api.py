@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+
+from app.models import MessageStatus
+from app.outbox import claim_ready_messages
+
+
+
+def test_next_run_bounds_with_an_offset_are_compared_in_utc(client, auth_headers, add_reminder):
+    for hour in (1, 2, 3):
+        add_reminder(datetime(2026, 10, 19, hour, 0))
+
+    # 07:00+05:00 is 02:00 UTC
+    response = client.get("/reminders", headers=auth_headers, params={"next_run_from": "2026-10-19T07:00:00+05:00"})
+    assert response.status_code == 200
+    assert [item["next_run"] for item in response.json()] == ["2026-10-19T02:00:00", "2026-10-19T03:00:00"]
+
+    response = client.get("/reminders", headers=auth_headers, params={"next_run_to": "2026-10-18T23:00:00-03:00"})
+    assert [item["next_run"] for item in response.json()] == ["2026-10-19T01:00:00"]
+
+    # Naive bounds are already UTC
+    response = client.get("/reminders", headers=auth_headers, params={"next_run_from": "2026-10-19T02:00:00"})
+    assert len(response.json()) == 2
+
+
+
+def test_deleting_a_reminder_cancels_its_queued_messages(client, db, auth_headers, add_reminder, add_message):
+    reminder = add_reminder(datetime.utcnow())
+    own = add_message("own", reminder_id=reminder.id)
+    combined = add_message("combined", reminder_id=None)
+
+    assert client.delete(f"/reminders/{reminder.id}", headers=auth_headers).status_code == 204
+
+    db.expire_all()
+    assert own.status == MessageStatus.dead
+    assert own.last_error == "Cancelled: reminder deleted"
+    assert combined.status == MessageStatus.pending
+    claimed, _ = claim_ready_messages(db, datetime.utcnow(), 10, "worker")
+    assert [message.id for message in claimed] == [combined.id]
+
+
+def test_pausing_a_reminder_cancels_its_queued_messages(client, db, auth_headers, add_reminder, add_message):
+    reminder = add_reminder(datetime.utcnow() + timedelta(days=1))
+    own = add_message("own", reminder_id=reminder.id)
+
+    response = client.put(f"/reminders/{reminder.id}", headers=auth_headers, json={"message": "renamed"})
+    assert response.status_code == 200
+    db.expire_all()
+    assert own.status == MessageStatus.pending
+
+    response = client.put(f"/reminders/{reminder.id}", headers=auth_headers, json={"is_active": False})
+    assert response.status_code == 200
+    db.expire_all()
+    assert own.status == MessageStatus.dead
@@ -0,0 +1,218 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app import outbox, scheduler
+from app.fire_queue import FireQueue
+from app.models import Delivery, DeliveryStatus, MessageStatus, OutboundMessage, ScheduleType
+from app.sms import FakeTransport, SMSError, SMSThrottled, set_transport
+
+
+
+@pytest.fixture
+def queue(monkeypatch) -> tuple[FireQueue, list[datetime]]:
+    """A fresh fire queue loaded for the next five minutes, with the wakeups it asks for."""
+    queue, wakeups = FireQueue(), []
+    queue.load([], datetime.utcnow() + timedelta(minutes=5))
+    queue.listener = wakeups.append
+    monkeypatch.setattr(scheduler, "fire_queue", queue)
+    monkeypatch.setattr(scheduler, "_changes_seen_at", None)
+    return queue, wakeups
+
+
+def test_watch_picks_up_reminders_created_by_another_process(db, queue, add_reminder):
+    queue, wakeups = queue
+    scheduler.watch_reminders()
+
+    soon = datetime.utcnow() + timedelta(seconds=90)
+    reminder = add_reminder(soon)
+    add_reminder(datetime.utcnow() + timedelta(hours=2))
+    scheduler.watch_reminders()
+
+    # Woken for the new reminder rather than at the end of the look-ahead window
+    assert wakeups == [soon]
+    assert queue.next_wakeup(datetime.utcnow()) == soon
+    assert len(queue) == 1
+
+    # Edited, then paused
+    reminder.next_run = soon - timedelta(seconds=30)
+    db.commit()
+    scheduler.watch_reminders()
+    assert queue.next_wakeup(datetime.utcnow()) == soon - timedelta(seconds=30)
+
+    reminder.is_active = False
+    db.commit()
+    scheduler.watch_reminders()
+    assert len(queue) == 0
+
+
+def test_watch_skips_reminders_being_sent(queue, add_reminder):
+    queue, wakeups = queue
+    scheduler.watch_reminders()
+
+    now = datetime.utcnow()
+    add_reminder(now + timedelta(seconds=60), claimed_by="worker-a", claimed_until=now + timedelta(minutes=5))
+    scheduler.watch_reminders()
+
+    assert wakeups == []
+    assert len(queue) == 0
+
+
+def test_due_reminders_are_leased_to_one_worker(db, add_reminder):
+    now = datetime.utcnow()
+    due = [add_reminder(now - timedelta(seconds=seconds)).id for seconds in (30, 20, 10)]
+    add_reminder(now + timedelta(hours=1))
+    add_reminder(now - timedelta(seconds=5), is_active=False)
+
+    # Keyset pages, oldest first
+    first, cursor = scheduler.claim_due_batch(db, now, None, 2)
+    second, cursor = scheduler.claim_due_batch(db, now, cursor, 2)
+    assert [row.id for row in first + second] == due
+    assert scheduler.claim_due_batch(db, now, cursor, 2) == ([], None)
+
+    # Another worker finds them leased until the lease runs out
+    assert scheduler.claim_due_batch(db, now, None, 10) == ([], None)
+    expired = now + timedelta(seconds=scheduler.settings.scheduler_lease_seconds + 1)
+    rows, _ = scheduler.claim_due_batch(db, expired, None, 10)
+    assert [row.id for row in rows] == due
+
+
+def test_due_batch_enqueues_and_moves_reminders_on(db, add_reminder):
+    now = datetime.utcnow()
+    once = add_reminder(now - timedelta(seconds=10), message="once")
+    daily = add_reminder(now - timedelta(seconds=5), message="daily", schedule_type=ScheduleType.daily)
+
+    rows, _ = scheduler.claim_due_batch(db, now, None, 10)
+    scheduler.process_due_batch(db, rows)
+
+    messages = db.query(OutboundMessage).order_by(OutboundMessage.body).all()
+    assert [(message.reminder_id, message.body) for message in messages] == [(daily.id, "daily"), (once.id, "once")]
+    db.refresh(once)
+    db.refresh(daily)
+    assert not once.is_active
+    assert daily.is_active and daily.next_run > now
+    assert once.claimed_by is None and daily.claimed_by is None
+
+    # Enqueueing the same occurrences again is a no-op
+    outbox.enqueue_messages(db, scheduler.recipient_messages(rows[:1], now))
+    db.commit()
+    assert db.query(OutboundMessage).count() == 2
+
+
+def test_coalescing_sends_one_message_per_recipient(db, monkeypatch, add_reminder):
+    monkeypatch.setattr(scheduler.settings, "sms_coalesce", True)
+    monkeypatch.setattr(scheduler.settings, "sms_coalesce_window_seconds", 60)
+    now = datetime.utcnow()
+    due = add_reminder(now - timedelta(seconds=10), message="water the plants",
+                       schedule_type=ScheduleType.daily)
+    early = add_reminder(now + timedelta(seconds=30), message="feed the cat")
+    later = add_reminder(now + timedelta(minutes=10), message="not yet")
+
+    rows, _ = scheduler.claim_due_batch(db, now, None, 10)
+    scheduler.process_due_batch(db, rows)
+
+    message = db.query(OutboundMessage).one()
+    assert message.reminder_id is None
+    assert message.body == "- water the plants\n- feed the cat"
+    assert {occurrence["reminder_id"] for occurrence in message.occurrences} == {due.id, early.id}
+
+    for reminder in (due, early, later):
+        db.refresh(reminder)
+    assert due.next_run > now + timedelta(seconds=60)
+    assert not early.is_active
+    assert later.is_active and later.claimed_by is None
+
+
+
+def test_record_results_retries_dead_letters_and_defers(db, monkeypatch, add_message):
+    monkeypatch.setattr(outbox.settings, "outbox_max_attempts", 3)
+    for key, attempts in (("sent", 0), ("failed", 0), ("dead", 2), ("throttled", 2), ("refused", 0)):
+        add_message(key, attempts=attempts, occurrences=[
+            {"reminder_id": key, "user_id": "u", "scheduled_for": "2026-10-18T09:00:00"}
+        ])
+    claimed, _ = outbox.claim_ready_messages(db, datetime.utcnow(), 10, "worker-a")
+    errors = {"sent": None, "failed": SMSError("provider down"), "dead": SMSError("provider down"),
+              "throttled": SMSThrottled("rate limited", retry_after=20),
+              "refused": SMSThrottled("rate limited", retry_after=5, local=True)}
+
+    before = datetime.utcnow()
+    outbox.record_results(db, [(message, errors[message.body], 0.25) for message in claimed])
+
+    messages = {message.body: message for message in db.query(OutboundMessage)}
+    assert messages["sent"].status == MessageStatus.sent and messages["sent"].attempts == 1
+    assert messages["failed"].status == MessageStatus.pending and messages["failed"].attempts == 1
+    assert messages["failed"].next_attempt_at > before
+    assert messages["dead"].status == MessageStatus.dead and messages["dead"].attempts == 3
+    # Throttling defers without using up an attempt
+    assert messages["throttled"].status == MessageStatus.pending and messages["throttled"].attempts == 2
+    assert messages["throttled"].next_attempt_at >= before + timedelta(seconds=20)
+    assert messages["refused"].status == MessageStatus.pending and messages["refused"].attempts == 0
+    assert all(message.claimed_by is None for message in messages.values())
+
+    deliveries = {row.reminder_id: row for row in db.query(Delivery)}
+    # Refused by our own limiter: the provider never saw it, so it isn't logged as an attempt
+    assert {key: row.status for key, row in deliveries.items()} == {
+        "sent": DeliveryStatus.sent, "failed": DeliveryStatus.failed,
+        "dead": DeliveryStatus.dead, "throttled": DeliveryStatus.throttled
+    }
+    assert deliveries["failed"].error == "provider down" and deliveries["sent"].latency_ms == 250
+
+    # Only the retry is left to send, and not before its backoff
+    assert outbox.claim_ready_messages(db, datetime.utcnow(), 10, "worker-a") == ([], False)
+
+
+def test_drain_outbox_sends_everything_ready(db, add_message):
+    for key in ("one", "two", "three"):
+        add_message(key)
+    transport = FakeTransport()
+    set_transport(transport)
+    try:
+        assert outbox.drain_outbox(db, "worker-a") == 3
+        assert outbox.drain_outbox(db, "worker-a") == 0
+    finally:
+        set_transport(None)
+
+    assert transport.sent == 3
+    assert {message.status for message in db.query(OutboundMessage)} == {MessageStatus.sent}
+
+
+class FakeScheduler:
+    """Just the job bookkeeping wake_at and schedule_next_tick use."""
+
+    def __init__(self):
+        self.jobs = {}
+
+    def get_job(self, job_id):
+        return self.jobs.get(job_id)
+
+    def add_job(self, func, trigger, run_date, id, **options):
+        self.jobs[id] = SimpleNamespace(next_run_time=run_date)
+
+
+def test_a_wakeup_requested_mid_tick_is_not_overwritten(db, queue, monkeypatch):
+    fake = FakeScheduler()
+    monkeypatch.setattr(scheduler, "scheduler", fake)
+    soon = datetime.utcnow() + timedelta(seconds=20)
+
+    def next_attempt_time(db, now):
+        # A request schedules a reminder while the tick works out its next wakeup
+        scheduler.wake_at(soon)
+        return None
+
+    monkeypatch.setattr(scheduler, "next_attempt_time", next_attempt_time)
+    scheduler.schedule_next_tick()
+
+    # Not moved back to the end of the look-ahead window
+    assert fake.jobs[scheduler.JOB_ID].next_run_time == soon.replace(tzinfo=timezone.utc)
+
+
+def test_next_tick_is_armed_for_the_first_reminder(db, queue, monkeypatch):
+    queue, _ = queue
+    fake = FakeScheduler()
+    monkeypatch.setattr(scheduler, "scheduler", fake)
+    first = datetime.utcnow() + timedelta(seconds=45)
+    queue.schedule("reminder", first)
+
+    scheduler.schedule_next_tick()
+    assert fake.jobs[scheduler.JOB_ID].next_run_time == first.replace(tzinfo=timezone.utc)
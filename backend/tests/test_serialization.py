@@ -0,0 +1,115 @@
+import json
+from datetime import datetime, time, timedelta
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import select
+
+from app import serialization
+from app.models import Delivery, DeliveryStatus, Reminder, ReminderOccurrence, ScheduleType, User
+from app.serialization import CALENDAR, DELIVERY_LIST, REMINDER_LIST, USER_LIST, FastJSONResponse, list_response
+
+
+@pytest.fixture(params=["orjson", "pydantic-core"], autouse=True)
+def encoder(request, monkeypatch):
+    """Run every test with each encoder FastJSONResponse can use."""
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(serialization, "orjson", None)
+    return request.param
+
+
+def validated(adapter, objects) -> list:
+    """What the endpoint's response_model would have sent for `objects`."""
+    return json.loads(adapter.dump_json(adapter.validate_python(objects, from_attributes=True)))
+
+
+@pytest.fixture
+def reminders(client, db, auth_headers) -> list[Reminder]:
+    for body in (
+        {"message": "once", "schedule_type": "once", "schedule_time": "09:00:00", "schedule_date": "2099-01-01"},
+        {"message": "weekly", "schedule_type": "weekly", "schedule_time": "07:15:30", "schedule_days": [0, 4]},
+        {"message": "monthly", "schedule_type": "monthly", "schedule_time": "12:00:00", "schedule_day_of_month": "last",
+         "timezone": "Asia/Kolkata"},
+        {"message": "custom", "schedule_type": "custom", "schedule_time": "08:00:00",
+         "recurrence": {"frequency": "weekly", "interval": 2, "weekdays": [1], "times": ["18:00:00"]}},
+    ):
+        assert client.post("/reminders", headers=auth_headers, json=body).status_code == 201
+    return db.scalars(select(Reminder).order_by(Reminder.next_run)).all()
+
+
+def test_reminder_list_matches_the_response_model(client, auth_headers, reminders):
+    response = client.get("/reminders", headers=auth_headers)
+    assert response.headers["content-type"] == "application/json"
+    listed = sorted(response.json(), key=lambda item: item["id"])
+    assert listed == sorted(validated(REMINDER_LIST, reminders), key=lambda item: item["id"])
+
+
+def test_user_list_matches_the_response_model(client, db, admin_headers):
+    db.add(User(phone_number="+15550000002", timezone="Europe/Oslo"))
+    db.commit()
+
+    users = db.scalars(select(User).order_by(User.created_at.desc(), User.id.desc())).all()
+    assert client.get("/admin/users", headers=admin_headers).json() == validated(USER_LIST, users)
+
+
+def test_calendar_matches_the_response_model(client, db, auth_headers, reminders):
+    now = datetime.utcnow()
+    response = client.get(
+        "/reminders/calendar", headers=auth_headers,
+        params={"from": now.isoformat(), "to": (now + timedelta(days=30)).isoformat()}
+    )
+    rows = db.execute(
+        select(ReminderOccurrence.reminder_id, ReminderOccurrence.occurs_at, Reminder.message)
+        .join(Reminder, Reminder.id == ReminderOccurrence.reminder_id)
+        .where(ReminderOccurrence.occurs_at >= now, ReminderOccurrence.occurs_at < now + timedelta(days=30))
+        .order_by(ReminderOccurrence.occurs_at, ReminderOccurrence.reminder_id)
+    ).all()
+    assert response.json() == validated(CALENDAR, [row._asdict() for row in rows])
+
+
+def test_delivery_history_matches_the_response_model(client, db, user, auth_headers, add_reminder):
+    reminder = add_reminder(datetime.utcnow() - timedelta(days=1))
+    reminder.created_at = datetime.utcnow() - timedelta(days=2)
+    sent_at = datetime.utcnow() - timedelta(hours=1)
+    db.add_all([
+        Delivery(reminder_id=reminder.id, user_id=user.id, scheduled_for=sent_at, sent_at=sent_at,
+                 status=DeliveryStatus.sent, latency_ms=120),
+        Delivery(reminder_id=reminder.id, user_id=user.id, scheduled_for=sent_at,
+                 sent_at=sent_at - timedelta(minutes=5), status=DeliveryStatus.failed,
+                 latency_ms=3000, error="timeout"),
+    ])
+    db.commit()
+
+    deliveries = db.scalars(select(Delivery).order_by(Delivery.sent_at.desc())).all()
+    response = client.get(f"/reminders/{reminder.id}/history", headers=auth_headers)
+    assert response.json() == validated(DELIVERY_LIST, deliveries)
+
+
+def test_fast_response_encodes_database_values():
+    content = [{
+        "schedule_type": ScheduleType.weekly,
+        "schedule_time": time(7, 15, 30),
+        "next_run": datetime(2026, 10, 19, 7, 15, 30, 250000),
+        "schedule_days": [0, 4],
+        "recurrence": None,
+    }]
+    assert json.loads(FastJSONResponse(content).body) == [{
+        "schedule_type": "weekly",
+        "schedule_time": "07:15:30",
+        "next_run": "2026-10-19T07:15:30.250000",
+        "schedule_days": [0, 4],
+        "recurrence": None,
+    }]
+
+
+def test_validate_responses_catches_a_column_list_drifting_from_its_model(db, user, monkeypatch):
+    rows = db.execute(select(User.id, User.phone_number)).all()
+
+    monkeypatch.setattr(serialization.settings, "validate_responses", False)
+    assert json.loads(list_response(rows, USER_LIST).body) == [{"id": user.id, "phone_number": user.phone_number}]
+
+    monkeypatch.setattr(serialization.settings, "validate_responses", True)
+    with pytest.raises(ValidationError):
+        list_response(rows, USER_LIST)
@@ -0,0 +1,84 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.sms import SenderPool, SMSThrottled, TwilioTransport
+
+
+def counter(name: str, priority: str) -> float:
+    return REGISTRY.get_sample_value(f"nagqueen_{name}_total", {"priority": priority}) or 0.0
+
+
+def test_reminder_burst_leaves_room_for_otp_codes():
+    pool = SenderPool(["+15550000100"], rate=1.0, burst=5, max_wait=2.0, priority_share=0.2)
+    refused = counter("sms_throttle_refused", "normal")
+
+    # The reminder lane fills up (its burst, then up to max_wait of reservations) and refuses the rest
+    waits = []
+    with pytest.raises(SMSThrottled):
+        for _ in range(20):
+            waits.append(pool.acquire()[1])
+    assert waits[0] == 0 and waits[-1] > 0
+    assert counter("sms_throttle_refused", "normal") == refused + 1
+
+    # An OTP code still goes straight out on its own share
+    assert pool.acquire(priority=True) == ("+15550000100", 0.0)
+
+
+def test_waits_are_counted():
+    pool = SenderPool(["+15550000101"], rate=10.0, burst=1, max_wait=5.0)
+    throttled = counter("sms_throttled", "normal")
+
+    pool.acquire()
+    _, wait = pool.acquire()
+    assert wait > 0
+    assert counter("sms_throttled", "normal") == throttled + 1
+
+
+def test_without_a_priority_share_otp_codes_use_the_shared_lane():
+    pool = SenderPool(["+15550000102"], rate=1.0, burst=1, max_wait=0.0)
+    pool.acquire()
+    with pytest.raises(SMSThrottled):
+        pool.acquire(priority=True)
+
+
+def test_unlimited_pool_never_waits():
+    pool = SenderPool(["+15550000103"], rate=0, burst=0, max_wait=0.0, priority_share=0.2)
+    assert [pool.acquire(priority)[1] for priority in (False, True, False)] == [0.0, 0.0, 0.0]
+
+
+def test_refused_sends_are_deferred_one_slot_apart():
+    pool = SenderPool(["+15550000104", "+15550000105"], rate=2.0, burst=1, max_wait=0.0)
+    for _ in range(2):
+        pool.acquire()
+
+    retries = []
+    for _ in range(4):
+        with pytest.raises(SMSThrottled) as refused:
+            pool.acquire()
+        assert refused.value.local
+        retries.append(refused.value.retry_after)
+
+    # Two numbers at 2/s: a slot every quarter second, rather than four sends back at once
+    gaps = [later - earlier for earlier, later in zip(retries, retries[1:])]
+    assert gaps == pytest.approx([0.25] * 3, abs=0.01)
+
+
+def sample(name: str) -> float:
+    return REGISTRY.get_sample_value(name) or 0.0
+
+
+def test_send_latency_is_the_provider_call_alone():
+    transport = TwilioTransport("AC0", "token", SenderPool(["+15550000106"], rate=10.0, burst=1, max_wait=5.0),
+                                pool_size=1, timeout=1.0)
+    transport.client = SimpleNamespace(messages=SimpleNamespace(create=lambda **message: time.sleep(0.01)))
+    count, total = sample("nagqueen_sms_send_seconds_count"), sample("nagqueen_sms_send_seconds_sum")
+
+    # The second send first waits ~0.1s for the limiter; that isn't provider time
+    transport.send("+15550000001", "one")
+    transport.send("+15550000001", "two")
+
+    assert sample("nagqueen_sms_send_seconds_count") == count + 2
+    assert 0.02 <= sample("nagqueen_sms_send_seconds_sum") - total < 0.06
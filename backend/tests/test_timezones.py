@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from app.timezones import ZoneTable, local_now
+
+
+def utc_of(local: datetime, zone: str, fold: int = 0) -> datetime:
+    return local.replace(tzinfo=ZoneInfo(zone), fold=fold).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+# Lord Howe moves by half an hour; Samoa skipped a whole day in 2011
+ZONES = ["America/New_York", "Europe/London", "Australia/Sydney", "Australia/Lord_Howe", "Asia/Kolkata",
+         "Pacific/Apia"]
+
+
+@pytest.mark.parametrize("zone", ZONES)
+def test_conversions_match_zoneinfo_all_year(zone):
+    table = ZoneTable(zone)
+    moment = datetime(2026, 1, 1)
+    while moment < datetime(2027, 1, 1):
+        expected = moment.replace(tzinfo=timezone.utc).astimezone(ZoneInfo(zone)).replace(tzinfo=None)
+        assert table.to_local(moment) == expected, moment
+        # fold=0 is the earlier reading of a repeated time and moves a skipped one forward
+        assert table.to_utc(expected.replace(second=0)) == utc_of(expected.replace(second=0), zone), expected
+        moment += timedelta(minutes=30)
+
+
+def test_spring_forward_gap_moves_forward():
+    table = ZoneTable("America/New_York")
+    # 2026-03-08 02:00 EST jumps to 03:00 EDT
+    assert table.to_utc(datetime(2026, 3, 8, 2, 30)) == datetime(2026, 3, 8, 7, 30)
+    assert table.to_local(datetime(2026, 3, 8, 7, 30)) == datetime(2026, 3, 8, 3, 30)
+    assert table.offset_at(datetime(2026, 3, 8, 6, 59, 59)) == timedelta(hours=-5)
+    assert table.offset_at(datetime(2026, 3, 8, 7)) == timedelta(hours=-4)
+
+
+def test_fall_back_overlap_has_two_readings():
+    table = ZoneTable("America/New_York")
+    # 2026-11-01 01:30 happens at 05:30 UTC (EDT) and again at 06:30 UTC (EST)
+    local = datetime(2026, 11, 1, 1, 30)
+    assert table.to_utc(local) == datetime(2026, 11, 1, 5, 30) == utc_of(local, "America/New_York")
+    assert table.to_utc(local, after=datetime(2026, 11, 1, 5, 30)) == datetime(2026, 11, 1, 6, 30)
+    assert table.to_utc(local, after=datetime(2026, 11, 1, 6, 30)) is None
+    assert utc_of(local, "America/New_York", fold=1) == datetime(2026, 11, 1, 6, 30)
+
+
+def test_table_grows_past_the_years_built_up_front():
+    table = ZoneTable("Europe/Berlin")
+    for moment in (datetime(1996, 10, 27, 0, 59, 59), datetime(1996, 10, 27, 1), datetime(2045, 3, 26, 1)):
+        expected = moment.replace(tzinfo=timezone.utc).astimezone(ZoneInfo("Europe/Berlin")).utcoffset()
+        assert table.offset_at(moment) == expected
+
+
+def test_local_now():
+    now = datetime(2026, 7, 1, 12)
+    assert local_now("Asia/Tokyo", now) == datetime(2026, 7, 1, 21)
+    assert local_now("UTC", now) == local_now(None, now) == now